@@ -0,0 +1,250 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+
+import pandas as pd
+
+# The benchmarks import the scripts the same way the notebooks and tests do.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+for path in (os.path.join(ROOT, 'scripts'), ROOT):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from load_data import load_data, load_data_chunked  # noqa: E402
+from monthly_trend import aggregate_monthly_trends  # noqa: E402
+from Statistical_hyphothesis import statistic_hyphotesis_test  # noqa: E402
+import synthetic_data  # noqa: E402
+from synthetic_data import generate_insurance_book, iter_insurance_book, write_insurance_book  # noqa: E402
+from src.train import PeakMemory, train_claim_models  # noqa: E402
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# The scales recorded in baseline.json; larger ones can be passed with --scales.
+DEFAULT_SCALES = (50_000, 1_000_000)
+# A measurement is a regression when it exceeds the baseline by more than the tolerance
+# and by more than MIN_SECONDS / MIN_MEMORY_MB (short timings and small allocations are noisy).
+TIME_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.25
+MIN_SECONDS = 0.05
+MIN_MEMORY_MB = 32.0
+CHUNK_ROWS = 250_000
+
+
+def _generator_version():
+    """Hash of the synthetic book generator's source, so books from older versions are not reused."""
+    with open(synthetic_data.__file__, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:10]
+
+
+def _book_file(work_dir, rows, seed):
+    """
+    Synthetic '|'-delimited book for a scale, generated once and reused.
+
+    The file name carries the generator version; write_insurance_book writes to
+    a temporary file and renames it, so an interrupted run never leaves a partial book.
+    """
+    path = os.path.join(work_dir, f'synthetic_{rows}_{seed}_{_generator_version()}.txt')
+    if not os.path.exists(path):
+        write_insurance_book(path, rows, seed, chunk_rows=CHUNK_ROWS)
+    return path
+
+
+def _setup_load(rows, seed, work_dir):
+    return _book_file(work_dir, rows, seed)
+
+
+def _setup_frame(rows, seed, work_dir):
+    return generate_insurance_book(rows, seed, chunk_rows=CHUNK_ROWS)
+
+
+def _run_hypothesis_tests(df):
+    # The report is printed; only its cost is of interest here.
+    with contextlib.redirect_stdout(io.StringIO()):
+        statistic_hyphotesis_test(df, 0.05)
+
+
+def _run_training(make_chunks):
+    train_claim_models(make_chunks, models=('xgboost',), num_boost_round=20, early_stopping_rounds=5,
+                       xgb_params={'nthread': 1})
+
+
+# name: (setup(rows, seed, work_dir) -> argument, timed function of the argument)
+BENCHMARKS = {
+    'load_data': (_setup_load, lambda path: load_data(path, '|')),
+    'load_data_chunked': (_setup_load, load_data_chunked),
+    'statistic_hyphotesis_test': (_setup_frame, _run_hypothesis_tests),
+    'aggregate_monthly_trends': (_setup_frame, lambda df: aggregate_monthly_trends(
+        df, 'TransactionMonth', {'TotalPremium': 'sum', 'TotalClaims': 'sum'})),
+    'train_claim_models': (lambda rows, seed, work_dir: (lambda: iter_insurance_book(rows, seed, CHUNK_ROWS)),
+                           _run_training),
+}
+
+
+def run_benchmark(name, rows, seed=0, work_dir=None, repeat=1):
+    """
+    Time one benchmark at one scale, in the current process.
+
+    The setup (generating or writing the synthetic book) is not measured.
+    Memory is the peak RSS above the RSS at the start of the timed call.
+
+    Parameters:
+    - name (str): Key of BENCHMARKS.
+    - rows (int): Number of synthetic policies.
+    - seed (int): Seed of the synthetic book.
+    - work_dir (str, optional): Directory for the generated files.
+    - repeat (int): Timed runs; the fastest is kept.
+
+    Returns:
+    - dict: benchmark, rows, seconds, memory_mb and peak_rss_mb.
+    """
+    setup, function = BENCHMARKS[name]
+    argument = setup(rows, seed, work_dir or tempfile.gettempdir())
+    seconds, memory = [], []
+    for _ in range(repeat):
+        with PeakMemory(interval=0.01) as start:
+            pass
+        with PeakMemory(interval=0.01) as usage:
+            function(argument)
+        seconds.append(usage.seconds)
+        memory.append(max(0.0, usage.peak_mb - start.peak_mb))
+    return {'benchmark': name, 'rows': rows, 'seconds': min(seconds), 'memory_mb': min(memory),
+            'peak_rss_mb': usage.peak_mb}
+
+
+def _isolated(name, rows, seed, work_dir, repeat):
+    """Run one benchmark in a fresh spawned process, so peaks of earlier runs do not leak in."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(run_benchmark, name, rows, seed, work_dir, repeat).result()
+
+
+def load_baseline(path=BASELINE_FILE):
+    """Stored results keyed by '<benchmark>@<rows>' (empty when there is no baseline yet)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get('results', {})
+
+
+def save_baseline(results, path=BASELINE_FILE):
+    """Merge a results frame into the baseline file, replacing the entries it measured."""
+    baseline = load_baseline(path)
+    for row in results.itertuples():
+        baseline[f'{row.benchmark}@{row.rows}'] = {'seconds': round(row.seconds, 4),
+                                                   'memory_mb': round(row.memory_mb, 1)}
+    payload = {'environment': {'python': platform.python_version(), 'machine': platform.machine(),
+                               'cpu_count': os.cpu_count()},
+               'results': dict(sorted(baseline.items()))}
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+        f.write('\n')
+    logging.info(f"Baseline with {len(baseline)} entries written to {path}.")
+
+
+def compare_to_baseline(results, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE,
+                        min_seconds=MIN_SECONDS, min_memory_mb=MIN_MEMORY_MB) -> pd.DataFrame:
+    """
+    Flag measurements that regressed against the baseline.
+
+    Parameters:
+    - results (pd.DataFrame): Output of run_benchmarks.
+    - baseline (dict): Output of load_baseline.
+    - time_tolerance, memory_tolerance (float): Allowed relative increase (0.25 = 25%).
+    - min_seconds (float): Slowdowns below this many seconds are never flagged.
+    - min_memory_mb (float): Memory increases below this many MB are never flagged.
+
+    Returns:
+    - pd.DataFrame: The results with baseline_seconds, baseline_memory_mb, time_ratio,
+      memory_ratio and regression ('time', 'memory', 'time,memory' or '') columns;
+      scales missing from the baseline have NaN ratios and are not flagged.
+    """
+    results = results.copy()
+    keys = results['benchmark'] + '@' + results['rows'].astype(str)
+    results['baseline_seconds'] = [baseline.get(k, {}).get('seconds', float('nan')) for k in keys]
+    results['baseline_memory_mb'] = [baseline.get(k, {}).get('memory_mb', float('nan')) for k in keys]
+    results['time_ratio'] = results['seconds'] / results['baseline_seconds']
+    results['memory_ratio'] = results['memory_mb'] / results['baseline_memory_mb']
+    slower = ((results['time_ratio'] > 1 + time_tolerance)
+              & (results['seconds'] - results['baseline_seconds'] > min_seconds))
+    bigger = ((results['memory_mb'] > results['baseline_memory_mb'] * (1 + memory_tolerance))
+              & (results['memory_mb'] - results['baseline_memory_mb'] > min_memory_mb))
+    results['regression'] = [','.join(flag for flag, hit in (('time', s), ('memory', m)) if hit)
+                             for s, m in zip(slower, bigger)]
+    return results
+
+
+def run_benchmarks(benchmarks=None, scales=DEFAULT_SCALES, seed=0, work_dir=None, repeat=1,
+                   isolate=True) -> pd.DataFrame:
+    """
+    Run every benchmark at every scale on synthetic books.
+
+    Parameters:
+    - benchmarks (list, optional): Keys of BENCHMARKS; all of them by default.
+    - scales (iterable): Numbers of policies.
+    - seed (int): Seed of the synthetic books.
+    - work_dir (str, optional): Directory for the generated files (reused across runs).
+    - repeat (int): Timed runs per measurement; the fastest is kept.
+    - isolate (bool): Run each measurement in its own process.
+
+    Returns:
+    - pd.DataFrame: One row per (benchmark, rows) with seconds, memory_mb and peak_rss_mb.
+    """
+    work_dir = work_dir or os.path.join(tempfile.gettempdir(), 'insurance_benchmarks')
+    os.makedirs(work_dir, exist_ok=True)
+    results = []
+    for rows in scales:
+        for name in benchmarks or BENCHMARKS:
+            result = (_isolated if isolate else run_benchmark)(name, rows, seed, work_dir, repeat)
+            logging.info(f"{name} @ {rows:,} rows: {result['seconds']:.2f}s, {result['memory_mb']:.0f} MB")
+            results.append(result)
+    return pd.DataFrame(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the analysis pipeline on synthetic policy books.')
+    parser.add_argument('--scales', type=int, nargs='+', default=list(DEFAULT_SCALES))
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--work-dir', help='Where the synthetic books are written and reused')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--time-tolerance', type=float, default=TIME_TOLERANCE)
+    parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE)
+    parser.add_argument('--min-seconds', type=float, default=MIN_SECONDS)
+    parser.add_argument('--min-memory-mb', type=float, default=MIN_MEMORY_MB)
+    parser.add_argument('--output', help='Write the compared results to this JSON file')
+    parser.add_argument('--update-baseline', action='store_true', help='Store these results as the baseline')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with status 1 on any regression')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.benchmarks, args.scales, args.seed, args.work_dir, args.repeat)
+    compared = compare_to_baseline(results, load_baseline(args.baseline), args.time_tolerance,
+                                   args.memory_tolerance, args.min_seconds, args.min_memory_mb)
+    unmatched = sorted(compared.loc[compared['baseline_seconds'].isna(), 'rows'].unique())
+    if unmatched and not args.update_baseline:
+        logging.warning(f"No baseline for {', '.join(f'{rows:,}' for rows in unmatched)} rows; "
+                        "those measurements are not compared.")
+    print(compared.to_string(index=False, float_format=lambda v: f'{v:.3f}'))
+    if args.output:
+        compared.to_json(args.output, orient='records', indent=2)
+    if args.update_baseline:
+        save_baseline(results, args.baseline)
+    regressions = compared[compared['regression'] != '']
+    for row in regressions.itertuples():
+        logging.warning(f"Regression in {row.benchmark} @ {row.rows:,} rows: {row.regression} "
+                        f"({row.time_ratio:.2f}x time, {row.memory_ratio:.2f}x memory)")
+    return 1 if args.fail_on_regression and len(regressions) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,33 +1,75 @@
+from dataclasses import replace
 import pandas as pd
 from scipy import stats
 import statsmodels.api as sm
 from statsmodels.formula.api import ols
-from statsmodels.stats.multicomp import pairwise_tukeyhsd
 from load_data import load_csv
+from anova import group_summary, one_way_anova, welch_anova
+from posthoc import describe_posthoc, pairwise_posthoc
+from hypothesis_runner import RESAMPLING_TESTS, prepare_hypothesis_frame, run_hypothesis_tests
 
 
-def statistic_hyphotesis_test(df, alpha):
-    try:
-        # Convert numeric columns to appropriate types, coercing errors
-        df['TotalPremium'] = pd.to_numeric(df['TotalPremium'], errors='coerce')
-        df['TotalClaims'] = pd.to_numeric(df['TotalClaims'], errors='coerce')
+def anova_pvalue(data, value_column, group_column, method='sufficient'):
+    """
+    p-value of a one-way ANOVA of `value_column` across `group_column`.
+
+    Parameters:
+    - data (pd.DataFrame): Data holding both columns.
+    - value_column (str): Numeric column, e.g. 'TotalClaims'.
+    - group_column (str): Grouping column, e.g. 'PostalCode'.
+    - method (str): 'sufficient' (per-group count/sum/sum-of-squares, the default),
+      'welch' (Welch ANOVA from the same statistics) or 'ols' (statsmodels dummy regression).
+
+    Returns:
+    - float: The ANOVA p-value.
+    """
+    if method == 'ols':
+        model = ols(f'{value_column} ~ C({group_column})', data=data).fit()
+        return sm.stats.anova_lm(model, typ=2)['PR(>F)'].iloc[0]
+    if method == 'welch':
+        return welch_anova(data[value_column], data[group_column]).pvalue
+    if method == 'sufficient':
+        return one_way_anova(data[value_column], data[group_column]).pvalue
+    raise ValueError(f"Unknown ANOVA method: {method}")
+
+
+def posthoc_table(data, value_column, group_column, alpha, top_n=20, method='tukey-kramer', correction=None):
+    """
+    Most significant pairs of `value_column` across `group_column`.
+
+    Parameters:
+    - data (pd.DataFrame): Data holding both columns.
+    - value_column (str): Numeric column.
+    - group_column (str): Grouping column.
+    - alpha (float): Significance level.
+    - top_n (int): Number of pairs to return.
+    - method (str): 'tukey-kramer' or 'games-howell'.
+    - correction (str, optional): None, 'holm' or 'fdr_bh' (see posthoc.pairwise_posthoc).
 
-        # Drop rows where essential numeric data is missing
-        df.dropna(subset=['TotalPremium', 'TotalClaims', 'Province',
-                          'PostalCode', 'Gender'], inplace=True)
+    Returns:
+    - pd.DataFrame: See posthoc.pairwise_posthoc.
+    """
+    summary = group_summary(data[value_column], data[group_column])
+    return pairwise_posthoc(summary, method=method, alpha=alpha, correction=correction, top_n=top_n)
 
-        # Handle empty strings in 'Gender' and 'Citizenship' by treating them as NaN and then dropping or imputing
-        # For 'Gender', you might want to map 'Mr'/'Mrs'/'Ms' from 'Title' column if Gender is mostly empty.
-        # For this script, we'll just drop empty/whitespace strings.
-        df['Gender'].replace(r'^\s*$', pd.NA, regex=True, inplace=True)
-        # Drop rows where gender is still missing/empty
-        df.dropna(subset=['Gender'], inplace=True)
 
-        # Create 'HasClaim' indicator: 1 if TotalClaims > 0, else 0
-        df['HasClaim'] = (df['TotalClaims'] > 0).astype(int)
+def _posthoc_header(title, table, method, correction):
+    """Header line of a post-hoc table, naming the method and how many pairs are shown."""
+    return (f"  {describe_posthoc(method, correction)} for {title} "
+            f"(top {len(table)} of {table.attrs['n_pairs']:,} pairs):")
 
-        # Calculate Margin: TotalPremium - TotalClaims
-        df['Margin'] = df['TotalPremium'] - df['TotalClaims']
+
+def statistic_hyphotesis_test(df, alpha, anova_method='sufficient', posthoc_top_n=20, n_resamples=0,
+                              posthoc_method=None, posthoc_correction=None):
+    # Games-Howell matches Welch's ANOVA (unequal variances); Tukey-Kramer matches the classic F test.
+    if posthoc_method is None:
+        posthoc_method = 'games-howell' if anova_method == 'welch' else 'tukey-kramer'
+    try:
+        # Coerce TotalPremium/TotalClaims to numbers, drop rows missing them or a
+        # dimension (blank Gender strings count as missing) and add HasClaim
+        # (1 if TotalClaims > 0) and Margin (TotalPremium - TotalClaims).
+        # This works on a copy, so the caller's DataFrame is left untouched.
+        df = prepare_hypothesis_frame(df)
 
         # Filter for Claim Severity: only consider policies with claims
         df_claims_only = df[df['HasClaim'] == 1].copy()
@@ -62,22 +104,20 @@ def statistic_hyphotesis_test(df, alpha):
         if not df_claims_only['Province'].empty:
             # Check if there's enough data and variance within provinces for ANOVA
             if len(df_claims_only['Province'].unique()) > 1 and len(df_claims_only) > len(df_claims_only['Province'].unique()):
-                model_severity_province = ols(
-                    'TotalClaims ~ C(Province)', data=df_claims_only).fit()
-                anova_table_severity_province = sm.stats.anova_lm(
-                    model_severity_province, typ=2)
-                p_val_severity_province = anova_table_severity_province['PR(>F)'][0]
+                p_val_severity_province = anova_pvalue(
+                    df_claims_only, 'TotalClaims', 'Province', anova_method)
                 print(
                     f"Claim Severity by Province (ANOVA): p-value = {p_val_severity_province:.4f}")
                 if p_val_severity_province < alpha:
                     print(
                         f"  Reject H₀: There is a significant difference in claim severity across provinces (p < {alpha}).")
-                    # Perform Tukey's HSD post-hoc test if ANOVA is significant
-                    tukey_severity_province = pairwise_tukeyhsd(endog=df_claims_only['TotalClaims'],
-                                                                groups=df_claims_only['Province'],
-                                                                alpha=alpha)
-                    print("  Tukey's HSD Post-hoc Test for Claim Severity by Province:")
-                    print(tukey_severity_province)
+                    # Perform a post-hoc test if ANOVA is significant
+                    posthoc_severity_province = posthoc_table(
+                        df_claims_only, 'TotalClaims', 'Province', alpha, posthoc_top_n,
+                        posthoc_method, posthoc_correction)
+                    print(_posthoc_header('Claim Severity by Province', posthoc_severity_province,
+                                          posthoc_method, posthoc_correction))
+                    print(posthoc_severity_province.to_string(index=False))
                 else:
                     print(
                         f"  Fail to reject H₀: No significant difference in claim severity across provinces (p >= {alpha}).")
@@ -134,22 +174,20 @@ def statistic_hyphotesis_test(df, alpha):
                     valid_postal_codes_for_anova)].copy()
 
                 if len(df_claims_only_filtered_zip['PostalCode'].unique()) > 1:
-                    model_severity_zip = ols(
-                        'TotalClaims ~ C(PostalCode)', data=df_claims_only_filtered_zip).fit()
-                    anova_table_severity_zip = sm.stats.anova_lm(
-                        model_severity_zip, typ=2)
-                    p_val_severity_zip = anova_table_severity_zip['PR(>F)'][0]
+                    p_val_severity_zip = anova_pvalue(
+                        df_claims_only_filtered_zip, 'TotalClaims', 'PostalCode', anova_method)
                     print(
                         f"Claim Severity by Zip Code (ANOVA): p-value = {p_val_severity_zip:.4f}")
                     if p_val_severity_zip < alpha:
                         print(
                             f"  Reject H₀: There is a significant difference in claim severity between zip codes (p < {alpha}).")
-                        # Perform Tukey's HSD post-hoc test if ANOVA is significant
-                        tukey_severity_zip = pairwise_tukeyhsd(endog=df_claims_only_filtered_zip['TotalClaims'],
-                                                               groups=df_claims_only_filtered_zip['PostalCode'], alpha=alpha)
-                        print(
-                            "Tukey's HSD Post-hoc Test for Claim Severity by Zip Code:")
-                        print(tukey_severity_zip)
+                        # Perform a post-hoc test if ANOVA is significant
+                        posthoc_severity_zip = posthoc_table(
+                            df_claims_only_filtered_zip, 'TotalClaims', 'PostalCode', alpha, posthoc_top_n,
+                            posthoc_method, posthoc_correction)
+                        print(_posthoc_header('Claim Severity by Zip Code', posthoc_severity_zip,
+                                              posthoc_method, posthoc_correction))
+                        print(posthoc_severity_zip.to_string(index=False))
                     else:
                         print(
                             f"  Fail to reject H₀: No significant difference in claim severity between zip codes (p >= {alpha}).")
@@ -177,22 +215,20 @@ def statistic_hyphotesis_test(df, alpha):
                     valid_postal_codes_for_anova_margin)].copy()
 
                 if len(df_filtered_zip_margin['PostalCode'].unique()) > 1:
-                    model_margin_zip = ols(
-                        'Margin ~ C(PostalCode)', data=df_filtered_zip_margin).fit()
-                    anova_table_margin_zip = sm.stats.anova_lm(
-                        model_margin_zip, typ=2)
-                    p_val_margin_zip = anova_table_margin_zip['PR(>F)'][0]
+                    p_val_margin_zip = anova_pvalue(
+                        df_filtered_zip_margin, 'Margin', 'PostalCode', anova_method)
                     print(
                         f"Margin by Zip Code (ANOVA): p-value = {p_val_margin_zip:.4f}")
                     if p_val_margin_zip < alpha:
                         print(
                             f"  Reject H₀: There is a significant difference in margin between zip codes (p < {alpha}).")
-                        # Perform Tukey's HSD post-hoc test if ANOVA is significant
-                        tukey_margin_zip = pairwise_tukeyhsd(endog=df_filtered_zip_margin['Margin'],
-                                                             groups=df_filtered_zip_margin['PostalCode'],
-                                                             alpha=alpha)
-                        print("  Tukey's HSD Post-hoc Test for Margin by Zip Code:")
-                        print(tukey_margin_zip)
+                        # Perform a post-hoc test if ANOVA is significant
+                        posthoc_margin_zip = posthoc_table(
+                            df_filtered_zip_margin, 'Margin', 'PostalCode', alpha, posthoc_top_n,
+                            posthoc_method, posthoc_correction)
+                        print(_posthoc_header('Margin by Zip Code', posthoc_margin_zip,
+                                              posthoc_method, posthoc_correction))
+                        print(posthoc_margin_zip.to_string(index=False))
                     else:
                         print(
                             f"  Fail to reject H₀: No significant difference in margin between zip codes (p >= {alpha}).")
@@ -266,6 +302,18 @@ def statistic_hyphotesis_test(df, alpha):
                     "  Not enough valid 'Gender' data (need both 'Male' and 'Female' with claims) after cleaning for t-test.")
         else:
             print("  'Gender' column is missing or empty in claims data after cleaning.")
+
+        # Resampling versions of the severity tests, which do not assume normal claims
+        if n_resamples > 0:
+            print("\n" + "-"*60 + "\n")
+            print(f"--- Claim Severity Resampling Tests ({n_resamples:,} resamples) ---")
+            tests = [replace(spec, n_resamples=n_resamples) for spec in RESAMPLING_TESTS]
+            for result in run_hypothesis_tests(df, tests, alpha):
+                if result.error:
+                    print(f"{result.name}: not run ({result.error})")
+                else:
+                    decision = "Reject H₀" if result.reject else "Fail to reject H₀"
+                    print(f"{result.name}: p-value = {result.pvalue:.4f} over {result.n_groups} groups ({decision}).")
         print("\n" + "="*80 + "\n")
 
         print("\n--- Interpretation Guidelines ---")
@@ -275,7 +323,8 @@ def statistic_hyphotesis_test(df, alpha):
             f"If p-value < {alpha}: Reject the Null Hypothesis (H₀). This means there's statistically significant evidence of a difference.")
         print(
             f"If p-value >= {alpha}: Fail to Reject the Null Hypothesis (H₀). This means there's no statistically significant evidence of a difference.")
-        print("\nFor ANOVA tests, if the p-value is significant, a Tukey's HSD Post-hoc test is performed to identify which specific groups differ.")
+        print(f"\nFor ANOVA tests, if the p-value is significant, a {describe_posthoc(posthoc_method, posthoc_correction)} "
+              "is performed to identify which specific groups differ.")
 
     except FileNotFoundError:
         print(
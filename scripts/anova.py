@@ -0,0 +1,165 @@
+from dataclasses import asdict, dataclass
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+@dataclass
+class AnovaResult:
+    """F statistic and p-value of a one-way (or Welch) ANOVA."""
+    statistic: float
+    pvalue: float
+    df_between: float
+    df_within: float
+    n_groups: int
+    n_obs: int
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def group_summary(values, groups) -> pd.DataFrame:
+    """
+    Per-group count, sum and sum of squares in a single grouped pass.
+
+    Rows with a missing group or a non-finite value are ignored.
+
+    Parameters:
+    - values (array-like): Numeric observations.
+    - groups (array-like): Group label of each observation.
+
+    Returns:
+    - pd.DataFrame: Indexed by group label with columns count, sum and sumsq.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    codes, labels = pd.factorize(pd.Series(groups), sort=True)
+    keep = (codes >= 0) & np.isfinite(values)
+    codes, values = codes[keep], values[keep]
+    k = len(labels)
+    summary = pd.DataFrame({
+        'count': np.bincount(codes, minlength=k).astype(np.int64),
+        'sum': np.bincount(codes, weights=values, minlength=k),
+        'sumsq': np.bincount(codes, weights=values * values, minlength=k),
+    }, index=pd.Index(np.asarray(labels), name='group'))
+    return summary[summary['count'] > 0]
+
+
+def summary_moments(summary: pd.DataFrame) -> pd.DataFrame:
+    """
+    Mean, within-group sum of squares and sample variance from a group summary.
+
+    Parameters:
+    - summary (pd.DataFrame): Output of group_summary (count, sum, sumsq).
+
+    Returns:
+    - pd.DataFrame: Columns count, mean, ss and var (NaN for single-observation groups).
+    """
+    n = summary['count'].to_numpy(dtype=np.float64)
+    mean = summary['sum'].to_numpy() / n
+    ss = np.maximum(summary['sumsq'].to_numpy() - summary['sum'].to_numpy() * mean, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var = np.where(n > 1, ss / (n - 1), np.nan)
+    return pd.DataFrame({'count': summary['count'].to_numpy(), 'mean': mean, 'ss': ss, 'var': var},
+                        index=summary.index)
+
+
+def anova_from_summary(summary: pd.DataFrame) -> AnovaResult:
+    """
+    Classic one-way ANOVA from per-group count, sum and sum of squares.
+
+    Gives the same F and p-value as `anova_lm(ols('y ~ C(group)'))` in
+    O(k) time, without building a dummy design matrix.
+
+    Parameters:
+    - summary (pd.DataFrame): Output of group_summary.
+
+    Returns:
+    - AnovaResult: F statistic, p-value and degrees of freedom.
+    """
+    moments = summary_moments(summary)
+    n = moments['count'].to_numpy(dtype=np.float64)
+    k, n_obs = len(n), int(n.sum())
+    if k < 2 or n_obs <= k:
+        raise ValueError("ANOVA needs at least two groups and more observations than groups.")
+
+    grand_mean = summary['sum'].sum() / n_obs
+    ss_between = float(np.sum(n * (moments['mean'].to_numpy() - grand_mean) ** 2))
+    ss_within = float(moments['ss'].sum())
+    df_between, df_within = k - 1, n_obs - k
+    if ss_between == 0 and ss_within == 0:
+        # Constant data: F is 0/0, undefined as in anova_lm.
+        return AnovaResult(np.nan, np.nan, df_between, df_within, k, n_obs)
+    statistic = (ss_between / df_between) / (ss_within / df_within) if ss_within > 0 else np.inf
+    pvalue = float(stats.f.sf(statistic, df_between, df_within))
+    return AnovaResult(float(statistic), pvalue, df_between, df_within, k, n_obs)
+
+
+def welch_anova_from_summary(summary: pd.DataFrame) -> AnovaResult:
+    """
+    Welch's heteroscedastic one-way ANOVA from a group summary.
+
+    Groups with fewer than two observations or zero variance carry no
+    variance information and are left out.
+
+    Parameters:
+    - summary (pd.DataFrame): Output of group_summary.
+
+    Returns:
+    - AnovaResult: Welch F statistic, p-value and (fractional) degrees of freedom.
+    """
+    moments = summary_moments(summary)
+    moments = moments[moments['var'] > 0]
+    n = moments['count'].to_numpy(dtype=np.float64)
+    k = len(n)
+    if k < 2:
+        raise ValueError("Welch ANOVA needs at least two groups with non-zero variance.")
+
+    w = n / moments['var'].to_numpy()
+    mean = moments['mean'].to_numpy()
+    weighted_mean = np.sum(w * mean) / w.sum()
+    between = np.sum(w * (mean - weighted_mean) ** 2) / (k - 1)
+    tmp = np.sum((1 - w / w.sum()) ** 2 / (n - 1))
+    statistic = between / (1 + 2 * (k - 2) * tmp / (k ** 2 - 1))
+    df_within = (k ** 2 - 1) / (3 * tmp)
+    pvalue = float(stats.f.sf(statistic, k - 1, df_within))
+    return AnovaResult(float(statistic), pvalue, k - 1, float(df_within), k, int(n.sum()))
+
+
+def _centered(values):
+    """Center values on their mean; ANOVA is shift invariant and this keeps sum-of-squares accurate."""
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.isfinite(values)
+    return values - (values[finite].mean() if finite.any() else 0.0)
+
+
+def one_way_anova(values, groups) -> AnovaResult:
+    """
+    One-way ANOVA of `values` across `groups` in O(n + k) time and memory.
+
+    Parameters:
+    - values (array-like): Numeric observations, e.g. TotalClaims.
+    - groups (array-like): Group label of each observation, e.g. PostalCode.
+
+    Returns:
+    - AnovaResult: F statistic, p-value and degrees of freedom.
+    """
+    return anova_from_summary(group_summary(_centered(values), groups))
+
+
+def welch_anova(values, groups) -> AnovaResult:
+    """
+    Welch's one-way ANOVA of `values` across `groups` in O(n + k) time and memory.
+
+    Parameters:
+    - values (array-like): Numeric observations.
+    - groups (array-like): Group label of each observation.
+
+    Returns:
+    - AnovaResult: Welch F statistic, p-value and degrees of freedom.
+    """
+    return welch_anova_from_summary(group_summary(_centered(values), groups))
@@ -0,0 +1,404 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from anova import anova_from_summary, group_summary, welch_anova_from_summary
+from resampling import bootstrap_test, permutation_test
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+TEST_TYPES = ('chi2', 'anova', 'welch_anova', 'ttest', 'permutation', 'bootstrap')
+# Tests that resample rows and therefore cannot run from group summaries.
+RESAMPLING_TEST_TYPES = {'permutation': permutation_test, 'bootstrap': bootstrap_test}
+
+
+@dataclass(frozen=True)
+class HypothesisSpec:
+    """
+    Declarative description of one hypothesis test.
+
+    - name: Identifier used in reports.
+    - dimension: Grouping column, e.g. 'Province'.
+    - metric: 'HasClaim' (claim frequency), 'TotalClaims' (severity) or 'Margin'.
+    - test: 'chi2', 'anova', 'welch_anova', 'ttest' (Welch two-sample t-test), or
+      'permutation' / 'bootstrap' (resampling tests of equal group means).
+    - subset: 'all' rows, or only the rows with a claim ('claims').
+    - groups: Optional levels to keep, e.g. ('Male', 'Female').
+    - min_group_size: Groups with fewer rows are left out.
+    - n_resamples, seed: Number of resamples and seed of the resampling tests.
+    """
+    name: str
+    dimension: str
+    metric: str
+    test: str
+    subset: str = 'all'
+    groups: Optional[Tuple[str, ...]] = None
+    min_group_size: int = 1
+    n_resamples: int = 10_000
+    seed: int = 0
+
+
+@dataclass
+class HypothesisResult:
+    """Outcome of one hypothesis test."""
+    name: str
+    dimension: str
+    metric: str
+    test: str
+    statistic: float = float('nan')
+    pvalue: float = float('nan')
+    dof: float = float('nan')
+    n_obs: int = 0
+    n_groups: int = 0
+    group_counts: Dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+    reject: bool = False
+    error: Optional[str] = None
+
+    def to_dict(self):
+        return asdict(self)
+
+
+# The four hypotheses of statistic_hyphotesis_test, as declarative specs.
+DEFAULT_TESTS = [
+    HypothesisSpec('province_claim_frequency', 'Province', 'HasClaim', 'chi2'),
+    HypothesisSpec('province_claim_severity', 'Province', 'TotalClaims', 'anova', subset='claims'),
+    HypothesisSpec('zip_claim_frequency', 'PostalCode', 'HasClaim', 'chi2'),
+    HypothesisSpec('zip_claim_severity', 'PostalCode', 'TotalClaims', 'anova', subset='claims',
+                   min_group_size=2),
+    HypothesisSpec('zip_margin', 'PostalCode', 'Margin', 'anova', min_group_size=2),
+    HypothesisSpec('gender_claim_frequency', 'Gender', 'HasClaim', 'chi2', groups=('Male', 'Female')),
+    HypothesisSpec('gender_claim_severity', 'Gender', 'TotalClaims', 'ttest', subset='claims',
+                   groups=('Male', 'Female')),
+]
+
+# Resampling versions of the severity tests, with no normality assumption. The
+# permutation tests keep every postal code; the bootstrap needs a few claims
+# per group to mimic its spread.
+RESAMPLING_TESTS = [
+    HypothesisSpec(f'{name}_claim_severity_{test}', dimension, 'TotalClaims', test, subset='claims',
+                   groups=groups, min_group_size=min_size if test == 'bootstrap' else 1)
+    for test in ('permutation', 'bootstrap')
+    for name, dimension, groups, min_size in (('province', 'Province', None, 2),
+                                              ('zip', 'PostalCode', None, 10),
+                                              ('gender', 'Gender', ('Male', 'Female'), 2))
+]
+
+
+def prepare_hypothesis_frame(df, dimensions=('Province', 'PostalCode', 'Gender')):
+    """
+    Clean the columns the hypothesis tests need, without touching the caller's frame.
+
+    Premiums and claims are coerced to numbers, rows missing any of them or a
+    dimension are dropped (blank Gender strings count as missing), and the
+    HasClaim and Margin columns are added.
+
+    Parameters:
+    - df (pd.DataFrame): Policy data.
+    - dimensions (iterable): Grouping columns to keep.
+
+    Returns:
+    - pd.DataFrame: A new frame with the dimensions, TotalPremium, TotalClaims, HasClaim and Margin.
+    """
+    dimensions = list(dict.fromkeys(dimensions))
+    frame = df[dimensions + ['TotalPremium', 'TotalClaims']].copy()
+    frame['TotalPremium'] = pd.to_numeric(frame['TotalPremium'], errors='coerce')
+    frame['TotalClaims'] = pd.to_numeric(frame['TotalClaims'], errors='coerce')
+    frame = frame.dropna(subset=list(frame.columns))
+    if 'Gender' in frame.columns:
+        frame = frame[frame['Gender'].astype(str).str.strip() != '']
+    frame['HasClaim'] = (frame['TotalClaims'] > 0).astype(int)
+    frame['Margin'] = frame['TotalPremium'] - frame['TotalClaims']
+    return frame
+
+
+def _column_arrays(frame, dimensions):
+    """Split a prepared frame into flat NumPy arrays plus the labels behind each code array."""
+    columns, labels = {}, {}
+    for dim in dimensions:
+        codes, uniques = pd.factorize(frame[dim], sort=True)
+        columns[f'{dim}__codes'] = codes.astype(np.int32)
+        labels[dim] = [str(u) for u in np.asarray(uniques)]
+    columns['HasClaim'] = frame['HasClaim'].to_numpy(dtype=np.int8)
+    columns['TotalClaims'] = frame['TotalClaims'].to_numpy(dtype=np.float64)
+    columns['Margin'] = frame['Margin'].to_numpy(dtype=np.float64)
+    return columns, labels
+
+
+def evaluate_from_summary(spec, summary, alpha=0.05):
+    """
+    Run one hypothesis test from per-group summary statistics.
+
+    Parameters:
+    - spec (HypothesisSpec): The test to run.
+    - summary (pd.DataFrame): Indexed by group label. Chi-squared tests need the
+      columns n (rows) and n_claims; the other tests need count, sum and sumsq
+      of the metric over the spec's subset.
+    - alpha (float): Significance level.
+
+    Returns:
+    - HypothesisResult: The result, with `error` set instead of raising when the test cannot run.
+    """
+    start = time.perf_counter()
+    result = HypothesisResult(spec.name, spec.dimension, spec.metric, spec.test)
+    try:
+        if spec.test not in TEST_TYPES:
+            raise ValueError(f"Unknown test type: {spec.test}")
+        if spec.test in RESAMPLING_TEST_TYPES:
+            raise ValueError(f"A {spec.test} test needs row-level data, not group summaries.")
+        size_column = 'n' if spec.test == 'chi2' else 'count'
+        if spec.groups is not None:
+            summary = summary.loc[[g for g in spec.groups if g in summary.index]]
+        summary = summary[summary[size_column] >= max(spec.min_group_size, 1)]
+        result.group_counts = {str(g): int(c) for g, c in summary[size_column].items()}
+        result.n_groups = len(summary)
+        result.n_obs = int(summary[size_column].sum())
+
+        if spec.test == 'chi2':
+            n_claims = summary['n_claims'].to_numpy()
+            table = np.column_stack([summary['n'].to_numpy() - n_claims, n_claims])
+            table = table[:, table.sum(axis=0) > 0]
+            if table.shape[0] < 2 or table.shape[1] < 2:
+                raise ValueError(f"Not enough variation in '{spec.dimension}' or 'HasClaim'.")
+            statistic, pvalue, dof, _ = stats.chi2_contingency(table)
+        elif spec.test == 'anova':
+            anova = anova_from_summary(summary)
+            statistic, pvalue, dof = anova.statistic, anova.pvalue, anova.df_within
+        elif spec.test == 'welch_anova':
+            anova = welch_anova_from_summary(summary)
+            statistic, pvalue, dof = anova.statistic, anova.pvalue, anova.df_within
+        else:
+            statistic, pvalue, dof = _welch_ttest(summary)
+
+        result.statistic, result.pvalue, result.dof = float(statistic), float(pvalue), float(dof)
+        result.reject = bool(result.pvalue < alpha)
+    except Exception as e:
+        result.error = str(e)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def evaluate_hypothesis(spec, columns, labels, alpha=0.05):
+    """
+    Run one hypothesis test on prepared column arrays.
+
+    A single grouped pass reduces the rows to per-group statistics, which
+    evaluate_from_summary then tests.
+
+    Parameters:
+    - spec (HypothesisSpec): The test to run.
+    - columns (dict): Arrays from the prepared frame (codes per dimension, HasClaim,
+      TotalClaims, Margin); they are only read.
+    - labels (dict): Group labels behind each dimension's codes.
+    - alpha (float): Significance level.
+
+    Returns:
+    - HypothesisResult: The result, with `error` set instead of raising when the test cannot run.
+    """
+    start = time.perf_counter()
+    try:
+        codes = columns[f'{spec.dimension}__codes']
+        dim_labels = pd.Index(labels[spec.dimension], name='group')
+        mask = codes >= 0
+        if spec.subset == 'claims':
+            mask &= columns['HasClaim'] == 1
+        codes = codes[mask]
+        k = len(dim_labels)
+
+        if spec.test in RESAMPLING_TEST_TYPES:
+            return _evaluate_resampling(spec, columns[spec.metric][mask], codes, dim_labels, alpha, start)
+        if spec.test == 'chi2':
+            summary = pd.DataFrame({
+                'n': np.bincount(codes, minlength=k),
+                'n_claims': np.bincount(codes, weights=columns['HasClaim'][mask], minlength=k).astype(np.int64),
+            }, index=dim_labels)
+            summary = summary[summary['n'] > 0]
+        else:
+            values = columns[spec.metric][mask]
+            # Centering keeps the sums of squares accurate; the tests are shift invariant.
+            summary = group_summary(values - (values.mean() if len(values) else 0.0), codes)
+            summary.index = dim_labels[summary.index]
+    except Exception as e:
+        return HypothesisResult(spec.name, spec.dimension, spec.metric, spec.test, error=str(e),
+                                seconds=time.perf_counter() - start)
+
+    result = evaluate_from_summary(spec, summary, alpha)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def _evaluate_resampling(spec, values, codes, labels, alpha, start):
+    """Permutation or bootstrap test on the rows of the groups a spec keeps."""
+    result = HypothesisResult(spec.name, spec.dimension, spec.metric, spec.test)
+    try:
+        counts = np.bincount(codes, minlength=len(labels))
+        keep = counts >= max(spec.min_group_size, 1)
+        if spec.groups is not None:
+            keep &= labels.isin(spec.groups)
+        rows = keep[codes]
+        result.group_counts = {str(labels[g]): int(counts[g]) for g in np.flatnonzero(keep)}
+        outcome = RESAMPLING_TEST_TYPES[spec.test](values[rows], codes[rows], spec.n_resamples, spec.seed)
+        result.statistic, result.pvalue = outcome.statistic, outcome.pvalue
+        result.n_obs, result.n_groups = outcome.n_obs, outcome.n_groups
+        result.reject = bool(result.pvalue < alpha)
+    except Exception as e:
+        result.error = str(e)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def _welch_ttest(summary):
+    """Welch two-sample t-test between the two groups of a summary, in index order."""
+    if len(summary) != 2:
+        raise ValueError("A t-test needs exactly two groups with data.")
+    n = summary['count'].to_numpy(dtype=np.float64)
+    if (n < 2).any():
+        raise ValueError("A t-test needs at least two observations per group.")
+    mean = summary['sum'].to_numpy() / n
+    var = (summary['sumsq'].to_numpy() - summary['sum'].to_numpy() * mean) / (n - 1)
+    statistic, pvalue = stats.ttest_ind_from_stats(mean[0], np.sqrt(var[0]), n[0],
+                                                   mean[1], np.sqrt(var[1]), n[1], equal_var=False)
+    se2 = var / n
+    dof = se2.sum() ** 2 / np.sum(se2 ** 2 / (n - 1))
+    return statistic, pvalue, dof
+
+
+# Read-only views of the shared columns inside each worker process.
+_WORKER_COLUMNS = {}
+_WORKER_SEGMENTS = []
+
+
+def _attach_shared_columns(layout, labels):
+    """Process-pool initializer: map the parent's shared memory blocks as read-only arrays."""
+    for name, (shm_name, dtype, shape) in layout.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _WORKER_SEGMENTS.append(shm)
+        array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        array.flags.writeable = False
+        _WORKER_COLUMNS[name] = array
+    _WORKER_COLUMNS['__labels__'] = labels
+
+
+def _evaluate_in_worker(spec, alpha):
+    return evaluate_hypothesis(spec, _WORKER_COLUMNS, _WORKER_COLUMNS['__labels__'], alpha)
+
+
+def _share_columns(columns):
+    """Copy each array once into shared memory; returns the segments and a picklable layout."""
+    segments, layout = [], {}
+    for name, array in columns.items():
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+        segments.append(shm)
+        layout[name] = (shm.name, array.dtype.str, array.shape)
+    return segments, layout
+
+
+def run_hypothesis_tests(df, tests=None, alpha=0.05, n_jobs=1) -> List[HypothesisResult]:
+    """
+    Run a list of hypothesis tests and return structured results.
+
+    The needed columns are prepared once. With n_jobs > 1 they are placed in
+    shared memory and the independent tests run in a process pool, each
+    worker reading the same buffers without copying them.
+
+    Parameters:
+    - df (pd.DataFrame): Policy data; it is not modified.
+    - tests (list of HypothesisSpec, optional): Tests to run, DEFAULT_TESTS by default.
+    - alpha (float): Significance level.
+    - n_jobs (int): Number of worker processes; -1 uses every core.
+
+    Returns:
+    - list of HypothesisResult: One result per test, in the order given.
+    """
+    tests = list(DEFAULT_TESTS if tests is None else tests)
+    dimensions = list(dict.fromkeys(spec.dimension for spec in tests))
+    columns, labels = _column_arrays(prepare_hypothesis_frame(df, dimensions), dimensions)
+
+    n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+    n_jobs = max(1, min(n_jobs, len(tests)))
+    if n_jobs == 1:
+        results = [evaluate_hypothesis(spec, columns, labels, alpha) for spec in tests]
+    else:
+        segments, layout = _share_columns(columns)
+        del columns
+        try:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach_shared_columns,
+                                     initargs=(layout, labels)) as pool:
+                results = list(pool.map(_evaluate_in_worker, tests, [alpha] * len(tests)))
+        finally:
+            for shm in segments:
+                shm.close()
+                shm.unlink()
+
+    for result in results:
+        if result.error:
+            logging.warning(f"{result.name}: {result.error}")
+        else:
+            logging.info(f"{result.name}: {result.test} statistic={result.statistic:.4f}, "
+                         f"p-value={result.pvalue:.4g} ({result.seconds:.3f}s)")
+    return results
+
+
+def results_to_frame(results) -> pd.DataFrame:
+    """
+    Tabulate hypothesis results, one row per test.
+
+    Parameters:
+    - results (list of HypothesisResult): Results to tabulate.
+
+    Returns:
+    - pd.DataFrame: One column per result field; group_counts is kept as a JSON string.
+    """
+    rows = [result.to_dict() for result in results]
+    for row in rows:
+        row['group_counts'] = json.dumps(row['group_counts'])
+    return pd.DataFrame(rows, columns=[f for f in HypothesisResult.__dataclass_fields__])
+
+
+def save_results(results, path):
+    """
+    Write hypothesis results to JSON or Parquet, chosen by the file extension.
+
+    Parameters:
+    - results (list of HypothesisResult): Results to save.
+    - path (str): Destination ending in '.json' or '.parquet'.
+    """
+    if path.endswith('.json'):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([result.to_dict() for result in results], f, indent=2)
+    elif path.endswith('.parquet'):
+        results_to_frame(results).to_parquet(path, index=False)
+    else:
+        raise ValueError(f"Unsupported results format: {path}")
+    logging.info(f"Saved {len(results)} hypothesis results to {path}.")
+
+
+def load_results(path) -> List[HypothesisResult]:
+    """
+    Read hypothesis results written by save_results.
+
+    Parameters:
+    - path (str): A '.json' or '.parquet' results file.
+
+    Returns:
+    - list of HypothesisResult: The saved results.
+    """
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            rows = json.load(f)
+    else:
+        rows = pd.read_parquet(path).to_dict('records')
+        for row in rows:
+            row['group_counts'] = json.loads(row['group_counts'])
+    return [HypothesisResult(**row) for row in rows]
@@ -0,0 +1,198 @@
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from hypothesis_runner import DEFAULT_TESTS, HypothesisResult, evaluate_from_summary, prepare_hypothesis_frame
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+DIMENSIONS = ('Province', 'PostalCode', 'Gender')
+KEY_COLUMNS = ['dimension', 'group']
+STAT_COLUMNS = ['n', 'n_claims', 'claims_sum', 'claims_sumsq', 'margin_sum', 'margin_sumsq']
+
+
+def _normalize_months(values):
+    """Distinct months of a TransactionMonth-like column as 'YYYY-MM' strings."""
+    unique = pd.Series(pd.unique(values.dropna()))
+    return sorted(set(pd.to_datetime(unique.astype(str)).dt.strftime('%Y-%m')))
+
+
+def _group_label(value):
+    """
+    Canonical string key of a group level.
+
+    Integral floats are written as integers, so a PostalCode read as float in one
+    month (because of a missing value upstream) keys the same groups as an int month.
+    """
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def segment_summaries(df, dimensions=DIMENSIONS) -> pd.DataFrame:
+    """
+    Additive per-segment statistics of one batch of policies.
+
+    For every level of every dimension it counts rows and claims (the HasClaim
+    contingency table), and sums TotalClaims and its square over the rows with
+    a claim, and Margin and its square over all rows.
+
+    Parameters:
+    - df (pd.DataFrame): Policy data; it is not modified.
+    - dimensions (iterable): Grouping columns.
+
+    Returns:
+    - pd.DataFrame: Columns dimension, group (as a string) and the statistics in STAT_COLUMNS.
+    """
+    frame = prepare_hypothesis_frame(df, dimensions)
+    has_claim = frame['HasClaim'].to_numpy(dtype=np.float64)
+    claims = frame['TotalClaims'].to_numpy(dtype=np.float64) * has_claim
+    margin = frame['Margin'].to_numpy(dtype=np.float64)
+
+    parts = []
+    for dim in dimensions:
+        codes, uniques = pd.factorize(frame[dim], sort=True)
+        k = len(uniques)
+        parts.append(pd.DataFrame({
+            'dimension': dim,
+            'group': [_group_label(u) for u in np.asarray(uniques)],
+            'n': np.bincount(codes, minlength=k),
+            'n_claims': np.bincount(codes, weights=has_claim, minlength=k).astype(np.int64),
+            'claims_sum': np.bincount(codes, weights=claims, minlength=k),
+            'claims_sumsq': np.bincount(codes, weights=claims * claims, minlength=k),
+            'margin_sum': np.bincount(codes, weights=margin, minlength=k),
+            'margin_sumsq': np.bincount(codes, weights=margin * margin, minlength=k),
+        }))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=KEY_COLUMNS + STAT_COLUMNS)
+
+
+class SegmentStatsStore:
+    """
+    Mergeable summaries behind the hypothesis tests, kept across monthly data drops.
+
+    Every statistic is a count or a sum, so folding in a new month, or merging
+    partitions built by different workers, is a group-wise addition. The tests
+    are then recomputed from the summaries in time proportional to the number
+    of groups instead of the number of policies.
+    """
+
+    def __init__(self, dimensions=DIMENSIONS, table=None, months=()):
+        self.dimensions = tuple(dimensions)
+        self.table = table if table is not None else pd.DataFrame(columns=KEY_COLUMNS + STAT_COLUMNS)
+        self.months = sorted(months)
+
+    @classmethod
+    def from_frame(cls, df, dimensions=DIMENSIONS, month_column='TransactionMonth'):
+        """Build a store from one batch of policies (a month, a partition or the full history)."""
+        months = _normalize_months(df[month_column]) if month_column in df.columns else []
+        return cls(dimensions, segment_summaries(df, dimensions), months)
+
+    def merge(self, other):
+        """
+        Combine two stores into a new one by adding their counts and sums.
+
+        The stores may share months: row partitions of the same month built by
+        different workers merge into that month's totals. Guarding against
+        folding the same month's file in twice is the job of `update`.
+        """
+        tables = [t for t in (self.table, other.table) if not t.empty]
+        table = self.table.copy()
+        if tables:
+            table = pd.concat(tables, ignore_index=True)
+            table = table.groupby(KEY_COLUMNS, as_index=False, sort=True)[STAT_COLUMNS].sum()
+        dimensions = tuple(dict.fromkeys(self.dimensions + other.dimensions))
+        return SegmentStatsStore(dimensions, table, set(self.months) | set(other.months))
+
+    def update(self, df, month_column='TransactionMonth'):
+        """
+        Fold a new batch (typically one month's file) into the store in place.
+
+        Raises ValueError when the batch holds a month the store already
+        contains, which would otherwise double count it, and when the batch has
+        no months to check (missing or empty `month_column`).
+
+        Parameters:
+        - df (pd.DataFrame): The new policies.
+        - month_column (str): Column identifying the batch's months.
+
+        Returns:
+        - SegmentStatsStore: self, for chaining.
+        """
+        batch = SegmentStatsStore.from_frame(df, self.dimensions, month_column)
+        if not batch.months:
+            raise ValueError(f"The batch has no '{month_column}' values, so it cannot be checked "
+                             "against the months already in the store; use merge to add unlabelled partitions.")
+        overlap = set(self.months) & set(batch.months)
+        if overlap:
+            raise ValueError(f"Months already folded into the store: {sorted(overlap)}")
+        merged = self.merge(batch)
+        self.table, self.months = merged.table, merged.months
+        logging.info(f"Folded {len(df):,} rows into the segment store; months: {self.months}.")
+        return self
+
+    def summary_for(self, spec) -> pd.DataFrame:
+        """
+        Per-group summary of the statistic a hypothesis spec tests.
+
+        Parameters:
+        - spec (HypothesisSpec): The test.
+
+        Returns:
+        - pd.DataFrame: Indexed by group; n/n_claims for chi-squared tests, otherwise count/sum/sumsq.
+        """
+        rows = self.table[self.table['dimension'] == spec.dimension].set_index('group')
+        rows.index.name = 'group'
+        if rows.empty:
+            raise ValueError(f"No summaries stored for dimension '{spec.dimension}'.")
+        if spec.test == 'chi2' and spec.subset == 'all':
+            return rows[['n', 'n_claims']]
+        if spec.metric == 'TotalClaims' and spec.subset == 'claims':
+            stats = rows[['n_claims', 'claims_sum', 'claims_sumsq']]
+        elif spec.metric == 'Margin' and spec.subset == 'all':
+            stats = rows[['n', 'margin_sum', 'margin_sumsq']]
+        else:
+            raise ValueError(f"The store does not keep {spec.metric} over '{spec.subset}' rows.")
+        stats.columns = ['count', 'sum', 'sumsq']
+        return stats[stats['count'] > 0]
+
+    def run_tests(self, tests=None, alpha=0.05):
+        """
+        Recompute hypothesis tests from the stored summaries.
+
+        Parameters:
+        - tests (list of HypothesisSpec, optional): Tests to run, DEFAULT_TESTS by default.
+        - alpha (float): Significance level.
+
+        Returns:
+        - list of HypothesisResult: One result per test.
+        """
+        results = []
+        for spec in (DEFAULT_TESTS if tests is None else tests):
+            try:
+                summary = self.summary_for(spec)
+            except ValueError as e:
+                results.append(HypothesisResult(spec.name, spec.dimension, spec.metric, spec.test,
+                                                error=str(e)))
+                continue
+            results.append(evaluate_from_summary(spec, summary, alpha))
+        return results
+
+    def save(self, path):
+        """Write the store to a JSON file."""
+        payload = {'dimensions': list(self.dimensions), 'months': self.months,
+                   'table': self.table.to_dict('list')}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+        logging.info(f"Segment store with {len(self.table)} segments saved to {path}.")
+
+    @classmethod
+    def load(cls, path):
+        """Read a store written by save."""
+        with open(path, encoding='utf-8') as f:
+            payload = json.load(f)
+        table = pd.DataFrame(payload['table'], columns=KEY_COLUMNS + STAT_COLUMNS)
+        table['group'] = table['group'].astype(str)
+        return cls(payload['dimensions'], table, payload['months'])
@@ -1,6 +1,10 @@
 import pandas as pd
+from pandas.api.types import union_categoricals
+import hashlib
 import logging
 import os
+import re
+import time
 
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
@@ -31,20 +35,357 @@ def load_data(file_path, delimeter):
         return None
 
 
-def load_csv(filepath):
+CACHE_DIR_NAME = '.columnar_cache'
+# Marker written next to a cache entry whose CSV could not be stored as Parquet.
+SKIP_SUFFIX = '.uncacheable'
+
+_FILTER_OPS = {
+    '==': lambda s, v: s == v,
+    '=': lambda s, v: s == v,
+    '!=': lambda s, v: s != v,
+    '<': lambda s, v: s < v,
+    '<=': lambda s, v: s <= v,
+    '>': lambda s, v: s > v,
+    '>=': lambda s, v: s >= v,
+    'in': lambda s, v: s.isin(v),
+    'not in': lambda s, v: ~s.isin(v),
+}
+
+
+def _source_key(filepath, cache_key='mtime'):
+    """
+    Fingerprint of a source file used to name its cache entry.
+
+    'mtime' uses size and modification time (cheap); 'hash' uses the md5 of the
+    file content, which survives checkouts that touch the file without changing it.
+    """
+    if cache_key == 'hash':
+        digest = hashlib.md5()
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    st = os.stat(filepath)
+    return hashlib.md5(f"{st.st_size}-{st.st_mtime_ns}".encode()).hexdigest()
+
+
+def cache_path_for(filepath, cache_key='mtime'):
+    """
+    Path of the columnar cache entry for a CSV file.
+
+    The cache lives in a `.columnar_cache` folder next to the CSV and its name
+    embeds the source fingerprint, so a changed CSV never matches a stale entry.
+    """
+    folder = os.path.join(os.path.dirname(os.path.abspath(filepath)), CACHE_DIR_NAME)
+    name = os.path.basename(filepath)
+    return os.path.join(folder, f"{name}.{_source_key(filepath, cache_key)}.parquet")
+
+
+def _drop_stale_entries(filepath, keep):
+    """
+    Remove cache entries of `filepath` other than `keep` (older fingerprints).
+
+    Only `<name>.<fingerprint>.parquet` entries (and their markers) are matched,
+    so the cache of a sibling such as `<name>.bak` is left alone.
+    """
+    folder = os.path.dirname(keep)
+    entry_pattern = re.compile(re.escape(os.path.basename(filepath))
+                               + r'\.[0-9a-f]{32}\.parquet(' + re.escape(SKIP_SUFFIX) + ')?')
+    for entry in os.listdir(folder):
+        path = os.path.join(folder, entry)
+        if entry_pattern.fullmatch(entry) and path not in (keep, keep + SKIP_SUFFIX):
+            os.remove(path)
+
+
+def _build_cache(filepath, cache_file):
+    """Parse the CSV once, write it as Parquet and drop stale entries for the same file."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = pd.read_csv(filepath)
+    folder = os.path.dirname(cache_file)
+    os.makedirs(folder, exist_ok=True)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_file,
+                       row_group_size=100_000)
+    except Exception:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    os.replace(tmp_file, cache_file)
+    _drop_stale_entries(filepath, cache_file)
+    logging.info(f"Columnar cache written to {cache_file}.")
+
+
+def _mark_uncacheable(filepath, cache_file):
+    """Remember that this version of the CSV cannot be cached, so the write is not retried."""
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    with open(cache_file + SKIP_SUFFIX, 'w'):
+        pass
+    _drop_stale_entries(filepath, cache_file)
+
+
+def _iter_filter_terms(filters):
+    """Yield every (column, op, value) term of a pyarrow-style filter."""
+    if not filters:
+        return
+    for group in (filters if isinstance(filters[0], list) else [filters]):
+        yield from group
+
+
+def _apply_filters(df, filters):
+    """
+    Apply pyarrow-style filters to an in-memory DataFrame.
+
+    `filters` is either a list of (column, op, value) tuples combined with AND,
+    or a list of such lists combined with OR.
+    """
+    if not filters:
+        return df
+    groups = filters if isinstance(filters[0], list) else [filters]
+    mask = pd.Series(False, index=df.index)
+    for group in groups:
+        group_mask = pd.Series(True, index=df.index)
+        for col, op, value in group:
+            group_mask &= _FILTER_OPS[op](df[col], value)
+        mask |= group_mask
+    return df[mask].reset_index(drop=True)
+
+
+def load_csv(filepath, columns=None, filters=None, use_cache=True, cache_key='mtime'):
     """
     Load a CSV file into a DataFrame.
 
+    The first load writes a Parquet copy of the CSV to a `.columnar_cache`
+    folder next to it; every load, the first included, reads the Parquet copy,
+    which is rebuilt automatically when the CSV changes. A CSV that cannot be
+    stored as Parquet is marked once and then read directly until it changes. Column projection and filters are
+    pushed down to the Parquet reader, so only the requested columns and the
+    matching row groups are read.
+
     Parameters:
     - filepath (str): Path to the CSV file.
+    - columns (list, optional): Columns to load.
+    - filters (list, optional): pyarrow-style predicates, e.g.
+      [('TransactionMonth', '>=', '2015-01-01')].
+    - use_cache (bool): Read and maintain the columnar cache.
+    - cache_key (str): 'mtime' (size + modification time) or 'hash' (content md5).
 
     Returns:
     - pd.DataFrame: DataFrame containing the loaded data.
     """
     try:
-        df = pd.read_csv(filepath)
+        if use_cache:
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                logging.warning("pyarrow is not installed; reading the CSV without the columnar cache.")
+                use_cache = False
+
+        if use_cache:
+            cache_file = cache_path_for(filepath, cache_key)
+            if os.path.exists(cache_file + SKIP_SUFFIX):
+                use_cache = False
+            elif not os.path.exists(cache_file):
+                try:
+                    _build_cache(filepath, cache_file)
+                except (ImportError, ValueError, TypeError, OSError) as e:
+                    # Mixed-type object columns cannot be stored as Parquet as-is; this
+                    # version of the file is read from the CSV from now on.
+                    logging.warning(f"Could not write columnar cache for {filepath}, "
+                                    f"reading the CSV directly until it changes: {e}")
+                    _mark_uncacheable(filepath, cache_file)
+                    use_cache = False
+
+        if use_cache:
+            # Cold and warm loads both read the Parquet copy, so they return identical frames.
+            df = pq.read_table(cache_file, columns=columns, filters=filters).to_pandas()
+            logging.info(f"CSV file loaded from columnar cache {cache_file}.")
+            return df
+
+        usecols = None
+        if columns is not None:
+            usecols = set(columns) | {f[0] for f in _iter_filter_terms(filters)}
+        df = pd.read_csv(filepath, usecols=usecols)
+
+        df = _apply_filters(df, filters)
+        if columns is not None:
+            df = df[list(columns)]
         logging.info(f"CSV file loaded successfully from {filepath}.")
         return df
     except Exception as e:
         logging.error(f"Error loading CSV file from {filepath}: {e}")
         return None
+
+
+# Declared column schema for the raw MachineLearningRating_v3 policy file.
+# Low-cardinality text fields are categoricals; numerics use the smallest
+# dtype that holds their range. Monetary columns stay float64 so that sums
+# over the full book do not lose precision.
+INSURANCE_SCHEMA = {
+    'UnderwrittenCoverID': 'int32',
+    'PolicyID': 'int32',
+    'TransactionMonth': 'category',
+    'IsVATRegistered': 'bool',
+    'Citizenship': 'category',
+    'LegalType': 'category',
+    'Title': 'category',
+    'Language': 'category',
+    'Bank': 'category',
+    'AccountType': 'category',
+    'MaritalStatus': 'category',
+    'Gender': 'category',
+    'Country': 'category',
+    'Province': 'category',
+    'PostalCode': 'int16',
+    'MainCrestaZone': 'category',
+    'SubCrestaZone': 'category',
+    'ItemType': 'category',
+    'mmcode': 'float64',
+    'VehicleType': 'category',
+    'RegistrationYear': 'int16',
+    'make': 'category',
+    'Model': 'category',
+    'Cylinders': 'float32',
+    'cubiccapacity': 'float32',
+    'kilowatts': 'float32',
+    'bodytype': 'category',
+    'NumberOfDoors': 'float32',
+    'VehicleIntroDate': 'category',
+    'CustomValueEstimate': 'float64',
+    'AlarmImmobiliser': 'category',
+    'TrackingDevice': 'category',
+    'CapitalOutstanding': 'category',
+    'NewVehicle': 'category',
+    'WrittenOff': 'category',
+    'Rebuilt': 'category',
+    'Converted': 'category',
+    'CrossBorder': 'category',
+    'NumberOfVehiclesInFleet': 'float32',
+    'SumInsured': 'float64',
+    'TermFrequency': 'category',
+    'CalculatedPremiumPerTerm': 'float64',
+    'ExcessSelected': 'category',
+    'CoverCategory': 'category',
+    'CoverType': 'category',
+    'CoverGroup': 'category',
+    'Section': 'category',
+    'Product': 'category',
+    'StatutoryClass': 'category',
+    'StatutoryRiskType': 'category',
+    'TotalPremium': 'float64',
+    'TotalClaims': 'float64',
+}
+
+
+def _rss_mb():
+    """Resident set size of the current process in MB (0.0 if psutil is missing)."""
+    try:
+        import psutil
+    except ImportError:
+        return 0.0
+    return psutil.Process(os.getpid()).memory_info().rss / 1024 ** 2
+
+
+def _resolve_dtypes(usecols=None, dtype=None):
+    """Merge the declared schema with caller overrides, restricted to usecols."""
+    dtypes = dict(INSURANCE_SCHEMA)
+    if dtype:
+        dtypes.update(dtype)
+    if usecols is not None:
+        dtypes = {col: dt for col, dt in dtypes.items() if col in usecols}
+    return dtypes
+
+
+def iter_data_chunks(file_path, delimeter='|', chunksize=100_000, usecols=None, dtype=None, stats=None):
+    """
+    Stream a delimited policy file as compact, schema-typed chunks.
+
+    Parameters:
+    - file_path (str): Path to the data file.
+    - delimeter (str): Field delimiter ('|' for the raw file, ',' for the cleaned CSV).
+    - chunksize (int): Number of rows per chunk.
+    - usecols (list, optional): Column projection; only these columns are parsed.
+    - dtype (dict, optional): Per-column dtype overrides on top of INSURANCE_SCHEMA.
+    - stats (dict, optional): Filled in place with 'rows', 'chunks', 'seconds',
+      'rows_per_sec' and 'peak_rss_mb' as the stream is consumed.
+
+    Yields:
+    - pd.DataFrame: One chunk of at most `chunksize` rows.
+    """
+    stats = stats if stats is not None else {}
+    stats.update(rows=0, chunks=0, seconds=0.0, rows_per_sec=0.0, peak_rss_mb=_rss_mb())
+    start = time.perf_counter()
+    reader = pd.read_csv(file_path, delimiter=delimeter, chunksize=chunksize, usecols=usecols,
+                         dtype=_resolve_dtypes(usecols, dtype), low_memory=False)
+    with reader:
+        for chunk in reader:
+            stats['rows'] += len(chunk)
+            stats['chunks'] += 1
+            stats['seconds'] = time.perf_counter() - start
+            stats['rows_per_sec'] = stats['rows'] / stats['seconds'] if stats['seconds'] else 0.0
+            stats['peak_rss_mb'] = max(stats['peak_rss_mb'], _rss_mb())
+            yield chunk
+
+
+def concat_chunks(chunks):
+    """
+    Concatenate chunks while keeping categorical columns categorical.
+
+    Each chunk carries its own categories, so a plain pd.concat would fall back
+    to object dtype; the categories are unioned first instead.
+
+    Parameters:
+    - chunks (iterable of pd.DataFrame): Chunks sharing the same columns.
+
+    Returns:
+    - pd.DataFrame: The concatenated frame with a fresh RangeIndex.
+    """
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame()
+    categorical = [col for col in chunks[0].columns
+                   if isinstance(chunks[0][col].dtype, pd.CategoricalDtype)]
+    for col in categorical:
+        union = union_categoricals([chunk[col] for chunk in chunks]).categories
+        for chunk in chunks:
+            chunk[col] = chunk[col].cat.set_categories(union)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def load_data_chunked(file_path, delimeter='|', chunksize=100_000, usecols=None, dtype=None):
+    """
+    Load a delimited policy file chunk by chunk under the declared schema.
+
+    Peak memory stays close to the size of the compact result instead of
+    several times the size of the file.
+
+    Parameters:
+    - file_path (str): Path to the data file.
+    - delimeter (str): Field delimiter.
+    - chunksize (int): Number of rows per chunk.
+    - usecols (list, optional): Column projection.
+    - dtype (dict, optional): Per-column dtype overrides on top of INSURANCE_SCHEMA.
+
+    Returns:
+    - pd.DataFrame: The compact frame, with the load statistics in df.attrs['load_stats'].
+    """
+    if not os.path.exists(file_path):
+        logging.error(f"File {file_path} does not exist.")
+        return pd.DataFrame()
+
+    stats = {}
+    try:
+        df = concat_chunks(iter_data_chunks(file_path, delimeter, chunksize, usecols, dtype, stats))
+    except Exception as e:
+        logging.error(f"Error loading data from {file_path}: {e}")
+        return None
+    stats['peak_rss_mb'] = max(stats['peak_rss_mb'], _rss_mb())
+    stats['memory_mb'] = df.memory_usage(deep=True).sum() / 1024 ** 2
+    df.attrs['load_stats'] = stats
+    logging.info(
+        f"Data loaded in {stats['chunks']} chunks from {file_path}. Shape: {df.shape}, "
+        f"{stats['rows_per_sec']:,.0f} rows/sec, frame {stats['memory_mb']:.1f} MB, "
+        f"peak RSS {stats['peak_rss_mb']:.1f} MB")
+    return df
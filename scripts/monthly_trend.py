@@ -9,7 +9,7 @@ logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-def plot_monthly_trends(df, date_column, aggregation_column: Dict[str, str], title_map=None):
+def plot_monthly_trends(df, date_column, aggregation_column: Dict[str, str], title_map=None, cube=None, filters=None):
     """
     Plots monthly trends of a specified column in a DataFrame.
 
@@ -18,11 +18,18 @@ def plot_monthly_trends(df, date_column, aggregation_column: Dict[str, str], tit
     - date_column: string, name of the column with date information.
     - aggregation_column: string, name of the column to aggregate.
     - title: string, title of the plot.
+    - cube: optional cube from build_monthly_cube; when given, the trends are read
+      from it instead of regrouping df.
+    - filters: optional slice of the cube, e.g. {'Province': 'Gauteng'}.
     """
     try:
         # Aggregate monthly data
-        monthly_data = aggregate_monthly_trends(
-            df, date_column, aggregation_column)
+        if cube is not None:
+            monthly_data = aggregate_monthly_trends_from_cube(
+                cube, aggregation_column, filters)
+        else:
+            monthly_data = aggregate_monthly_trends(
+                df, date_column, aggregation_column)
         length = len(aggregation_column)
         fig, axes = plt.subplots(
             length, 1, figsize=(10, 5 * length), sharex=True)
@@ -70,3 +77,169 @@ def aggregate_monthly_trends(df: pd.DataFrame, date_column: str, aggregation_col
         return None
 
     return grouped_by
+
+
+CUBE_DIMENSIONS = ('Province', 'VehicleType', 'CoverType')
+CUBE_MEASURES = ('TotalPremium', 'TotalClaims')
+_CUBE_FIXED_COLUMNS = ('Month', 'n_rows', 'claim_count')
+_CUBE_SUFFIXES = ('_sum', '_sumsq', '_count')
+
+
+def _month_start(values: pd.Series) -> pd.Series:
+    """First day of the month of each value, parsing every distinct value only once."""
+    codes, uniques = pd.factorize(values)
+    months = pd.to_datetime(pd.Series(uniques), errors='coerce').dt.to_period('M').dt.to_timestamp()
+    return pd.Series(months.to_numpy()[codes], index=values.index).where(codes >= 0)
+
+
+def build_monthly_cube(df: pd.DataFrame, date_column: str = 'TransactionMonth',
+                       dimensions=CUBE_DIMENSIONS, measures=CUBE_MEASURES) -> pd.DataFrame:
+    """
+    Builds a Month x dimensions rollup of additive measures.
+
+    Each cell holds the row count, the number of rows with a claim and, per
+    measure, the sum, sum of squares and non-null count, so any slice or
+    derived ratio can be answered from the cube without touching the rows.
+
+    Parameters:
+    - df: pandas DataFrame containing the data.
+    - date_column: string, name of the column with date information.
+    - dimensions: columns to keep as cube dimensions.
+    - measures: numeric columns to aggregate.
+
+    Returns:
+    - pandas DataFrame with one row per (Month, dimensions...) cell.
+    """
+    dimensions, measures = list(dimensions), list(measures)
+    frame = pd.DataFrame({'Month': _month_start(df[date_column])})
+    for dim in dimensions:
+        frame[dim] = df[dim]
+    frame['n_rows'] = 1
+    frame['claim_count'] = 0
+    if 'TotalClaims' in df.columns:
+        frame['claim_count'] = (pd.to_numeric(df['TotalClaims'], errors='coerce') > 0).astype(np.int64)
+    for measure in measures:
+        values = pd.to_numeric(df[measure], errors='coerce')
+        frame[f'{measure}_sum'] = values.fillna(0.0)
+        frame[f'{measure}_sumsq'] = (values * values).fillna(0.0)
+        frame[f'{measure}_count'] = values.notna().astype(np.int64)
+
+    cube = frame.groupby(['Month'] + dimensions, observed=True, dropna=False, sort=True).sum()
+    cube = cube.reset_index()
+    logging.info(f"Monthly cube built: {len(cube):,} cells from {len(df):,} rows.")
+    return cube
+
+
+def _cube_layout(cube: pd.DataFrame):
+    """Dimensions and measures of a cube, recovered from its column names."""
+    measures = [col[:-len('_sum')] for col in cube.columns if col.endswith('_sum')]
+    derived = {f'{m}{suffix}' for m in measures for suffix in _CUBE_SUFFIXES}
+    dimensions = [col for col in cube.columns if col not in derived and col not in _CUBE_FIXED_COLUMNS]
+    return dimensions, measures
+
+
+def update_monthly_cube(cube: pd.DataFrame, new_df: pd.DataFrame, date_column: str = 'TransactionMonth') -> pd.DataFrame:
+    """
+    Folds a new batch of rows into a cube.
+
+    Months present in the batch replace the cube's cells for those months,
+    so re-delivering a corrected month does not double count it.
+
+    Parameters:
+    - cube: existing cube from build_monthly_cube.
+    - new_df: pandas DataFrame with the new rows.
+    - date_column: string, name of the column with date information.
+
+    Returns:
+    - pandas DataFrame, the updated cube.
+    """
+    dimensions, measures = _cube_layout(cube)
+    batch = build_monthly_cube(new_df, date_column, dimensions, measures)
+    kept = cube[~cube['Month'].isin(batch['Month'].unique())]
+    updated = pd.concat([kept, batch], ignore_index=True)
+    return updated.sort_values(['Month'] + dimensions, kind='stable').reset_index(drop=True)
+
+
+def save_monthly_cube(cube: pd.DataFrame, path: str) -> None:
+    """
+    Persists a cube to a Parquet file.
+
+    Parameters:
+    - cube: cube from build_monthly_cube.
+    - path: destination file.
+    """
+    cube.to_parquet(path, index=False)
+    logging.info(f"Monthly cube with {len(cube):,} cells saved to {path}.")
+
+
+def load_monthly_cube(path: str) -> pd.DataFrame:
+    """
+    Loads a cube saved by save_monthly_cube.
+
+    Parameters:
+    - path: Parquet file.
+
+    Returns:
+    - pandas DataFrame, the cube.
+    """
+    return pd.read_parquet(path)
+
+
+def query_monthly_cube(cube: pd.DataFrame, filters: Optional[Dict[str, object]] = None) -> pd.DataFrame:
+    """
+    Monthly totals and derived ratios for a slice of the cube.
+
+    Parameters:
+    - cube: cube from build_monthly_cube.
+    - filters: mapping of dimension to a value or list of values, e.g. {'Province': 'Gauteng'}.
+
+    Returns:
+    - pandas DataFrame indexed by Month with the summed cells plus, per measure,
+      its mean and standard deviation, and the loss ratio and claim frequency
+      when premiums and claims are in the cube.
+    """
+    dimensions, measures = _cube_layout(cube)
+    mask = pd.Series(True, index=cube.index)
+    for dim, value in (filters or {}).items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        mask &= cube[dim].isin(values)
+    additive = [col for col in cube.columns if col not in dimensions and col != 'Month']
+    monthly = cube[mask].groupby('Month', sort=True)[additive].sum()
+
+    for measure in measures:
+        n = monthly[f'{measure}_count']
+        mean = monthly[f'{measure}_sum'] / n
+        monthly[f'{measure}_mean'] = mean
+        monthly[f'{measure}_std'] = np.sqrt(
+            ((monthly[f'{measure}_sumsq'] - n * mean ** 2) / (n - 1)).clip(lower=0))
+    if {'TotalPremium', 'TotalClaims'} <= set(measures):
+        monthly['loss_ratio'] = monthly['TotalClaims_sum'] / monthly['TotalPremium_sum']
+    monthly['claim_frequency'] = monthly['claim_count'] / monthly['n_rows']
+    return monthly
+
+
+def aggregate_monthly_trends_from_cube(cube: pd.DataFrame, aggregation_column: Dict[str, str],
+                                       filters: Optional[Dict[str, object]] = None) -> pd.DataFrame:
+    """
+    Same output as aggregate_monthly_trends, answered from a cube.
+
+    Parameters:
+    - cube: cube from build_monthly_cube.
+    - aggregation_column: mapping of measure to 'sum', 'count', 'mean' or 'std'.
+    - filters: optional slice of the cube, see query_monthly_cube.
+
+    Returns:
+    - pandas DataFrame indexed by Month with one column per measure.
+    """
+    try:
+        monthly = query_monthly_cube(cube, filters)
+        grouped_by = pd.DataFrame(index=monthly.index)
+        for col, agg in aggregation_column.items():
+            grouped_by[col] = monthly[f'{col}_{agg}']
+        logging.info(
+            f"Monthly aggregation from cube successful for {aggregation_column}.")
+    except Exception as e:
+        logging.error(f"Error during monthly aggregation from cube: {e}")
+        return None
+
+    return grouped_by
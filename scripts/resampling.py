@@ -0,0 +1,233 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Resamples per task handed to a worker; the seeds depend only on the chunk
+# number, so results are identical for any n_jobs.
+CHUNK_RESAMPLES = 1_000
+# Upper bound on the elements of one batched (resamples x rows) matrix.
+MAX_BATCH_ELEMENTS = 20_000_000
+
+
+@dataclass
+class ResamplingResult:
+    """Outcome of a permutation or bootstrap test."""
+    method: str
+    statistic: float
+    pvalue: float
+    n_resamples: int
+    n_obs: int
+    n_groups: int
+    seconds: float = 0.0
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def _encode(values, groups):
+    """Float values and dense group codes, dropping rows with a missing group or value."""
+    values = np.asarray(values, dtype=np.float64)
+    codes, uniques = pd.factorize(np.asarray(groups), sort=True)
+    keep = (codes >= 0) & np.isfinite(values)
+    return values[keep], codes[keep].astype(np.int64), uniques
+
+
+def between_group_ss(values, codes, k):
+    """
+    Between-group sum of squares of one or many samples.
+
+    With the group sizes fixed it is a monotone function of the one-way ANOVA
+    F statistic (and, for a binary metric, of the chi-squared statistic), and
+    for two groups of the squared mean difference.
+
+    Parameters:
+    - values (np.ndarray): (n,) or (batch, n) values.
+    - codes (np.ndarray): (n,) group codes shared by every row of the batch.
+    - k (int): Number of groups.
+
+    Returns:
+    - float or np.ndarray: One statistic per sample.
+    """
+    values = np.atleast_2d(values)
+    batch, n = values.shape
+    counts = np.bincount(codes, minlength=k).astype(np.float64)
+    offsets = (codes[None, :] + k * np.arange(batch)[:, None]).ravel()
+    sums = np.bincount(offsets, weights=values.ravel(), minlength=batch * k).reshape(batch, k)
+    grand = sums.sum(axis=1) / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.where(counts > 0, sums / counts, 0.0)
+    statistic = (counts * (means - grand[:, None]) ** 2).sum(axis=1)
+    return statistic if batch > 1 else statistic[0]
+
+
+def _batches(n_resamples, n_rows, max_elements=MAX_BATCH_ELEMENTS):
+    """Batch sizes covering n_resamples with at most max_elements per (batch x rows) matrix."""
+    size = max(1, min(n_resamples, max_elements // max(n_rows, 1)))
+    return [min(size, n_resamples - start) for start in range(0, n_resamples, size)]
+
+
+def _permutation_chunk(values, codes, k, observed, n_resamples, seed):
+    """Count permuted statistics at least as large as the observed one."""
+    rng = np.random.default_rng(seed)
+    exceed = 0
+    for batch in _batches(n_resamples, len(values)):
+        permuted = rng.permuted(np.broadcast_to(values, (batch, len(values))), axis=1)
+        exceed += int((between_group_ss(np.atleast_2d(permuted), codes, k) >= observed * (1 - 1e-12)).sum())
+    return exceed
+
+
+def _bootstrap_chunk(values, codes, k, observed, n_resamples, seed):
+    """
+    Count null bootstrap statistics at least as large as the observed one.
+
+    `values` are already centred on their group mean (the null of equal
+    means), sorted by group; rows are resampled with replacement within their
+    own group, which keeps each group's size, skewness and variance.
+    """
+    rng = np.random.default_rng(seed)
+    counts = np.bincount(codes, minlength=k)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[codes]
+    sizes = counts[codes]
+    exceed = 0
+    for batch in _batches(n_resamples, len(values)):
+        index = starts + (rng.random((batch, len(values))) * sizes).astype(np.int64)
+        exceed += int((between_group_ss(values[index], codes, k) >= observed * (1 - 1e-12)).sum())
+    return exceed
+
+
+# Data of each worker process, set once by the pool initializer.
+_WORKER_DATA = {}
+
+
+def _init_worker(values, codes, k, observed):
+    _WORKER_DATA.update(values=values, codes=codes, k=k, observed=observed)
+
+
+def _chunk_in_worker(method, n_resamples, seed):
+    chunk = _permutation_chunk if method == 'permutation' else _bootstrap_chunk
+    return chunk(_WORKER_DATA['values'], _WORKER_DATA['codes'], _WORKER_DATA['k'],
+                 _WORKER_DATA['observed'], n_resamples, seed)
+
+
+def _run_chunks(method, values, codes, k, observed, n_resamples, seed, n_jobs):
+    sizes = [min(CHUNK_RESAMPLES, n_resamples - start) for start in range(0, n_resamples, CHUNK_RESAMPLES)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+    n_jobs = max(1, min(n_jobs, len(sizes)))
+    if n_jobs == 1:
+        chunk = _permutation_chunk if method == 'permutation' else _bootstrap_chunk
+        return sum(chunk(values, codes, k, observed, size, s) for size, s in zip(sizes, seeds))
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                             initargs=(values, codes, k, observed)) as pool:
+        return sum(pool.map(_chunk_in_worker, [method] * len(sizes), sizes, seeds))
+
+
+def _resampling_test(method, values, groups, n_resamples, seed, n_jobs):
+    start = time.perf_counter()
+    values, codes, uniques = _encode(values, groups)
+    k = len(uniques)
+    if k < 2:
+        raise ValueError("A resampling test needs at least two groups with data.")
+    if method == 'bootstrap':
+        counts = np.bincount(codes, minlength=k)
+        if (counts < 2).any():
+            # A single row says nothing about its group's spread, so it cannot be resampled.
+            logging.warning(f"Bootstrap test drops {int((counts < 2).sum())} groups with one row.")
+            keep = counts[codes] >= 2
+            kept_groups, codes = np.unique(codes[keep], return_inverse=True)
+            values, k = values[keep], len(kept_groups)
+            if k < 2:
+                raise ValueError("A bootstrap test needs at least two groups with two or more rows.")
+        # Sort by group for the within-group index arithmetic, and centre every group.
+        order = np.argsort(codes, kind='stable')
+        values, codes = values[order], codes[order]
+        counts = np.bincount(codes, minlength=k)
+        means = np.bincount(codes, weights=values, minlength=k) / counts
+        observed = between_group_ss(values, codes, k)
+        # Residuals are inflated by sqrt(n / (n - 1)) so small groups keep their variance.
+        values = (values - means[codes]) * np.sqrt(counts / (counts - 1))[codes] + values.mean()
+    else:
+        observed = between_group_ss(values, codes, k)
+    exceed = _run_chunks(method, values, codes, k, observed, n_resamples, seed, n_jobs)
+    return ResamplingResult(method, float(observed), (1 + exceed) / (1 + n_resamples), n_resamples,
+                            len(values), k, time.perf_counter() - start)
+
+
+def permutation_test(values, groups, n_resamples=10_000, seed=0, n_jobs=1) -> ResamplingResult:
+    """
+    Permutation test of equal group means (or claim rates, for a 0/1 metric).
+
+    Values are shuffled across groups in batches of resamples at once: each
+    batch is a (resamples x rows) matrix, and every group sum of every resample
+    comes from one bincount over offset group codes. Exact under exchangeable
+    groups, with no normality assumption and no minimum group size.
+
+    Parameters:
+    - values (array-like): Metric per row, e.g. TotalClaims of the policies with a claim.
+    - groups (array-like): Group label per row; rows with a missing label or value are dropped.
+    - n_resamples (int): Number of permutations.
+    - seed (int): Seed; the result does not depend on n_jobs.
+    - n_jobs (int): Worker processes; -1 uses every core.
+
+    Returns:
+    - ResamplingResult: Observed between-group sum of squares and its permutation p-value.
+    """
+    return _resampling_test('permutation', values, groups, n_resamples, seed, n_jobs)
+
+
+def bootstrap_test(values, groups, n_resamples=10_000, seed=0, n_jobs=1) -> ResamplingResult:
+    """
+    Bootstrap test of equal group means that allows unequal, skewed group distributions.
+
+    Each group is shifted to the common mean (the null hypothesis) and
+    resampled with replacement within itself, batched and bincounted like
+    permutation_test. Groups with a single row are dropped. With hundreds of
+    small groups (postal codes) the bootstrap null is conservative; the
+    permutation test is the better choice there.
+
+    Parameters and returns as in permutation_test.
+    """
+    return _resampling_test('bootstrap', values, groups, n_resamples, seed, n_jobs)
+
+
+def bootstrap_group_means(values, groups, n_resamples=2_000, alpha=0.05, seed=0) -> pd.DataFrame:
+    """
+    Percentile bootstrap confidence intervals of every group mean.
+
+    Parameters:
+    - values, groups (array-like): As in permutation_test.
+    - n_resamples (int): Number of bootstrap resamples.
+    - alpha (float): 1 - confidence level.
+    - seed (int): Seed.
+
+    Returns:
+    - pd.DataFrame: count, mean, ci_low and ci_high per group.
+    """
+    values, codes, uniques = _encode(values, groups)
+    k = len(uniques)
+    order = np.argsort(codes, kind='stable')
+    values, codes = values[order], codes[order]
+    counts = np.bincount(codes, minlength=k)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[codes]
+    sizes = counts[codes]
+    rng = np.random.default_rng(seed)
+    means = []
+    for batch in _batches(n_resamples, len(values)):
+        index = starts + (rng.random((batch, len(values))) * sizes).astype(np.int64)
+        offsets = (codes[None, :] + k * np.arange(batch)[:, None]).ravel()
+        sums = np.bincount(offsets, weights=values[index].ravel(), minlength=batch * k).reshape(batch, k)
+        means.append(sums / counts)
+    means = np.vstack(means)
+    return pd.DataFrame({'count': counts,
+                         'mean': np.bincount(codes, weights=values, minlength=k) / counts,
+                         'ci_low': np.quantile(means, alpha / 2, axis=0),
+                         'ci_high': np.quantile(means, 1 - alpha / 2, axis=0)},
+                        index=pd.Index(np.asarray(uniques), name='group'))
@@ -0,0 +1,166 @@
+from itertools import combinations
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from posthoc import CORRECTIONS
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_DIMENSIONS = ('Province', 'VehicleType', 'Gender', 'CoverType')
+MEASURES = ['n_policies', 'n_claims', 'total_premium', 'premium_sumsq', 'total_claims',
+            'claims_sumsq', 'cross_sum', 'severity_sum']
+
+
+def _cell_measures(df, dimensions):
+    """
+    One grouped pass: additive measures for every observed combination of all dimensions.
+
+    Each dimension is factorized once, the codes are packed into one integer key,
+    and every measure is accumulated with bincount over the distinct keys.
+    """
+    premium = pd.to_numeric(df['TotalPremium'], errors='coerce').to_numpy(dtype=np.float64)
+    claims = pd.to_numeric(df['TotalClaims'], errors='coerce').to_numpy(dtype=np.float64)
+    valid = np.isfinite(premium) & np.isfinite(claims)
+    premium, claims = premium[valid], claims[valid]
+
+    key = np.zeros(len(premium), dtype=np.int64)
+    labels, radix = [], 1
+    for dim in dimensions:
+        codes, uniques = pd.factorize(df[dim].to_numpy()[valid], sort=True, use_na_sentinel=False)
+        # Missing values form their own level, reported as '<NA>'.
+        labels.append(np.where(pd.isna(uniques), '<NA>', np.asarray(uniques, dtype=object)))
+        radix *= max(len(uniques), 1)
+        if radix >= 2 ** 62:
+            raise ValueError("Too many dimension combinations to pack into one key.")
+        key = key * max(len(uniques), 1) + codes
+
+    cells, cell_of_row = np.unique(key, return_inverse=True)
+    has_claim = (claims > 0).astype(np.float64)
+    k = len(cells)
+    measures = pd.DataFrame({
+        'n_policies': np.bincount(cell_of_row, minlength=k),
+        'n_claims': np.bincount(cell_of_row, weights=has_claim, minlength=k),
+        'total_premium': np.bincount(cell_of_row, weights=premium, minlength=k),
+        'premium_sumsq': np.bincount(cell_of_row, weights=premium * premium, minlength=k),
+        'total_claims': np.bincount(cell_of_row, weights=claims, minlength=k),
+        'claims_sumsq': np.bincount(cell_of_row, weights=claims * claims, minlength=k),
+        'cross_sum': np.bincount(cell_of_row, weights=claims * premium, minlength=k),
+        'severity_sum': np.bincount(cell_of_row, weights=claims * has_claim, minlength=k),
+    })
+    # Unpack the key back into one code column per dimension.
+    for dim, dim_labels in zip(reversed(dimensions), reversed(labels)):
+        cells, code = np.divmod(cells, max(len(dim_labels), 1))
+        measures.insert(0, dim, code)
+    return measures, dict(zip(dimensions, labels))
+
+
+def _add_metrics(segments, baseline):
+    """Ratios per segment and z-tests against the portfolio baseline."""
+    n = segments['n_policies'].to_numpy(dtype=np.float64)
+    n_claims = segments['n_claims'].to_numpy()
+    premium = segments['total_premium'].to_numpy()
+    claims = segments['total_claims'].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frequency = n_claims / n
+        loss_ratio = claims / premium
+        segments['claim_frequency'] = frequency
+        segments['severity'] = segments['severity_sum'].to_numpy() / n_claims
+        segments['loss_ratio'] = loss_ratio
+        segments['margin'] = premium - claims
+        segments['margin_per_policy'] = (premium - claims) / n
+
+        # Claim frequency: exact binomial test against the portfolio rate (claims are
+        # too sparse in small segments for the normal approximation); z is descriptive.
+        f0 = baseline['claim_frequency']
+        z_freq = (frequency - f0) / np.sqrt(f0 * (1 - f0) / n)
+        tail = np.minimum(stats.binom.cdf(n_claims, n, f0), stats.binom.sf(n_claims - 1, n, f0))
+        # Loss ratio: under H0 each policy's residual claims - LR0 * premium has the
+        # portfolio variance, so a segment's excess claims have variance n * sigma².
+        # Using the null variance keeps sparse segments with no claims from looking certain.
+        z_lr = (claims - baseline['loss_ratio'] * premium) / np.sqrt(n * baseline['residual_var'])
+    segments['frequency_z'] = z_freq
+    segments['frequency_pvalue'] = np.minimum(1.0, 2 * tail)
+    segments['loss_ratio_z'] = z_lr
+    segments['loss_ratio_pvalue'] = 2 * stats.norm.sf(np.abs(z_lr))
+    return segments
+
+
+def scan_segments(df, dimensions=DEFAULT_DIMENSIONS, max_depth=2, min_policies=30, alpha=0.05,
+                  correction='fdr_bh', sort_by='loss_ratio') -> pd.DataFrame:
+    """
+    Claim frequency, severity, loss ratio and margin for every combination of up to `max_depth` dimensions.
+
+    The data is scanned once to build the finest cells; every coarser
+    combination is rolled up from those cells, so the cost beyond the single
+    pass depends only on the number of observed cells. Each segment is tested
+    against the portfolio baseline, and the p-values are corrected for the
+    number of segments scanned.
+
+    Claim frequency uses an exact binomial test. The loss-ratio test is a
+    normal approximation: it is conservative for loss ratios below the
+    portfolio, which is what `low_risk` relies on, but a single very large
+    claim can make a small segment look significantly worse than it is.
+
+    Parameters:
+    - df (pd.DataFrame): Policy data with the dimensions, TotalPremium and TotalClaims.
+    - dimensions (iterable): Candidate segmenting columns.
+    - max_depth (int): Largest number of dimensions combined in one segment.
+    - min_policies (int): Segments with fewer policies are not reported (nor tested).
+    - alpha (float): Significance level after correction.
+    - correction (str): 'fdr_bh' or 'holm'.
+    - sort_by (str): Column to rank by, ascending; the default puts the lowest loss ratios first.
+
+    Returns:
+    - pd.DataFrame: One row per segment, with one column per dimension (None when the
+      dimension is not part of the segment), the metrics, z-scores, raw and adjusted
+      p-values, and a `low_risk` flag (loss ratio significantly below the portfolio).
+      The portfolio baseline is in df.attrs['baseline'].
+    """
+    dimensions = list(dimensions)
+    cells, labels = _cell_measures(df, dimensions)
+    totals = cells[MEASURES].sum()
+    baseline = {'n_policies': int(totals['n_policies']),
+                'claim_frequency': totals['n_claims'] / totals['n_policies'],
+                'severity': totals['severity_sum'] / totals['n_claims'] if totals['n_claims'] else np.nan,
+                'loss_ratio': totals['total_claims'] / totals['total_premium']}
+    lr0 = baseline['loss_ratio']
+    baseline['residual_var'] = (totals['claims_sumsq'] - 2 * lr0 * totals['cross_sum']
+                                + lr0 ** 2 * totals['premium_sumsq']) / totals['n_policies']
+
+    parts = []
+    for depth in range(1, min(max_depth, len(dimensions)) + 1):
+        for combo in combinations(dimensions, depth):
+            rolled = cells.groupby(list(combo), as_index=False, sort=False)[MEASURES].sum()
+            rolled = rolled[rolled['n_policies'] >= min_policies]
+            for dim in combo:
+                rolled[dim] = labels[dim][rolled[dim].to_numpy()]
+            rolled['depth'] = depth
+            rolled['segment'] = [' & '.join(f"{dim}={value}" for dim, value in zip(combo, row))
+                                 for row in rolled[list(combo)].itertuples(index=False)]
+            parts.append(rolled)
+    segments = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=dimensions + MEASURES)
+    for dim in dimensions:
+        segments[dim] = segments[dim].astype(object).where(segments[dim].notna(), None)
+
+    segments = _add_metrics(segments, baseline)
+    adjust = CORRECTIONS[correction]
+    for test in ('frequency', 'loss_ratio'):
+        pvalues = segments[f'{test}_pvalue'].fillna(1.0).to_numpy()
+        segments[f'{test}_pvalue_adj'] = adjust(pvalues) if len(pvalues) else pvalues
+    segments['significant'] = (segments['frequency_pvalue_adj'] < alpha) | (segments['loss_ratio_pvalue_adj'] < alpha)
+    segments['low_risk'] = (segments['loss_ratio_pvalue_adj'] < alpha) & (segments['loss_ratio'] < baseline['loss_ratio'])
+
+    columns = (dimensions + ['depth', 'segment', 'n_policies', 'n_claims', 'claim_frequency', 'severity',
+                             'total_premium', 'total_claims', 'loss_ratio', 'margin', 'margin_per_policy',
+                             'frequency_z', 'frequency_pvalue', 'frequency_pvalue_adj', 'loss_ratio_z',
+                             'loss_ratio_pvalue', 'loss_ratio_pvalue_adj', 'significant', 'low_risk'])
+    segments = segments[columns].sort_values([sort_by, 'n_policies'], ascending=[True, False])
+    segments = segments.reset_index(drop=True)
+    segments.attrs['baseline'] = baseline
+    logging.info(f"Scanned {len(segments):,} segments over {dimensions} (depth <= {max_depth}); "
+                 f"{int(segments['low_risk'].sum())} significantly low-risk.")
+    return segments
@@ -0,0 +1,253 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from load_data import INSURANCE_SCHEMA, concat_chunks
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Levels and shares modelled on MachineLearningRating_v3 (about 1M rows, 23 months).
+PROVINCES = {'Gauteng': 0.393, 'Western Cape': 0.170, 'KwaZulu-Natal': 0.170, 'North West': 0.143,
+             'Mpumalanga': 0.052, 'Eastern Cape': 0.031, 'Limpopo': 0.025, 'Free State': 0.008,
+             'Northern Cape': 0.008}
+# Relative claim frequency per province, so the hypothesis tests have something to find.
+PROVINCE_RISK = {'Gauteng': 1.25, 'KwaZulu-Natal': 1.15, 'Western Cape': 0.95, 'North West': 0.75,
+                 'Mpumalanga': 0.9, 'Eastern Cape': 0.8, 'Limpopo': 0.85, 'Free State': 0.7,
+                 'Northern Cape': 0.6}
+LEVELS = {
+    'Citizenship': {' ': 0.895, 'ZA': 0.102, 'ZW': 0.002, 'AF': 0.001},
+    'LegalType': {'Individual': 0.911, 'Private company': 0.011, 'Close Corporation': 0.052,
+                  'Partnership': 0.022, 'Public company': 0.002, 'Trust': 0.002},
+    'Title': {'Mr': 0.934, 'Mrs': 0.041, 'Ms': 0.017, 'Miss': 0.007, 'Dr': 0.001},
+    'Language': {'English': 1.0},
+    'Bank': {'First National Bank': 0.26, 'Standard Bank': 0.16, 'ABSA Bank': 0.3, 'Nedbank': 0.08,
+             'Capitec Bank': 0.16, 'Investec Bank': 0.02, 'RMB Private Bank': 0.02},
+    'AccountType': {'Current account': 0.63, 'Savings account': 0.36, 'Transmission account': 0.01},
+    'MaritalStatus': {'Not specified': 0.99, 'Single': 0.007, 'Married': 0.003},
+    'Gender': {'Not specified': 0.946, 'Male': 0.047, 'Female': 0.007},
+    'Country': {'South Africa': 1.0},
+    'ItemType': {'Mobility - Motor': 1.0},
+    'AlarmImmobiliser': {'Yes': 0.99, 'No': 0.01},
+    'TrackingDevice': {'No': 0.75, 'Yes': 0.25},
+    'NewVehicle': {'More than 6 months': 0.99, 'Less than 6 months': 0.01},
+    'WrittenOff': {'No': 0.998, 'Yes': 0.002},
+    'Rebuilt': {'No': 0.998, 'Yes': 0.002},
+    'Converted': {'No': 0.999, 'Yes': 0.001},
+    'CrossBorder': {'No': 1.0},
+    'TermFrequency': {'Monthly': 0.996, 'Annual': 0.004},
+    'ExcessSelected': {'Mobility - Windscreen': 0.52, 'No excess': 0.23, 'Mobility - Metered Taxis - R2000': 0.17,
+                       'Mobility - Metered Taxis - R5000': 0.05, 'Mobility - Taxi with money back': 0.03},
+    'CoverCategory': {'Passenger Liability': 0.1, 'Own damage': 0.1, 'Windscreen': 0.1, 'Third Party': 0.1,
+                      'Keys and Alarms': 0.1, 'Signage and Vehicle Wraps': 0.1, 'Income Protector': 0.1,
+                      'Emergency Charges': 0.1, 'Cleaning and Removal of Accident Debris': 0.1,
+                      'Accidental Death': 0.05, 'Basic Excess Waiver': 0.03, 'Cash Takings': 0.02},
+    'CoverGroup': {'Comprehensive - Taxi': 0.82, 'Basic Excess Waiver': 0.01, 'Income Protector': 0.01,
+                   'Motor Comprehensive': 0.15, 'Standalone passenger liability': 0.01},
+    'Section': {'Motor Comprehensive': 0.99, 'Optional Extended Covers': 0.005, 'Third Party Only': 0.005},
+    'Product': {'Mobility Metered Taxis: Monthly': 0.76, 'Mobility Commercial Cover: Monthly': 0.23,
+                'Standalone passenger liability': 0.01},
+    'StatutoryClass': {'Commercial': 1.0},
+    'StatutoryRiskType': {'IFRS Constant': 1.0},
+}
+# Share of missing values per column, as in the raw file.
+MISSING_SHARE = {'Bank': 0.146, 'AccountType': 0.040, 'MaritalStatus': 0.008, 'Gender': 0.010,
+                 'CustomValueEstimate': 0.780, 'NewVehicle': 0.153, 'WrittenOff': 0.642, 'Rebuilt': 0.642,
+                 'Converted': 0.642, 'CrossBorder': 0.9993, 'NumberOfVehiclesInFleet': 1.0}
+VEHICLE_TYPES = {'Passenger Vehicle': 0.94, 'Medium Commercial': 0.035, 'Heavy Commercial': 0.015,
+                 'Light Commercial': 0.005, 'Bus': 0.005}
+BODY_TYPES = ['B/S', 'S/D', 'H/B', 'D/C', 'S/C', 'P/V', 'MPV', 'C/C']
+FIRST_MONTH = '2013-10-01'
+
+
+def _zipf_weights(n, exponent, rng):
+    """Long-tailed shares over n levels in random order."""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return rng.permutation(weights / weights.sum())
+
+
+class _BookTables:
+    """Per-level attributes shared by every chunk of one synthetic book."""
+
+    def __init__(self, rng, n_postal_codes, n_models, n_makes, n_months):
+        self.months = pd.date_range(FIRST_MONTH, periods=n_months, freq='MS').strftime('%Y-%m-%d %H:%M:%S')
+        growth = np.linspace(0.3, 1.0, n_months)
+        self.month_p = growth / growth.sum()
+
+        self.postal_codes = np.sort(rng.choice(np.arange(1, 9_999), n_postal_codes, replace=False))
+        self.postal_p = _zipf_weights(n_postal_codes, 1.1, rng)
+        self.postal_province = rng.choice(len(PROVINCES), n_postal_codes, p=list(PROVINCES.values()))
+        self.postal_risk = np.array(list(PROVINCE_RISK.values()))[self.postal_province]
+        self.postal_risk = self.postal_risk * rng.lognormal(0.0, 0.25, n_postal_codes)
+        self.main_zones = [f'Zone {z}' for z in range(1, 17)]
+        self.sub_zones = [f'Zone {z}' for z in range(1, 121)]
+
+        self.makes = [f'MAKE {m:02d}' for m in range(n_makes)]
+        self.models = [f'MODEL {m:03d}' for m in range(n_models)]
+        self.model_p = _zipf_weights(n_models, 1.2, rng)
+        self.model_make = np.arange(n_models) % n_makes
+        self.model_type = rng.choice(len(VEHICLE_TYPES), n_models, p=list(VEHICLE_TYPES.values()))
+        self.model_body = rng.integers(0, len(BODY_TYPES), n_models)
+        self.model_cylinders = rng.choice([4.0, 6.0, 8.0], n_models, p=[0.9, 0.08, 0.02])
+        self.model_cc = np.round(self.model_cylinders * rng.uniform(450, 700, n_models), -1)
+        self.model_kw = np.round(self.model_cc / rng.uniform(20, 30, n_models))
+        self.model_doors = rng.choice([2.0, 4.0, 5.0], n_models, p=[0.05, 0.9, 0.05])
+        self.model_mmcode = np.round(rng.uniform(4_000_000, 65_000_000, n_models), -3)
+        self.model_risk = np.where(self.model_type == 0, 1.0, 1.4)
+        # Mean risk multiplier, so the overall claim rate matches the requested one.
+        self.risk_scale = (self.postal_p @ self.postal_risk) * (self.model_p @ self.model_risk)
+        self.model_intro = np.array([f'{m}/{y}' for m, y in zip(rng.integers(1, 13, n_models),
+                                                                rng.integers(1988, 2015, n_models))])
+        self.intro_levels = sorted(set(self.model_intro))
+
+
+def _categorical(codes, levels):
+    return pd.Categorical.from_codes(codes, categories=levels)
+
+
+def _choice_column(rng, n, column, missing_share=0.0):
+    levels = list(LEVELS[column])
+    codes = rng.choice(len(levels), n, p=np.array(list(LEVELS[column].values())) / sum(LEVELS[column].values()))
+    if missing_share:
+        codes = np.where(rng.random(n) < missing_share, -1, codes)
+    return _categorical(codes, levels)
+
+
+def _make_chunk(rng, n, row_offset, tables, claim_rate, policies_per_row):
+    """One chunk of synthetic policies with every INSURANCE_SCHEMA column."""
+    model = rng.choice(len(tables.models), n, p=tables.model_p)
+    postal = rng.choice(len(tables.postal_codes), n, p=tables.postal_p)
+    vehicle_missing = rng.random(n) < 0.00055
+    sum_insured = np.round(np.where(rng.random(n) < 0.45, rng.lognormal(12.0, 1.0, n), rng.uniform(0.01, 10_000, n)), 2)
+    premium_per_term = np.round(sum_insured * rng.uniform(0.0005, 0.003, n) + rng.gamma(1.5, 20.0, n), 2)
+    total_premium = np.where(rng.random(n) < 0.4, 0.0, premium_per_term / 1.15)
+
+    gender = _choice_column(rng, n, 'Gender', MISSING_SHARE['Gender'])
+    risk = tables.postal_risk[postal] * tables.model_risk[model] / tables.risk_scale
+    risk = risk * np.where(np.asarray(gender) == 'Female', 0.85, 1.0)
+    claimed = rng.random(n) < claim_rate * risk
+    severity = rng.lognormal(9.2, 1.1, n) * (1 + sum_insured / 400_000)
+    capital = np.where(rng.random(n) < 0.7, 0, np.round(rng.lognormal(11.5, 0.8, n), -2)).astype(np.int64)
+    capital_levels, capital_codes = np.unique(capital, return_inverse=True)
+
+    def vehicle(values, dtype=np.float64):
+        return np.where(vehicle_missing, np.nan, values).astype(dtype)
+
+    def vehicle_categorical(codes, levels):
+        return _categorical(np.where(vehicle_missing, -1, codes), levels)
+
+    data = {
+        'UnderwrittenCoverID': (row_offset + np.arange(n)) // 8 + 1,
+        'PolicyID': rng.integers(1, max(2, int((row_offset + n) * policies_per_row)) + 1, n),
+        'TransactionMonth': _categorical(rng.choice(len(tables.months), n, p=tables.month_p), list(tables.months)),
+        'IsVATRegistered': rng.random(n) < 0.006,
+        **{col: _choice_column(rng, n, col, MISSING_SHARE.get(col, 0.0))
+           for col in ('Citizenship', 'LegalType', 'Title', 'Language', 'Bank', 'AccountType', 'MaritalStatus')},
+        'Gender': gender,
+        'Country': _choice_column(rng, n, 'Country'),
+        'Province': _categorical(tables.postal_province[postal], list(PROVINCES)),
+        'PostalCode': tables.postal_codes[postal],
+        'MainCrestaZone': _categorical(tables.postal_codes[postal] % len(tables.main_zones), tables.main_zones),
+        'SubCrestaZone': _categorical(tables.postal_codes[postal] % len(tables.sub_zones), tables.sub_zones),
+        'ItemType': _choice_column(rng, n, 'ItemType'),
+        'mmcode': vehicle(tables.model_mmcode[model]),
+        'VehicleType': vehicle_categorical(tables.model_type[model], list(VEHICLE_TYPES)),
+        'RegistrationYear': 2015 - np.minimum(rng.geometric(0.12, n) - 1, 28),
+        'make': vehicle_categorical(tables.model_make[model], tables.makes),
+        'Model': vehicle_categorical(model, tables.models),
+        'Cylinders': vehicle(tables.model_cylinders[model], np.float32),
+        'cubiccapacity': vehicle(tables.model_cc[model], np.float32),
+        'kilowatts': vehicle(tables.model_kw[model], np.float32),
+        'bodytype': vehicle_categorical(tables.model_body[model], BODY_TYPES),
+        'NumberOfDoors': vehicle(tables.model_doors[model], np.float32),
+        'VehicleIntroDate': vehicle_categorical(np.searchsorted(tables.intro_levels, tables.model_intro[model]),
+                                                tables.intro_levels),
+        'CustomValueEstimate': np.where(rng.random(n) < MISSING_SHARE['CustomValueEstimate'], np.nan,
+                                        np.round(rng.lognormal(12.2, 0.5, n), -2)),
+        'AlarmImmobiliser': _choice_column(rng, n, 'AlarmImmobiliser'),
+        'TrackingDevice': _choice_column(rng, n, 'TrackingDevice'),
+        'CapitalOutstanding': _categorical(capital_codes, [f'{c:,}' for c in capital_levels]),
+        **{col: _choice_column(rng, n, col, MISSING_SHARE[col])
+           for col in ('NewVehicle', 'WrittenOff', 'Rebuilt', 'Converted', 'CrossBorder')},
+        'NumberOfVehiclesInFleet': np.full(n, np.nan, dtype=np.float32),
+        'SumInsured': sum_insured,
+        'TermFrequency': _choice_column(rng, n, 'TermFrequency'),
+        'CalculatedPremiumPerTerm': premium_per_term,
+        **{col: _choice_column(rng, n, col)
+           for col in ('ExcessSelected', 'CoverCategory', 'CoverGroup', 'Section', 'Product',
+                       'StatutoryClass', 'StatutoryRiskType')},
+        'TotalPremium': np.round(total_premium, 6),
+        'TotalClaims': np.where(claimed, np.round(severity, 2), 0.0),
+    }
+    data['CoverType'] = data['CoverCategory']
+    frame = pd.DataFrame({col: data[col] for col in INSURANCE_SCHEMA})
+    numeric = {col: dtype for col, dtype in INSURANCE_SCHEMA.items() if dtype not in ('category', 'bool')}
+    return frame.astype(numeric)
+
+
+def iter_insurance_book(n_rows, seed=0, chunk_rows=250_000, n_postal_codes=888, n_models=411, n_makes=46,
+                        n_months=23, claim_rate=0.0028, policies_per_row=0.007):
+    """
+    Stream a synthetic policy book with the 52 columns of MachineLearningRating_v3.
+
+    Level tables (postal codes, vehicle models, makes and their attributes) are
+    drawn once from the seed; rows are generated chunk by chunk, each chunk
+    from its own spawned seed, so any size can be produced in bounded memory
+    and the same seed always gives the same book.
+
+    Parameters:
+    - n_rows (int): Number of rows.
+    - seed (int): Seed of the whole book.
+    - chunk_rows (int): Rows per chunk.
+    - n_postal_codes, n_models, n_makes (int): Cardinalities (888, 411 and 46 in the real file).
+    - n_months (int): Number of TransactionMonth values, from October 2013.
+    - claim_rate (float): Overall share of rows with a claim (about 0.28% in the real file).
+    - policies_per_row (float): Distinct PolicyIDs per row.
+
+    Yields:
+    - pd.DataFrame: Chunks typed with INSURANCE_SCHEMA (categorical text columns).
+    """
+    root = np.random.SeedSequence(seed)
+    table_seed, chunk_seed = root.spawn(2)
+    tables = _BookTables(np.random.default_rng(table_seed), n_postal_codes, n_models, n_makes, n_months)
+    starts = range(0, n_rows, chunk_rows)
+    for start, child in zip(starts, chunk_seed.spawn(len(starts))):
+        n = min(chunk_rows, n_rows - start)
+        chunk = _make_chunk(np.random.default_rng(child), n, start, tables, claim_rate, policies_per_row)
+        chunk.index = pd.RangeIndex(start, start + n)
+        yield chunk
+
+
+def generate_insurance_book(n_rows, seed=0, **kwargs) -> pd.DataFrame:
+    """
+    Synthetic policy book in memory; see iter_insurance_book for the parameters.
+
+    Returns:
+    - pd.DataFrame: n_rows policies with the INSURANCE_SCHEMA columns and dtypes.
+    """
+    return concat_chunks(iter_insurance_book(n_rows, seed, **kwargs))
+
+
+def write_insurance_book(path, n_rows, seed=0, delimiter='|', **kwargs):
+    """
+    Write a synthetic policy book as a delimited text file, chunk by chunk.
+
+    Parameters:
+    - path (str): Destination file.
+    - n_rows (int): Number of rows.
+    - seed (int): Seed of the book.
+    - delimiter (str): Field delimiter ('|' like the raw file).
+    - kwargs: Passed to iter_insurance_book.
+
+    Returns:
+    - str: The path written.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    for i, chunk in enumerate(iter_insurance_book(n_rows, seed, **kwargs)):
+        chunk.to_csv(tmp, sep=delimiter, index=False, header=i == 0, mode='w' if i == 0 else 'a')
+    os.replace(tmp, path)
+    logging.info(f"Wrote a synthetic book of {n_rows:,} rows to {path}.")
+    return path
@@ -0,0 +1,238 @@
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import hashlib
+import logging
+import multiprocessing
+import os
+import pickle
+import uuid
+
+import joblib
+import numpy as np
+import pandas as pd
+import shap
+import xgboost as xgb
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def model_hash(model):
+    """Content hash of a fitted model: its serialized trees for XGBoost, its pickle otherwise."""
+    if isinstance(model, xgb.Booster):
+        return hashlib.sha256(bytes(model.save_raw('ubj'))).hexdigest()[:16]
+    if isinstance(model, xgb.XGBModel):
+        return model_hash(model.get_booster())
+    return joblib.hash(model)[:16]
+
+
+def row_hashes(X):
+    """64-bit hash of every feature row (as float32); identical rows share a hash (and SHAP values)."""
+    return pd.util.hash_pandas_object(pd.DataFrame(np.asarray(X, dtype=np.float32)), index=False).to_numpy()
+
+
+class ShapCache:
+    """
+    On-disk SHAP values keyed by model hash and row hash.
+
+    Each explained shard is written as one .npz file (row hashes and values)
+    under a directory per model hash. Only the row hashes are read to build
+    the index; values are loaded from the files that hold requested rows.
+    """
+
+    def __init__(self, cache_dir, model_key):
+        self.directory = os.path.join(cache_dir, model_key)
+        os.makedirs(self.directory, exist_ok=True)
+        self._index = {}
+        for path in sorted(glob.glob(os.path.join(self.directory, '*.npz'))):
+            with np.load(path) as shard:
+                self._add_to_index(path, shard['row_hash'])
+
+    def _add_to_index(self, path, hashes):
+        for position, key in enumerate(hashes.tolist()):
+            self._index.setdefault(key, (path, position))
+
+    def __len__(self):
+        return len(self._index)
+
+    def lookup(self, hashes, n_features):
+        """
+        Cached values for the given row hashes.
+
+        Returns:
+        - tuple: (values, found) where values is (n_rows, n_features) float32 with
+          NaN rows for misses, and found is a boolean mask of the rows served from the cache.
+        """
+        values = np.full((len(hashes), n_features), np.nan, dtype=np.float32)
+        located = [self._index.get(key) for key in hashes.tolist()]
+        found = np.array([loc is not None for loc in located], dtype=bool)
+        by_file = {}
+        for row, loc in enumerate(located):
+            if loc is not None:
+                by_file.setdefault(loc[0], ([], []))
+                by_file[loc[0]][0].append(row)
+                by_file[loc[0]][1].append(loc[1])
+        for path, (rows, positions) in by_file.items():
+            with np.load(path) as shard:
+                values[rows] = shard['values'][positions]
+        return values, found
+
+    def store(self, hashes, values):
+        """Persist newly computed values (atomically, so concurrent readers never see partial files)."""
+        if len(hashes) == 0:
+            return
+        path = os.path.join(self.directory, f'{uuid.uuid4().hex}.npz')
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, row_hash=hashes, values=values.astype(np.float32))
+        os.replace(tmp, path)
+        self._add_to_index(path, hashes)
+
+
+def _positive_class(values):
+    """
+    SHAP values as an (n_rows, n_features) float32 array.
+
+    Scikit-learn classifiers get one set of values per class: a 3-D array
+    (rows, features, classes) in recent shap, or a list of 2-D arrays in older
+    versions. The claim models are binary, so the positive class is kept.
+    """
+    if isinstance(values, list):
+        values = values[-1]
+    values = np.asarray(values, dtype=np.float32)
+    return values[..., -1] if values.ndim == 3 else values
+
+
+# The explainer of each worker process, built once by the pool initializer.
+_WORKER_EXPLAINER = None
+
+
+def _init_worker(model_bytes):
+    global _WORKER_EXPLAINER
+    _WORKER_EXPLAINER = shap.TreeExplainer(pickle.loads(model_bytes))
+
+
+def _explain_in_worker(X):
+    return _positive_class(_WORKER_EXPLAINER.shap_values(X))
+
+
+class ShardedExplainer:
+    """
+    SHAP values for tree models, sharded over a process pool and cached on disk.
+
+    Rows are hashed and looked up in the cache first; only the misses are
+    explained, in shards of `shard_size` rows spread over `n_jobs` worker
+    processes (each builds its TreeExplainer once). Re-explaining the same
+    book after a re-run therefore costs one hash per row.
+
+    Parameters:
+    - model: Fitted tree model (xgb.Booster, XGBoost or scikit-learn tree ensemble);
+      for scikit-learn classifiers the values explain the positive class.
+    - cache_dir (str, optional): Cache directory; None disables caching.
+    - n_jobs (int): Worker processes; 1 explains in this process, -1 uses every core.
+    - shard_size (int): Rows per task sent to a worker.
+    """
+
+    def __init__(self, model, cache_dir=None, n_jobs=1, shard_size=10_000):
+        self.model = model
+        self.model_key = model_hash(model)
+        self.cache = ShapCache(cache_dir, self.model_key) if cache_dir else None
+        self.n_jobs = os.cpu_count() if n_jobs == -1 else max(1, n_jobs)
+        self.shard_size = shard_size
+        self.explainer = shap.TreeExplainer(model)
+        self.stats = {'rows_cached': 0, 'rows_computed': 0}
+        self._pool = None
+
+    @property
+    def expected_value(self):
+        expected = np.asarray(self.explainer.expected_value)
+        return expected[-1] if expected.ndim else expected
+
+    def _compute(self, X):
+        shards = [X[start:start + self.shard_size] for start in range(0, len(X), self.shard_size)]
+        if self.n_jobs == 1 or len(shards) == 1:
+            return np.vstack([_positive_class(self.explainer.shap_values(s)) for s in shards])
+        if self._pool is None:
+            # Spawned workers: forking after XGBoost has started its OpenMP threads can hang.
+            self._pool = ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_init_worker,
+                                             initargs=(pickle.dumps(self.model),),
+                                             mp_context=multiprocessing.get_context('spawn'))
+        return np.vstack(list(self._pool.map(_explain_in_worker, shards)))
+
+    def explain(self, X) -> np.ndarray:
+        """
+        SHAP values of every row of X.
+
+        Parameters:
+        - X (pd.DataFrame or np.ndarray): Feature rows, in the model's feature order.
+
+        Returns:
+        - np.ndarray: (n_rows, n_features) float32 SHAP values.
+        """
+        features = np.asarray(X, dtype=np.float32)
+        if self.cache is None:
+            values = self._compute(features)
+            self.stats['rows_computed'] += len(features)
+            return values
+
+        hashes = row_hashes(features)
+        values, found = self.cache.lookup(hashes, features.shape[1])
+        missing = np.flatnonzero(~found)
+        if len(missing):
+            # Duplicate rows inside the batch are explained once.
+            new_hashes, first, inverse = np.unique(hashes[missing], return_index=True, return_inverse=True)
+            computed = self._compute(features[missing[first]])
+            self.cache.store(new_hashes, computed)
+            values[missing] = computed[inverse]
+        self.stats['rows_cached'] += int(found.sum())
+        self.stats['rows_computed'] += len(missing)
+        return values
+
+    def iter_explanations(self, batches):
+        """Explain an iterable of feature batches lazily, yielding (batch, values) pairs."""
+        for X in batches:
+            yield X, self.explain(X)
+
+    def global_importance(self, batches, feature_names=None) -> pd.DataFrame:
+        """
+        Global importances accumulated batch by batch, without keeping the SHAP matrix.
+
+        Parameters:
+        - batches (iterable): Feature batches (DataFrames or arrays), e.g. from
+          InsuranceFeaturePipeline.transform_chunks; a single DataFrame is one batch.
+        - feature_names (list, optional): Names when the batches are arrays.
+
+        Returns:
+        - pd.DataFrame: mean_abs_shap, mean_shap and std_shap per feature, by decreasing mean_abs_shap.
+        """
+        if isinstance(batches, (pd.DataFrame, np.ndarray)):
+            batches = [batches]
+        n, abs_sum, total, sumsq = 0, 0.0, 0.0, 0.0
+        for X, values in self.iter_explanations(batches):
+            if feature_names is None and isinstance(X, pd.DataFrame):
+                feature_names = list(X.columns)
+            values = values.astype(np.float64)
+            n += len(values)
+            abs_sum = abs_sum + np.abs(values).sum(axis=0)
+            total = total + values.sum(axis=0)
+            sumsq = sumsq + (values * values).sum(axis=0)
+        if n == 0:
+            raise ValueError("No rows to explain.")
+        mean = total / n
+        importance = pd.DataFrame({'mean_abs_shap': abs_sum / n, 'mean_shap': mean,
+                                   'std_shap': np.sqrt(np.maximum(sumsq / n - mean ** 2, 0.0))},
+                                  index=feature_names)
+        logging.info(f"Explained {n:,} rows ({self.stats['rows_cached']:,} from cache so far).")
+        return importance.sort_values('mean_abs_shap', ascending=False)
+
+    def close(self):
+        """Shut down the worker pool."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
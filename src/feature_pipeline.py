@@ -0,0 +1,231 @@
+import logging
+
+import joblib
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Identifiers and targets are never used as features.
+EXCLUDED_COLUMNS = ['UnderwrittenCoverID', 'PolicyID', 'TotalClaims', 'CalculatedPremiumPerTerm',
+                    'ClaimOccurred', 'TotalPremium']
+DATE_COLUMNS = ['TransactionMonth', 'VehicleIntroDate']
+DATE_PARTS = ['Year', 'Month', 'Day', 'DayOfWeek', 'DayOfYear', 'Quarter', 'Age_Years']
+COMMA_NUMERIC_COLUMNS = ['CapitalOutstanding']
+HIGH_CARDINALITY_COLUMNS = ['Model', 'make']
+
+
+def extract_targets(df):
+    """
+    Modelling targets of the notebook.
+
+    Parameters:
+    - df (pd.DataFrame): Policy data with TotalClaims.
+
+    Returns:
+    - pd.DataFrame: TotalClaims (severity target) and ClaimOccurred (probability target).
+    """
+    claims = pd.to_numeric(df['TotalClaims'], errors='coerce').fillna(0.0)
+    return pd.DataFrame({'TotalClaims': claims.to_numpy(np.float64),
+                         'ClaimOccurred': (claims > 0).to_numpy(np.int8)}, index=df.index)
+
+
+def _factorize(series):
+    """Row codes and distinct values; categoricals are factorized from their codes."""
+    codes, uniques = pd.factorize(series)
+    return codes, pd.Series(np.asarray(uniques, dtype=object))
+
+
+def _clean_labels(uniques):
+    """Distinct category labels as stripped strings, with blanks turned into missing."""
+    labels = uniques.astype(str).str.strip()
+    return labels.where(uniques.notna() & (labels != ''))
+
+
+def _date_parts(series, as_of_year):
+    """Date parts of every row, parsing each distinct value only once."""
+    codes, uniques = _factorize(series)
+    dates = pd.to_datetime(uniques, errors='coerce', format='mixed')
+    parts = pd.DataFrame({
+        'Year': dates.dt.year, 'Month': dates.dt.month, 'Day': dates.dt.day,
+        'DayOfWeek': dates.dt.dayofweek, 'DayOfYear': dates.dt.dayofyear, 'Quarter': dates.dt.quarter,
+        'Age_Years': as_of_year - dates.dt.year,
+    }, dtype=np.float64)
+    table = np.vstack([parts.to_numpy(), np.full((1, len(DATE_PARTS)), np.nan)])
+    return pd.DataFrame(table[codes], columns=DATE_PARTS, index=series.index)
+
+
+def _comma_numeric(series):
+    """Numbers stored as text with thousands separators, converted once per distinct value."""
+    codes, uniques = _factorize(series)
+    values = pd.to_numeric(uniques.astype(str).str.replace(',', '', regex=False), errors='coerce')
+    table = np.append(values.to_numpy(np.float64), np.nan)
+    return table[codes]
+
+
+class InsuranceFeaturePipeline:
+    """
+    Fitted feature engineering for the claim models.
+
+    Reproduces the notebook's preparation (comma-stripped CapitalOutstanding,
+    date parts, median/mode imputation, one-hot encoding) as vectorized passes
+    that touch each distinct value once. Statistics are learned in `fit` and
+    reused by `transform`, so new data and chunks of the full book are
+    encoded exactly like the training data. High-cardinality columns are
+    frequency encoded (or hashed) instead of expanded into dummies.
+
+    Parameters:
+    - max_onehot (int): Categorical columns with more levels are treated as high cardinality.
+    - high_cardinality (str): 'frequency' or 'hash' encoding for high-cardinality columns.
+    - n_hash_buckets (int): Number of buckets when hashing.
+    - as_of_date (str): Reference date for the *_Age_Years features.
+    """
+
+    def __init__(self, max_onehot=50, high_cardinality='frequency', n_hash_buckets=32,
+                 as_of_date='2025-06-19'):
+        if high_cardinality not in ('frequency', 'hash'):
+            raise ValueError(f"Unknown high-cardinality encoding: {high_cardinality}")
+        self.max_onehot = max_onehot
+        self.high_cardinality = high_cardinality
+        self.n_hash_buckets = n_hash_buckets
+        self.as_of_date = as_of_date
+
+    @property
+    def input_columns_(self):
+        """Raw columns the fitted pipeline reads."""
+        return (self.date_columns_ + self.comma_columns_ + self.numeric_columns_
+                + list(self.vocabulary_))
+
+    def _numeric_frame(self, df):
+        """Dates, comma numbers, booleans and numeric columns as one float frame (before imputation)."""
+        as_of_year = pd.Timestamp(self.as_of_date).year
+        parts = {}
+        for col in self.date_columns_:
+            for part, values in _date_parts(df[col], as_of_year).items():
+                parts[f'{col}_{part}'] = values.to_numpy()
+        for col in self.comma_columns_:
+            parts[col] = _comma_numeric(df[col])
+        for col in self.numeric_columns_:
+            parts[col] = pd.to_numeric(df[col], errors='coerce').to_numpy(np.float64)
+        return pd.DataFrame(parts, index=df.index)
+
+    def _category_index(self, series, vocabulary):
+        """Index of every row's (cleaned) label in `vocabulary`; -1 for missing, -2 for unseen."""
+        codes, uniques = _factorize(series)
+        labels = _clean_labels(uniques)
+        index = pd.Index(vocabulary).get_indexer(labels.fillna('\0'))
+        index = np.where(labels.isna(), -1, np.where(index < 0, -2, index))
+        return np.append(index, -1)[codes]
+
+    def _hash_buckets(self, series, fill_label):
+        """Hash bucket of every row's cleaned label, hashing each distinct label once."""
+        codes, uniques = _factorize(series)
+        labels = _clean_labels(uniques).fillna(fill_label).tolist() + [fill_label]
+        buckets = pd.util.hash_array(np.asarray(labels, dtype=object)) % self.n_hash_buckets
+        return buckets.astype(np.int64)[codes]
+
+    def fit(self, df):
+        """
+        Learn imputation values, vocabularies and frequencies from training data.
+
+        Parameters:
+        - df (pd.DataFrame): Training data (targets and identifiers are ignored).
+
+        Returns:
+        - InsuranceFeaturePipeline: self.
+        """
+        columns = [col for col in df.columns if col not in EXCLUDED_COLUMNS]
+        self.date_columns_ = [col for col in columns if col in DATE_COLUMNS]
+        self.comma_columns_ = [col for col in columns if col in COMMA_NUMERIC_COLUMNS]
+        rest = [col for col in columns if col not in self.date_columns_ + self.comma_columns_]
+        self.numeric_columns_ = [col for col in rest if pd.api.types.is_numeric_dtype(df[col])
+                                 or pd.api.types.is_bool_dtype(df[col])]
+        categorical = [col for col in rest if col not in self.numeric_columns_]
+
+        self.medians_ = self._numeric_frame(df).median().fillna(0.0).to_dict()
+
+        self.vocabulary_, self.modes_, self.frequencies_, self.onehot_columns_ = {}, {}, {}, []
+        for col in categorical:
+            codes, uniques = _factorize(df[col])
+            counts = pd.Series(np.bincount(codes[codes >= 0], minlength=len(uniques)))
+            counts = counts.groupby(_clean_labels(uniques).to_numpy()).sum().sort_index()
+            if counts.empty:
+                continue
+            self.vocabulary_[col] = counts.index.tolist()
+            self.modes_[col] = counts.index.get_loc(counts.idxmax())
+            if col in HIGH_CARDINALITY_COLUMNS or len(counts) > self.max_onehot:
+                self.frequencies_[col] = (counts / counts.sum()).to_numpy()
+            else:
+                self.onehot_columns_.append(col)
+
+        self.feature_names_ = list(self.medians_)
+        for col in self.vocabulary_:
+            if col in self.frequencies_:
+                if self.high_cardinality == 'frequency':
+                    self.feature_names_.append(f'{col}_freq')
+                else:
+                    self.feature_names_ += [f'{col}_hash{b}' for b in range(self.n_hash_buckets)]
+            else:
+                # drop_first, as pd.get_dummies(..., drop_first=True) in the notebook
+                self.feature_names_ += [f'{col}_{label}' for label in self.vocabulary_[col][1:]]
+        logging.info(f"Feature pipeline fitted on {len(df):,} rows: {len(self.feature_names_)} features.")
+        return self
+
+    def transform(self, df):
+        """
+        Encode data with the fitted state.
+
+        Parameters:
+        - df (pd.DataFrame): Data with the training columns.
+
+        Returns:
+        - pd.DataFrame: float32 features in `feature_names_` order, indexed like df.
+        """
+        n = len(df)
+        out = np.zeros((n, len(self.feature_names_)), dtype=np.float32)
+        position = {name: i for i, name in enumerate(self.feature_names_)}
+
+        numeric = self._numeric_frame(df)
+        for col, median in self.medians_.items():
+            out[:, position[col]] = numeric[col].fillna(median).to_numpy()
+
+        rows = np.arange(n)
+        for col, vocabulary in self.vocabulary_.items():
+            index = self._category_index(df[col], vocabulary)
+            index = np.where(index == -1, self.modes_[col], index)
+            if col in self.frequencies_:
+                if self.high_cardinality == 'frequency':
+                    # Unseen labels have never been observed: frequency 0.
+                    freq = self.frequencies_[col]
+                    out[:, position[f'{col}_freq']] = np.where(index >= 0, freq[np.maximum(index, 0)], 0.0)
+                else:
+                    out[rows, position[f'{col}_hash0'] + self._hash_buckets(df[col], vocabulary[self.modes_[col]])] = 1.0
+            elif len(vocabulary) > 1:
+                # Unseen labels (-2) and the dropped first level (0) encode as all zeros.
+                known = index > 0
+                out[rows[known], position[f'{col}_{vocabulary[1]}'] + index[known] - 1] = 1.0
+        return pd.DataFrame(out, columns=self.feature_names_, index=df.index)
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+    def transform_chunks(self, chunks):
+        """
+        Encode an iterable of DataFrame chunks lazily, e.g. from load_data.iter_data_chunks.
+
+        Yields:
+        - pd.DataFrame: Features of each chunk.
+        """
+        for chunk in chunks:
+            yield self.transform(chunk)
+
+    def save(self, path):
+        """Persist the fitted pipeline."""
+        joblib.dump(self, path)
+        logging.info(f"Feature pipeline saved to {path}.")
+
+    @staticmethod
+    def load(path):
+        """Load a pipeline saved with `save`."""
+        return joblib.load(path)
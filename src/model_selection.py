@@ -0,0 +1,324 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from itertools import product
+import json
+import logging
+import math
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.metrics import f1_score, mean_squared_error, r2_score, roc_auc_score
+from sklearn.model_selection import KFold, StratifiedKFold
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Metric that ranks the leaderboard, and whether larger is better.
+PRIMARY_METRIC = {'severity': ('rmse', False), 'probability': ('roc_auc', True)}
+
+
+@dataclass(frozen=True)
+class Candidate:
+    """One model configuration: a name from make_model and its hyperparameters."""
+    model: str
+    params: dict = field(default_factory=dict)
+
+    @property
+    def name(self):
+        if not self.params:
+            return self.model
+        return f"{self.model}(" + ', '.join(f'{k}={v}' for k, v in sorted(self.params.items())) + ')'
+
+    def __hash__(self):
+        return hash(self.name)
+
+
+def expand_grid(model, grid=None):
+    """
+    Candidates for every combination of a parameter grid.
+
+    Example: expand_grid('xgboost', {'max_depth': [4, 6], 'learning_rate': [0.1, 0.3]}).
+    """
+    grid = grid or {}
+    keys = sorted(grid)
+    return [Candidate(model, dict(zip(keys, values))) for values in product(*(grid[k] for k in keys))]
+
+
+def make_model(task, name, params=None, n_threads=1):
+    """
+    The notebook's models with a fixed number of threads.
+
+    Parameters:
+    - task (str): 'severity' (regression) or 'probability' (classification).
+    - name (str): 'linear', 'random_forest' or 'xgboost'.
+    - params (dict, optional): Hyperparameters.
+    - n_threads (int): Threads the model may use (replaces the notebook's n_jobs=-1).
+    """
+    params = dict(params or {})
+    regression = task == 'severity'
+    if name == 'linear':
+        model = LinearRegression(**params) if regression else LogisticRegression(
+            **{'solver': 'liblinear', 'random_state': 42, **params})
+        return make_pipeline(StandardScaler(), model)
+    if name == 'random_forest':
+        cls = RandomForestRegressor if regression else RandomForestClassifier
+        return cls(**{'n_estimators': 100, 'random_state': 42, **params, 'n_jobs': n_threads})
+    if name == 'xgboost':
+        cls = xgb.XGBRegressor if regression else xgb.XGBClassifier
+        return cls(**{'n_estimators': 100, 'random_state': 42, 'tree_method': 'hist', **params,
+                      'n_jobs': n_threads})
+    raise ValueError(f"Unknown model: {name}")
+
+
+# Memory-mapped folds opened by each worker process, by directory.
+_WORKER_FOLDS = {}
+
+
+@dataclass
+class FoldSet:
+    """K folds stored once on disk; workers memory-map the matrices instead of receiving copies."""
+    directory: str
+    task: str
+    n_splits: int
+    n_rows: int
+    feature_names: list
+
+    @classmethod
+    def load(cls, directory):
+        """Reopen folds written by build_folds."""
+        with open(os.path.join(directory, 'folds.json'), encoding='utf-8') as f:
+            return cls(**json.load(f))
+
+    def arrays(self):
+        """Memory-mapped features, target and fold id of every row."""
+        return tuple(np.load(os.path.join(self.directory, f'{name}.npy'), mmap_mode='r')
+                     for name in ('X', 'y', 'fold'))
+
+
+def build_folds(X, y, directory, task='probability', n_splits=5, random_state=42, n_bins=10):
+    """
+    Assign every row to one of K stratified folds and write the matrices once.
+
+    Classification folds are stratified on the class; severity folds on
+    quantile bins of the heavy-tailed target, so every fold sees large claims.
+
+    Parameters:
+    - X (pd.DataFrame or np.ndarray): Features.
+    - y (array-like): Target.
+    - directory (str): Where X.npy, y.npy and fold.npy are written.
+    - task (str): 'severity' or 'probability'.
+    - n_splits (int): Number of folds.
+    - random_state (int): Seed of the fold assignment.
+    - n_bins (int): Quantile bins used to stratify a regression target.
+
+    Returns:
+    - FoldSet: Handle to the stored folds.
+    """
+    os.makedirs(directory, exist_ok=True)
+    features = np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+    target = np.asarray(y, dtype=np.float64)
+    if task == 'probability':
+        strata = target.astype(np.int64)
+    else:
+        edges = np.unique(np.quantile(target, np.linspace(0, 1, n_bins + 1)[1:-1]))
+        strata = np.searchsorted(edges, target)
+    if np.bincount(strata).min() >= n_splits:
+        splitter = StratifiedKFold(n_splits, shuffle=True, random_state=random_state)
+    else:
+        splitter = KFold(n_splits, shuffle=True, random_state=random_state)
+    fold = np.empty(len(target), dtype=np.int8)
+    for k, (_, test) in enumerate(splitter.split(features, strata)):
+        fold[test] = k
+    _WORKER_FOLDS.pop(directory, None)
+    for name, array in (('X', features), ('y', target), ('fold', fold)):
+        np.save(os.path.join(directory, f'{name}.npy'), array)
+    names = list(X.columns) if isinstance(X, pd.DataFrame) else [f'f{i}' for i in range(features.shape[1])]
+    folds = FoldSet(directory, task, n_splits, len(target), names)
+    with open(os.path.join(directory, 'folds.json'), 'w', encoding='utf-8') as f:
+        json.dump(folds.__dict__, f)
+    return folds
+
+
+def _metrics(task, model, X, y):
+    if task == 'severity':
+        pred = model.predict(X)
+        return {'rmse': float(np.sqrt(mean_squared_error(y, pred))), 'r2': float(r2_score(y, pred))}
+    proba = model.predict_proba(X)[:, 1]
+    auc = roc_auc_score(y, proba) if 0 < y.sum() < len(y) else np.nan
+    return {'roc_auc': float(auc), 'f1': float(f1_score(y, proba >= 0.5, zero_division=0))}
+
+
+def run_fold_job(folds, candidate, fold, n_threads=1, subsample=1.0, seed=0):
+    """
+    Fit one candidate on K-1 folds and score it on the held-out fold.
+
+    Parameters:
+    - folds (FoldSet): Stored folds.
+    - candidate (Candidate): Model and hyperparameters.
+    - fold (int): Held-out fold.
+    - n_threads (int): Threads for the model and for BLAS.
+    - subsample (float): Share of the training rows used (successive halving budget).
+    - seed (int): Seed of the subsample.
+
+    Returns:
+    - dict: candidate, fold, subsample, metrics, fit_seconds, predict_seconds (or error).
+    """
+    if folds.directory not in _WORKER_FOLDS:
+        _WORKER_FOLDS[folds.directory] = folds.arrays()
+    X, y, fold_of_row = _WORKER_FOLDS[folds.directory]
+    train = np.flatnonzero(fold_of_row != fold)
+    if subsample < 1.0:
+        rng = np.random.default_rng(seed)
+        train = np.sort(rng.choice(train, max(1, int(len(train) * subsample)), replace=False))
+    test = np.flatnonzero(fold_of_row == fold)
+    row = {'candidate': candidate.name, 'model': candidate.model, 'fold': fold, 'subsample': subsample}
+    try:
+        with threadpool_limits(n_threads):
+            model = make_model(folds.task, candidate.model, candidate.params, n_threads)
+            start = time.perf_counter()
+            model.fit(X[train], y[train])
+            row['fit_seconds'] = time.perf_counter() - start
+            start = time.perf_counter()
+            row.update(_metrics(folds.task, model, X[test], y[test]))
+            row['predict_seconds'] = time.perf_counter() - start
+    except Exception as e:
+        row['error'] = str(e)
+    return row
+
+
+def _run_jobs(folds, jobs, n_workers, deadline):
+    """
+    Run (candidate, fold, subsample) jobs in a bounded process pool until the deadline.
+
+    Each worker's model gets cpu_count // n_workers threads, so parallel jobs never
+    oversubscribe the cores. Jobs not started by the deadline are cancelled.
+    """
+    n_threads = max(1, (os.cpu_count() or 1) // n_workers)
+    rows = []
+    if n_workers == 1:
+        for candidate, fold, subsample in jobs:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            rows.append(run_fold_job(folds, candidate, fold, n_threads, subsample, seed=fold))
+        return rows
+    # Spawned workers: forking after XGBoost has started its OpenMP threads can hang.
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        pending = {pool.submit(run_fold_job, folds, candidate, fold, n_threads, subsample, fold)
+                   for candidate, fold, subsample in jobs}
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            rows.extend(future.result() for future in done)
+            if deadline is not None and time.perf_counter() >= deadline:
+                for future in pending:
+                    future.cancel()
+                # Jobs already running still finish; their results are kept.
+                rows.extend(f.result() for f in pending if not f.cancelled())
+                break
+    return rows
+
+
+def leaderboard(results, task) -> pd.DataFrame:
+    """
+    Tidy leaderboard: one row per candidate (and subsample), fold metrics averaged.
+
+    Returns:
+    - pd.DataFrame: candidate, model, subsample, n_folds, mean and std of every metric,
+      mean fit/predict seconds, best first.
+    """
+    results = pd.DataFrame(results)
+    if 'error' in results:
+        failed = results['error'].notna()
+        for _, row in results[failed].iterrows():
+            logging.error(f"{row['candidate']} failed on fold {row['fold']}: {row['error']}")
+        results = results[~failed]
+    metric, larger_is_better = PRIMARY_METRIC[task]
+    metrics = ['rmse', 'r2'] if task == 'severity' else ['roc_auc', 'f1']
+    if results.empty:
+        return pd.DataFrame(columns=['candidate', 'model', 'subsample', 'n_folds'])
+    grouped = results.groupby(['candidate', 'model', 'subsample'])
+    board = grouped[metrics].agg(['mean', 'std'])
+    board.columns = [f'{m}_{stat}' for m, stat in board.columns]
+    board['fit_seconds'] = grouped['fit_seconds'].mean()
+    board['predict_seconds'] = grouped['predict_seconds'].mean()
+    board.insert(0, 'n_folds', grouped.size())
+    board = board.reset_index().sort_values(['subsample', f'{metric}_mean'],
+                                            ascending=[False, not larger_is_better])
+    return board.reset_index(drop=True)
+
+
+def grid_search(folds, candidates, n_workers=1, time_budget=None) -> pd.DataFrame:
+    """
+    Cross-validate every candidate on every fold.
+
+    Parameters:
+    - folds (FoldSet): Output of build_folds.
+    - candidates (list of Candidate): Configurations to compare (see expand_grid).
+    - n_workers (int): Parallel jobs; -1 uses every core with one thread per job.
+    - time_budget (float, optional): Seconds after which no new job is started; candidates
+      that did not finish every fold show it in n_folds.
+
+    Returns:
+    - pd.DataFrame: Leaderboard.
+    """
+    n_workers = os.cpu_count() if n_workers == -1 else max(1, n_workers)
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    # Fold-major order, so an early deadline still leaves every candidate with some folds.
+    jobs = [(c, fold, 1.0) for fold in range(folds.n_splits) for c in candidates]
+    board = leaderboard(_run_jobs(folds, jobs, n_workers, deadline), folds.task)
+    logging.info(f"Grid search over {len(candidates)} candidates x {folds.n_splits} folds done.")
+    return board
+
+
+def successive_halving(folds, candidates, n_workers=1, time_budget=None, eta=3, min_subsample=None):
+    """
+    Successive halving: evaluate all candidates on a small share of the training rows,
+    keep the best 1/eta, and give the survivors eta times more rows, up to the full folds.
+
+    Parameters:
+    - folds (FoldSet): Output of build_folds.
+    - candidates (list of Candidate): Configurations to compare.
+    - n_workers (int): Parallel jobs; -1 uses every core.
+    - time_budget (float, optional): Seconds for the whole search; no rung starts after it.
+    - eta (int): Reduction factor between rungs.
+    - min_subsample (float, optional): Share of rows in the first rung
+      (by default enough rungs for one candidate to remain on the full data).
+
+    Returns:
+    - pd.DataFrame: Leaderboard of every rung (the full-data rung first); the
+      best candidate of the last completed rung is in df.attrs['best'].
+    """
+    n_workers = os.cpu_count() if n_workers == -1 else max(1, n_workers)
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    n_rungs = max(1, math.ceil(math.log(max(len(candidates), 1), eta)))
+    first = min_subsample or float(eta) ** -(n_rungs - 1)
+
+    survivors, boards, best, rung = list(candidates), [], None, 0
+    while survivors:
+        subsample = min(1.0, first * float(eta) ** rung)
+        jobs = [(c, fold, subsample) for fold in range(folds.n_splits) for c in survivors]
+        board = leaderboard(_run_jobs(folds, jobs, n_workers, deadline), folds.task)
+        complete = board[board['n_folds'] == folds.n_splits] if not board.empty else board
+        if complete.empty:
+            break
+        boards.append(complete)
+        best = complete.iloc[0]['candidate']
+        logging.info(f"Rung with {subsample:.3g} of the rows: {len(survivors)} candidates, best {best}.")
+        if subsample >= 1.0 or len(complete) == 1 or (deadline is not None and time.perf_counter() >= deadline):
+            break
+        keep = set(complete['candidate'].iloc[:max(1, len(complete) // eta)])
+        survivors = [c for c in survivors if c.name in keep]
+        rung += 1
+    board = pd.concat(boards, ignore_index=True) if boards else leaderboard([], folds.task)
+    board = board.sort_values('subsample', ascending=False, kind='stable').reset_index(drop=True)
+    board.attrs['best'] = best
+    return board
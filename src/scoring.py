@@ -0,0 +1,314 @@
+import argparse
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from src.feature_pipeline import InsuranceFeaturePipeline
+from src.train import PIPELINE_FILE, model_file
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class PremiumScorer:
+    """
+    Risk-based premium from the persisted feature pipeline and claim models.
+
+    The pipeline and both models are loaded once; every call scores a whole
+    batch with one vectorized transform and one predict per model.
+
+        premium = P(claim) * expected severity * (1 + loading) + fixed_loading
+
+    Parameters:
+    - model_dir (str): Output directory of src.train.train_claim_models.
+    - model (str): Which trained model family to use ('xgboost' or 'linear').
+    - loading (float): Proportional expense and profit loading on the expected claims.
+    - fixed_loading (float): Flat amount added to every premium.
+    - nthread (int): Threads per XGBoost prediction.
+    """
+
+    def __init__(self, model_dir, model='xgboost', loading=0.1, fixed_loading=0.0, nthread=1):
+        self.pipeline = InsuranceFeaturePipeline.load(os.path.join(model_dir, PIPELINE_FILE))
+        self.columns = self.pipeline.input_columns_
+        self.models = {}
+        for task in ('probability', 'severity'):
+            path = os.path.join(model_dir, model_file(task, model))
+            if model == 'xgboost':
+                booster = xgb.Booster(model_file=path)
+                booster.set_param({'nthread': nthread})
+                self.models[task] = booster
+            else:
+                self.models[task] = joblib.load(path)
+        self.model = model
+        self.loading = loading
+        self.fixed_loading = fixed_loading
+        logging.info(f"Premium scorer loaded {model} models from {model_dir}.")
+
+    def _predict(self, task, X):
+        if self.model == 'xgboost':
+            return self.models[task].inplace_predict(X).astype(np.float64)
+        return np.asarray(self.models[task].predict(X), dtype=np.float64)
+
+    def score(self, df) -> pd.DataFrame:
+        """
+        Score a batch of policies.
+
+        Parameters:
+        - df (pd.DataFrame): Raw policy rows; missing columns are imputed like missing values.
+
+        Returns:
+        - pd.DataFrame: claim_probability, expected_severity, expected_claims and premium, indexed like df.
+        """
+        X = self.pipeline.transform(df.reindex(columns=self.columns)).to_numpy()
+        probability = np.clip(self._predict('probability', X), 0.0, 1.0)
+        severity = np.maximum(self._predict('severity', X), 0.0)
+        expected = probability * severity
+        return pd.DataFrame({'claim_probability': probability, 'expected_severity': severity,
+                             'expected_claims': expected,
+                             'premium': expected * (1 + self.loading) + self.fixed_loading},
+                            index=df.index)
+
+    def score_records(self, records):
+        """Score a list of dicts (JSON quotes); returns one dict of results per record."""
+        return self.score(pd.DataFrame.from_records(records)).to_dict('records')
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-quote requests into vectorized batches.
+
+    A worker thread takes the first waiting request, keeps collecting requests
+    for at most `max_wait_ms` (or until `max_batch_size`), and scores them
+    together. Latency from submit to result is recorded for every request.
+
+    Parameters:
+    - scorer (PremiumScorer): Batch scorer.
+    - max_batch_size (int): Largest batch scored at once.
+    - max_wait_ms (float): Longest time the first request of a batch waits for company.
+    - latency_window (int): Number of recent latencies kept for the statistics.
+    """
+
+    def __init__(self, scorer, max_batch_size=512, max_wait_ms=2.0, latency_window=100_000):
+        self.scorer = scorer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._latencies = deque(maxlen=latency_window)
+        self._batch_sizes = deque(maxlen=latency_window)
+        self._stats_lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, record) -> Future:
+        """Queue one quote (a dict); the Future resolves to its result dict."""
+        future = Future()
+        if not isinstance(record, dict):
+            future.set_exception(TypeError(f"A quote must be a JSON object, got {type(record).__name__}."))
+            return future
+        self._queue.put((record, future, time.perf_counter()))
+        return future
+
+    def score(self, record, timeout=None):
+        """Score one quote, blocking until its batch is done."""
+        return self.submit(record).result(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            self._score_batch(batch)
+
+    def _score_batch(self, batch):
+        records = [record for record, _, _ in batch]
+        try:
+            outcomes = [(result, None) for result in self.scorer.score_records(records)]
+        except Exception as e:
+            # One malformed quote must not fail its neighbours: score them one by one.
+            logging.warning(f"Scoring a batch of {len(batch)} quotes failed ({e}); scoring them one by one.")
+            outcomes = [self._score_one(record) for record in records]
+        done = time.perf_counter()
+        for (_, future, submitted), (result, error) in zip(batch, outcomes):
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+        with self._stats_lock:
+            self._latencies.extend(done - submitted for _, _, submitted in batch)
+            self._batch_sizes.append(len(batch))
+
+    def _score_one(self, record):
+        try:
+            return self.scorer.score_records([record])[0], None
+        except Exception as e:
+            logging.error(f"Scoring quote {record!r} failed: {e}")
+            return None, e
+
+    def latency_stats(self):
+        """
+        Latency and throughput of the recent requests.
+
+        Returns:
+        - dict: count, p50_ms, p99_ms, max_ms, mean_batch_size and quotes_per_sec since start.
+        """
+        with self._stats_lock:
+            latencies = np.array(self._latencies) * 1000
+            batch_sizes = np.array(self._batch_sizes)
+        if len(latencies) == 0:
+            return {'count': 0}
+        return {'count': len(latencies),
+                'p50_ms': float(np.percentile(latencies, 50)),
+                'p99_ms': float(np.percentile(latencies, 99)),
+                'max_ms': float(latencies.max()),
+                'mean_batch_size': float(batch_sizes.mean()),
+                'quotes_per_sec': len(latencies) / (time.perf_counter() - self._started)}
+
+    def close(self):
+        """Stop the worker after the queued requests are scored."""
+        self._queue.put(None)
+        self._worker.join()
+
+
+def make_http_server(batcher, host='127.0.0.1', port=8000):
+    """
+    HTTP front end: POST /quote with one JSON quote or a list of quotes, GET /stats for latencies.
+
+    Every connection is served by its own thread, and single quotes from all
+    connections are coalesced by the batcher.
+
+    Returns:
+    - ThreadingHTTPServer: Call serve_forever() to start it.
+    """
+
+    class QuoteHandler(BaseHTTPRequestHandler):
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self._reply(200, batcher.latency_stats())
+            else:
+                self._reply(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/quote':
+                self._reply(404, {'error': 'not found'})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                if isinstance(payload, list):
+                    result = [f.result() for f in [batcher.submit(r) for r in payload]]
+                else:
+                    result = batcher.score(payload)
+            except Exception as e:
+                self._reply(400, {'error': str(e)})
+                return
+            self._reply(200, result)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), QuoteHandler)
+
+
+def serve_jsonlines(batcher, infile=sys.stdin, outfile=sys.stdout):
+    """
+    Score JSON-lines quotes from `infile`, writing one JSON result per line in input order.
+
+    Lines are submitted as they are read and written as soon as they are
+    scored, so a pipe of many quotes is batched while a single interactive
+    quote is answered immediately. A line that is not valid JSON gets an
+    {"error": ...} record in its place, and the stream carries on.
+
+    Returns:
+    - int: Number of non-empty lines answered.
+    """
+    pending = queue.Queue()
+
+    def write_results():
+        while (future := pending.get()) is not None:
+            try:
+                outfile.write(json.dumps(future.result()) + '\n')
+            except Exception as e:
+                outfile.write(json.dumps({'error': str(e)}) + '\n')
+            outfile.flush()
+
+    writer = threading.Thread(target=write_results, daemon=True)
+    writer.start()
+    count = 0
+    for line in infile:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            failed = Future()
+            failed.set_exception(ValueError(f"Invalid JSON: {e}"))
+            pending.put(failed)
+        else:
+            pending.put(batcher.submit(record))
+        count += 1
+    pending.put(None)
+    writer.join()
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve risk-based premium quotes.')
+    parser.add_argument('model_dir', help='Directory written by src.train.train_claim_models')
+    parser.add_argument('--model', default='xgboost', choices=['xgboost', 'linear'])
+    parser.add_argument('--loading', type=float, default=0.1)
+    parser.add_argument('--fixed-loading', type=float, default=0.0)
+    parser.add_argument('--http', type=int, metavar='PORT', help='Serve HTTP instead of stdin JSON lines')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--max-batch-size', type=int, default=512)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    scorer = PremiumScorer(args.model_dir, args.model, args.loading, args.fixed_loading)
+    batcher = MicroBatcher(scorer, args.max_batch_size, args.max_wait_ms)
+    if args.http is None:
+        serve_jsonlines(batcher)
+    else:
+        server = make_http_server(batcher, args.host, args.http)
+        logging.info(f"Serving quotes on http://{args.host}:{args.http}/quote")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
+    batcher.close()
+    logging.info(f"Latency: {batcher.latency_stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,395 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import psutil
+import xgboost as xgb
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.linear_model import SGDClassifier, SGDRegressor
+from sklearn.metrics import f1_score, mean_squared_error, r2_score, roc_auc_score
+from sklearn.preprocessing import StandardScaler
+
+from src.feature_pipeline import InsuranceFeaturePipeline, extract_targets
+
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+TASKS = ('severity', 'probability')
+TARGETS = {'severity': 'TotalClaims', 'probability': 'ClaimOccurred'}
+PIPELINE_FILE = 'feature_pipeline.joblib'
+REPORT_FILE = 'training_report.json'
+XGB_PARAMS = {
+    'severity': {'objective': 'reg:squarederror', 'eval_metric': 'rmse'},
+    'probability': {'objective': 'binary:logistic', 'eval_metric': 'auc'},
+}
+
+
+def model_file(task, model):
+    """File name of a persisted model, e.g. severity_xgboost.json."""
+    return f"{task}_{model}.json" if model == 'xgboost' else f"{task}_{model}.joblib"
+
+
+class PeakMemory:
+    """
+    Context manager sampling the process RSS in a background thread.
+
+    Native allocations (XGBoost, NumPy) are included, which tracemalloc would miss.
+    After the block, `peak_mb` holds the highest RSS observed and `seconds` the wall time.
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self.seconds = 0.0
+        self._process = psutil.Process()
+        self._stop = threading.Event()
+
+    def _sample(self):
+        self.peak_mb = max(self.peak_mb, self._process.memory_info().rss / 2 ** 20)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._start = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        self.seconds = time.perf_counter() - self._start
+        return False
+
+
+SPLITS = ('train', 'validation', 'test')
+
+
+def _split_labels(chunk, validation_fraction, test_fraction=0.0):
+    """
+    Deterministic train / validation / test split by hashing PolicyID (or the row index).
+
+    Hashing keeps the split identical across passes and chunk sizes, and a
+    policy's monthly rows never straddle two splits. Returns one label per row
+    as an array of indices into SPLITS.
+    """
+    keys = chunk['PolicyID'].to_numpy() if 'PolicyID' in chunk.columns else chunk.index.to_numpy()
+    bucket = pd.util.hash_array(np.asarray(keys)) % 10_000
+    return np.where(bucket < validation_fraction * 10_000, 1,
+                    np.where(bucket < (validation_fraction + test_fraction) * 10_000, 2, 0))
+
+
+def iter_training_batches(make_chunks, pipeline, task, split='train', validation_fraction=0.2, test_fraction=0.0):
+    """
+    Stream (features, target) batches for one task.
+
+    Parameters:
+    - make_chunks (callable): Returns a fresh iterable of raw DataFrame chunks on every call,
+      e.g. lambda: iter_data_chunks(path, ',').
+    - pipeline (InsuranceFeaturePipeline): Fitted feature pipeline.
+    - task (str): 'severity' (rows with a claim, target TotalClaims) or 'probability' (all rows).
+    - split (str): 'train', 'validation' (early stopping) or 'test' (held-out evaluation).
+    - validation_fraction (float): Share of policies held out for validation.
+    - test_fraction (float): Share of policies held out for evaluation.
+
+    Yields:
+    - tuple: float32 feature matrix and float64 target of one chunk.
+    """
+    for chunk in make_chunks():
+        targets = extract_targets(chunk)
+        mask = _split_labels(chunk, validation_fraction, test_fraction) == SPLITS.index(split)
+        if task == 'severity':
+            mask &= targets['ClaimOccurred'].to_numpy() == 1
+        if not mask.any():
+            continue
+        X = pipeline.transform(chunk[mask]).to_numpy()
+        y = targets[TARGETS[task]].to_numpy(dtype=np.float64)[mask]
+        yield X, y
+
+
+class _BatchIter(xgb.DataIter):
+    """Feeds streamed batches to XGBoost, which may call reset() and iterate several times."""
+
+    def __init__(self, make_batches, cache_prefix=None):
+        self._make_batches = make_batches
+        self._batches = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._batches is None:
+            self._batches = iter(self._make_batches())
+        batch = next(self._batches, None)
+        if batch is None:
+            return False
+        input_data(data=batch[0], label=batch[1])
+        return True
+
+    def reset(self):
+        self._batches = None
+
+
+class StreamingLinearModel:
+    """
+    Linear baseline fitted with partial_fit over streamed batches.
+
+    Replaces LinearRegression / LogisticRegression of the notebook: features are
+    standardized with statistics from one streaming pass, then SGD makes
+    `n_epochs` passes. Severity targets are standardized too, so the heavy
+    right tail does not blow up the SGD step size.
+    """
+
+    def __init__(self, task, n_epochs=3, random_state=42):
+        self.task = task
+        self.n_epochs = n_epochs
+        self.random_state = random_state
+
+    def fit_stream(self, make_batches):
+        self.scaler_ = StandardScaler()
+        y_count = y_sum = y_sumsq = 0.0
+        for X, y in make_batches():
+            self.scaler_.partial_fit(X)
+            y_count, y_sum, y_sumsq = y_count + len(y), y_sum + y.sum(), y_sumsq + (y * y).sum()
+        if y_count == 0:
+            raise ValueError(f"No training rows for the {self.task} model.")
+        self.y_mean_ = y_sum / y_count
+        self.y_scale_ = np.sqrt(max(y_sumsq / y_count - self.y_mean_ ** 2, 0.0)) or 1.0
+
+        if self.task == 'severity':
+            self.model_ = SGDRegressor(random_state=self.random_state)
+        else:
+            self.model_ = SGDClassifier(loss='log_loss', alpha=1e-4, random_state=self.random_state)
+        for _ in range(self.n_epochs):
+            for X, y in make_batches():
+                X = np.nan_to_num(self.scaler_.transform(X))
+                if self.task == 'severity':
+                    self.model_.partial_fit(X, (y - self.y_mean_) / self.y_scale_)
+                else:
+                    self.model_.partial_fit(X, y.astype(np.int8), classes=[0, 1])
+        return self
+
+    def predict(self, X):
+        """Expected severity, or P(claim) for the probability task."""
+        X = np.nan_to_num(self.scaler_.transform(X))
+        if self.task == 'severity':
+            return self.model_.predict(X) * self.y_scale_ + self.y_mean_
+        return self.model_.predict_proba(X)[:, 1]
+
+
+def _sample_batches(make_batches, max_rows):
+    """Concatenate the first `max_rows` streamed rows (for learners that cannot stream)."""
+    xs, ys, n = [], [], 0
+    for X, y in make_batches():
+        xs.append(X[:max_rows - n])
+        ys.append(y[:max_rows - n])
+        n += len(xs[-1])
+        if n >= max_rows:
+            break
+    return np.vstack(xs), np.concatenate(ys)
+
+
+def _evaluate(task, predict, make_batches):
+    """Held-out metrics of one model, accumulating predictions batch by batch."""
+    preds, ys = [], []
+    for X, y in make_batches():
+        preds.append(np.asarray(predict(X), dtype=np.float64))
+        ys.append(y)
+    if not ys:
+        return {}
+    pred, y = np.concatenate(preds), np.concatenate(ys)
+    if task == 'severity':
+        return {'rmse': float(np.sqrt(mean_squared_error(y, pred))), 'r2': float(r2_score(y, pred))}
+    metrics = {'f1': float(f1_score(y, pred >= 0.5, zero_division=0))}
+    metrics['roc_auc'] = float(roc_auc_score(y, pred)) if 0 < y.sum() < len(y) else np.nan
+    return metrics
+
+
+def train_xgboost(task, train_batches, validation_batches, params=None, num_boost_round=500,
+                  early_stopping_rounds=20, external_memory=False, cache_dir=None):
+    """
+    Train an XGBoost model from streamed batches with the `hist` method and early stopping.
+
+    With `external_memory`, the quantized pages are cached on disk
+    (ExtMemQuantileDMatrix); otherwise they are kept in memory as a
+    QuantileDMatrix, which stores one byte per value instead of the float matrix.
+
+    Parameters:
+    - task (str): 'severity' or 'probability'.
+    - train_batches, validation_batches (callable): Return a fresh iterable of (X, y) batches.
+    - params (dict, optional): Booster parameters overriding the defaults.
+    - num_boost_round (int): Maximum number of trees.
+    - early_stopping_rounds (int): Stop when the validation metric has not improved for this many rounds.
+    - external_memory (bool): Keep the training pages on disk.
+    - cache_dir (str, optional): Directory for the external-memory cache (a temporary one by default).
+
+    Returns:
+    - xgb.Booster: The trained booster, truncated to its best iteration by early stopping.
+      When the validation split has no rows (a small book), all `num_boost_round`
+      trees are trained without early stopping and a warning is logged.
+    """
+    booster_params = {'tree_method': 'hist', 'max_bin': 256, 'eta': 0.1, 'max_depth': 6,
+                      'seed': 42, **XGB_PARAMS[task], **(params or {})}
+    has_validation = next(iter(validation_batches()), None) is not None
+    if not has_validation:
+        logging.warning(f"No validation rows for the {task} model; training {num_boost_round} rounds "
+                        "without early stopping.")
+    with tempfile.TemporaryDirectory(dir=cache_dir) as tmp:
+        if external_memory:
+            dtrain = xgb.ExtMemQuantileDMatrix(_BatchIter(train_batches, os.path.join(tmp, 'train')),
+                                               max_bin=booster_params['max_bin'])
+        else:
+            dtrain = xgb.QuantileDMatrix(_BatchIter(train_batches), max_bin=booster_params['max_bin'])
+        if has_validation:
+            dvalid = xgb.QuantileDMatrix(_BatchIter(validation_batches), ref=dtrain)
+            booster = xgb.train(booster_params, dtrain, num_boost_round=num_boost_round,
+                                evals=[(dvalid, 'validation')], early_stopping_rounds=early_stopping_rounds,
+                                verbose_eval=False)
+            del dvalid
+        else:
+            booster = xgb.train(booster_params, dtrain, num_boost_round=num_boost_round, verbose_eval=False)
+        # Release the matrices while their cache files still exist.
+        del dtrain
+    if has_validation and booster.best_iteration + 1 < booster.num_boosted_rounds():
+        booster = booster[:booster.best_iteration + 1]
+    return booster
+
+
+def fit_feature_pipeline(make_chunks, rows=200_000, validation_fraction=0.2, test_fraction=0.1, **pipeline_params):
+    """
+    Fit a feature pipeline on the first `rows` training rows of the stream.
+
+    Validation and test policies are left out, so vocabularies, frequencies and
+    imputation values learn nothing from the rows the models are judged on.
+
+    Parameters:
+    - make_chunks (callable): Returns a fresh iterable of raw DataFrame chunks.
+    - rows (int): Training rows to fit on.
+    - validation_fraction, test_fraction (float): The split used by train_claim_models.
+    - pipeline_params: Passed to InsuranceFeaturePipeline.
+
+    Returns:
+    - InsuranceFeaturePipeline: The fitted pipeline.
+    """
+    parts, n = [], 0
+    for chunk in make_chunks():
+        chunk = chunk[_split_labels(chunk, validation_fraction, test_fraction) == 0]
+        parts.append(chunk.iloc[:rows - n])
+        n += len(parts[-1])
+        if n >= rows:
+            break
+    sample = pd.concat(parts)
+    return InsuranceFeaturePipeline(**pipeline_params).fit(sample)
+
+
+def train_claim_models(make_chunks, pipeline=None, output_dir=None, models=('linear', 'xgboost'),
+                       validation_fraction=0.2, test_fraction=0.1, pipeline_rows=200_000,
+                       random_forest_rows=50_000, xgb_params=None, num_boost_round=500,
+                       early_stopping_rounds=20, external_memory=False):
+    """
+    Train the claim-severity and claim-probability models on the full book, out of core.
+
+    Every model consumes the data as a stream of feature batches, so memory is
+    bounded by the chunk size (plus XGBoost's quantized matrix, or its disk
+    cache with `external_memory`), not by the number of policies.
+    Random forests cannot be trained incrementally; when requested they are fitted on the
+    first `random_forest_rows` training rows only, as the notebook did with its sample.
+    Policies are split three ways: training rows fit the models (and the pipeline),
+    validation rows drive early stopping, and the reported metrics come from
+    test rows that neither touched.
+
+    Parameters:
+    - make_chunks (callable): Returns a fresh iterable of raw DataFrame chunks on every call.
+    - pipeline (InsuranceFeaturePipeline, optional): Fitted pipeline; fitted on the first
+      `pipeline_rows` training rows when omitted (see fit_feature_pipeline).
+    - output_dir (str, optional): Directory for the pipeline, the models and the report.
+    - models (iterable): Any of 'linear', 'xgboost' and 'random_forest'.
+    - validation_fraction (float): Share of policies held out for early stopping.
+    - test_fraction (float): Share of policies held out for the reported metrics. With 0 the
+      metrics fall back to the validation rows and are optimistic for XGBoost.
+    - pipeline_rows (int): Rows used to fit the feature pipeline.
+    - random_forest_rows (int): Training rows for the random forests.
+    - xgb_params (dict, optional): Booster parameter overrides.
+    - num_boost_round (int): Maximum number of boosting rounds.
+    - early_stopping_rounds (int): Early-stopping patience.
+    - external_memory (bool): Use XGBoost's external-memory DMatrix.
+
+    Returns:
+    - tuple: Dict of fitted models keyed by (task, model), and a DataFrame with one row
+      per (task, model): seconds, peak_rss_mb, eval_split and held-out metrics.
+    """
+    if pipeline is None:
+        pipeline = fit_feature_pipeline(make_chunks, pipeline_rows, validation_fraction, test_fraction)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        pipeline.save(os.path.join(output_dir, PIPELINE_FILE))
+
+    eval_split = 'test' if test_fraction > 0 else 'validation'
+    fitted, report = {}, []
+    for task in TASKS:
+        def train_batches(task=task):
+            return iter_training_batches(make_chunks, pipeline, task, 'train', validation_fraction, test_fraction)
+
+        def validation_batches(task=task):
+            return iter_training_batches(make_chunks, pipeline, task, 'validation', validation_fraction,
+                                         test_fraction)
+
+        def evaluation_batches(task=task):
+            return iter_training_batches(make_chunks, pipeline, task, eval_split, validation_fraction,
+                                         test_fraction)
+
+        for name in models:
+            try:
+                with PeakMemory() as usage:
+                    if name == 'xgboost':
+                        model = train_xgboost(task, train_batches, validation_batches, xgb_params,
+                                              num_boost_round, early_stopping_rounds, external_memory)
+                        predict = lambda X, model=model: model.inplace_predict(X)
+                    elif name == 'linear':
+                        model = StreamingLinearModel(task).fit_stream(train_batches)
+                        predict = model.predict
+                    elif name == 'random_forest':
+                        X, y = _sample_batches(train_batches, random_forest_rows)
+                        if task == 'severity':
+                            model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
+                            predict = lambda X, model=model: model.predict(X)
+                        else:
+                            model = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1)
+                            predict = lambda X, model=model: model.predict_proba(X)[:, 1]
+                        model.fit(X, y)
+                    else:
+                        raise ValueError(f"Unknown model: {name}")
+            except (ValueError, xgb.core.XGBoostError) as e:
+                logging.error(f"Training {name} for {task} failed: {e}")
+                report.append({'task': task, 'model': name, 'error': str(e)})
+                continue
+
+            entry = {'task': task, 'model': name, 'seconds': usage.seconds, 'peak_rss_mb': usage.peak_mb,
+                     'eval_split': eval_split}
+            if name == 'xgboost':
+                entry['best_iteration'] = int(model.num_boosted_rounds()) - 1
+            entry.update(_evaluate(task, predict, evaluation_batches))
+            report.append(entry)
+            fitted[(task, name)] = model
+            logging.info(f"Trained {name} for {task} in {usage.seconds:.1f}s (peak RSS {usage.peak_mb:.0f} MB).")
+
+            if output_dir:
+                path = os.path.join(output_dir, model_file(task, name))
+                if name == 'xgboost':
+                    model.save_model(path)
+                else:
+                    joblib.dump(model, path)
+
+    report = pd.DataFrame(report)
+    if output_dir:
+        with open(os.path.join(output_dir, REPORT_FILE), 'w', encoding='utf-8') as f:
+            json.dump(report.to_dict('records'), f, indent=2, default=float)
+    return fitted, report
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The scripts are imported the same way the notebooks do it: as top-level
+# modules from the scripts/ directory.
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(ROOT, 'scripts'))
+sys.path.append(ROOT)
+
+
+@pytest.fixture(scope='session')
+def policy_book():
+    """Small policy book with a claim-probability signal (Province) and a severity signal (SumInsured)."""
+    rng = np.random.default_rng(10)
+    n = 6000
+    sum_insured = rng.gamma(2.0, 50_000.0, n)
+    province = rng.choice(['Gauteng', 'Limpopo', 'Western Cape'], n)
+    risk = 0.05 + 0.15 * (province == 'Gauteng')
+    claimed = rng.random(n) < risk
+    return pd.DataFrame({
+        'PolicyID': rng.integers(0, 3000, n),
+        'TransactionMonth': rng.choice(['2015-01-01', '2015-02-01'], n),
+        'Province': province,
+        'Model': rng.choice([f'M{i}' for i in range(70)], n),
+        'SumInsured': sum_insured,
+        'TotalPremium': rng.gamma(2.0, 50.0, n),
+        'TotalClaims': np.where(claimed, 0.1 * sum_insured + rng.gamma(2.0, 1000.0, n), 0.0),
+    })
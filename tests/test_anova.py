@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+from statsmodels.formula.api import ols
+from statsmodels.stats.oneway import anova_oneway
+
+from anova import group_summary, one_way_anova, welch_anova
+
+
+@pytest.fixture
+def claims():
+    rng = np.random.default_rng(0)
+    groups = rng.choice([f'PC{i}' for i in range(40)], size=3000)
+    values = rng.lognormal(mean=8, sigma=1.5, size=3000) + 1e6 * (groups == 'PC3')
+    return pd.DataFrame({'TotalClaims': values, 'PostalCode': groups})
+
+
+def test_group_summary_matches_groupby(claims):
+    summary = group_summary(claims['TotalClaims'], claims['PostalCode'])
+    grouped = claims.groupby('PostalCode')['TotalClaims']
+
+    np.testing.assert_array_equal(summary['count'], grouped.count())
+    np.testing.assert_allclose(summary['sum'], grouped.sum())
+    np.testing.assert_allclose(summary['sumsq'], grouped.apply(lambda s: (s ** 2).sum()))
+
+
+def test_one_way_anova_matches_ols(claims):
+    table = sm.stats.anova_lm(ols('TotalClaims ~ C(PostalCode)', data=claims).fit(), typ=2)
+
+    result = one_way_anova(claims['TotalClaims'], claims['PostalCode'])
+
+    assert result.statistic == pytest.approx(table['F'].iloc[0], rel=1e-9)
+    assert result.pvalue == pytest.approx(table['PR(>F)'].iloc[0], rel=1e-6, abs=1e-300)
+    assert (result.df_between, result.df_within) == (39, 2960)
+
+
+def test_welch_anova_matches_statsmodels(claims):
+    expected = anova_oneway(claims['TotalClaims'], claims['PostalCode'], use_var='unequal')
+
+    result = welch_anova(claims['TotalClaims'], claims['PostalCode'])
+
+    assert result.statistic == pytest.approx(expected.statistic, rel=1e-9)
+    assert result.df_within == pytest.approx(expected.df_denom, rel=1e-9)
+
+
+def test_one_way_anova_needs_two_groups():
+    with pytest.raises(ValueError):
+        one_way_anova([1.0, 2.0, 3.0], ['a', 'a', 'a'])
+
+
+def test_one_way_anova_of_constant_data_is_undefined():
+    result = one_way_anova([1.0, 1.0, 1.0, 1.0], ['a', 'a', 'b', 'b'])
+
+    assert np.isnan(result.statistic) and np.isnan(result.pvalue)
+
+
+@pytest.mark.parametrize('method', ['sufficient', 'ols'])
+def test_anova_pvalue_methods_agree(claims, method):
+    from Statistical_hyphothesis import anova_pvalue
+
+    expected = one_way_anova(claims['TotalClaims'], claims['PostalCode']).pvalue
+
+    assert anova_pvalue(claims, 'TotalClaims', 'PostalCode', method) == pytest.approx(expected, rel=1e-6)
@@ -0,0 +1,67 @@
+import os
+
+import pandas as pd
+
+from benchmarks.run_benchmarks import (BENCHMARKS, DEFAULT_SCALES, _book_file, _generator_version,
+                                       compare_to_baseline, load_baseline, main, run_benchmark, save_baseline)
+
+
+def _results(seconds, memory_mb):
+    return pd.DataFrame({'benchmark': ['load_data'], 'rows': [1000], 'seconds': [seconds], 'memory_mb': [memory_mb]})
+
+
+def test_every_benchmark_runs_at_a_small_scale(tmp_path):
+    for name in BENCHMARKS:
+        result = run_benchmark(name, 3_000, work_dir=str(tmp_path))
+
+        assert result['benchmark'] == name and result['rows'] == 3_000
+        assert result['seconds'] > 0 and result['memory_mb'] >= 0
+
+
+def test_books_are_keyed_by_generator_version(tmp_path):
+    (tmp_path / 'synthetic_500_0.txt').write_text('left over by an older generator')
+
+    path = _book_file(str(tmp_path), 500, 0)
+
+    assert path.endswith(f'synthetic_500_0_{_generator_version()}.txt')
+    assert len(pd.read_csv(path, sep='|')) == 500
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['synthetic_500_0.txt', os.path.basename(path)]
+
+
+def test_default_scales_are_in_the_baseline():
+    recorded = {int(key.split('@')[1]) for key in load_baseline()}
+
+    assert set(DEFAULT_SCALES) <= recorded
+
+
+def test_regressions_are_flagged_against_the_baseline(tmp_path):
+    path = str(tmp_path / 'baseline.json')
+    save_baseline(_results(1.0, 100.0), path)
+    baseline = load_baseline(path)
+
+    assert baseline == {'load_data@1000': {'seconds': 1.0, 'memory_mb': 100.0}}
+    assert compare_to_baseline(_results(1.2, 120.0), baseline)['regression'].iloc[0] == ''
+    assert compare_to_baseline(_results(2.0, 110.0), baseline)['regression'].iloc[0] == 'time'
+    assert compare_to_baseline(_results(1.0, 200.0), baseline)['regression'].iloc[0] == 'memory'
+    # Small absolute memory growth is noise, whatever the ratio.
+    small = {'load_data@1000': {'seconds': 1.0, 'memory_mb': 5.0}}
+    assert compare_to_baseline(_results(1.0, 20.0), small)['regression'].iloc[0] == ''
+    # Likewise for timings of a few milliseconds.
+    fast = {'load_data@1000': {'seconds': 0.02, 'memory_mb': 100.0}}
+    assert compare_to_baseline(_results(0.06, 100.0), fast)['regression'].iloc[0] == ''
+    assert compare_to_baseline(_results(0.2, 100.0), fast)['regression'].iloc[0] == 'time'
+    # Scales without a baseline are reported but never flagged.
+    assert compare_to_baseline(_results(9.0, 900.0), {})['regression'].iloc[0] == ''
+
+
+def test_cli_fails_on_regression_and_updates_the_baseline(tmp_path):
+    path = str(tmp_path / 'baseline.json')
+    save_baseline(pd.DataFrame({'benchmark': ['aggregate_monthly_trends'], 'rows': [2_000],
+                                'seconds': [1e-6], 'memory_mb': [0.0]}), path)
+    argv = ['--scales', '2000', '--benchmarks', 'aggregate_monthly_trends', '--baseline', path,
+            '--work-dir', str(tmp_path), '--min-seconds', '0']
+
+    assert main(argv) == 0
+    assert main(argv + ['--fail-on-regression']) == 1
+    assert main(argv + ['--update-baseline']) == 0
+    assert load_baseline(path)['aggregate_monthly_trends@2000']['seconds'] > 1e-6
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+import shap
+
+from src.explain import ShapCache, ShardedExplainer, model_hash
+from src.feature_pipeline import InsuranceFeaturePipeline
+from src.train import train_claim_models
+
+
+@pytest.fixture(scope='module')
+def severity_model(policy_book):
+    models, _ = train_claim_models(lambda: iter([policy_book]), models=('xgboost',), num_boost_round=20)
+    return models[('severity', 'xgboost')]
+
+
+@pytest.fixture(scope='module')
+def features(policy_book):
+    return InsuranceFeaturePipeline().fit(policy_book).transform(policy_book.head(600))
+
+
+def test_sharded_values_match_tree_explainer(severity_model, features):
+    expected = shap.TreeExplainer(severity_model).shap_values(features)
+
+    with ShardedExplainer(severity_model, n_jobs=2, shard_size=200) as explainer:
+        values = explainer.explain(features)
+
+    np.testing.assert_allclose(values, expected, rtol=1e-4, atol=1e-3)
+
+
+def test_sklearn_classifier_explains_the_positive_class(policy_book, features, tmp_path):
+    from sklearn.ensemble import RandomForestClassifier
+
+    model = RandomForestClassifier(n_estimators=10, max_depth=4, random_state=0)
+    model.fit(features, policy_book.head(600)['TotalClaims'] > 0)
+    expected = shap.TreeExplainer(model).shap_values(features.iloc[:50])[..., 1]
+
+    with ShardedExplainer(model, cache_dir=str(tmp_path), n_jobs=2, shard_size=25) as explainer:
+        values = explainer.explain(features.iloc[:50])
+        again = explainer.explain(features.iloc[:50])
+
+    assert values.shape == (50, features.shape[1])
+    np.testing.assert_allclose(values, expected, rtol=1e-4, atol=1e-6)
+    np.testing.assert_array_equal(again, values)
+    np.testing.assert_allclose(values.sum(axis=1) + explainer.expected_value,
+                               model.predict_proba(features.iloc[:50])[:, 1], atol=1e-4)
+
+
+def test_cache_serves_repeated_rows(severity_model, features, tmp_path):
+    first = ShardedExplainer(severity_model, cache_dir=str(tmp_path))
+    values = first.explain(features.iloc[:400])
+
+    rerun = ShardedExplainer(severity_model, cache_dir=str(tmp_path))
+    again = rerun.explain(features)
+
+    np.testing.assert_array_equal(again[:400], values)
+    assert rerun.stats['rows_cached'] == 400 and rerun.stats['rows_computed'] == 200
+    assert len(ShapCache(str(tmp_path), model_hash(severity_model))) >= len(features.drop_duplicates())
+
+
+def test_global_importance_is_streamed(severity_model, features):
+    explainer = ShardedExplainer(severity_model)
+    full = np.abs(explainer.explain(features)).mean(axis=0)
+
+    importance = explainer.global_importance(features.iloc[i:i + 150] for i in range(0, len(features), 150))
+
+    np.testing.assert_allclose(importance.loc[features.columns, 'mean_abs_shap'], full, rtol=1e-5)
+    assert importance.index[0] == 'SumInsured'
+
+
+def test_model_hash_changes_with_the_model(severity_model, policy_book):
+    other, _ = train_claim_models(lambda: iter([policy_book]), models=('xgboost',), num_boost_round=5)
+
+    assert model_hash(severity_model) == model_hash(severity_model)
+    assert model_hash(severity_model) != model_hash(other[('severity', 'xgboost')])
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.feature_pipeline import InsuranceFeaturePipeline, extract_targets
+
+
+@pytest.fixture
+def policies():
+    rng = np.random.default_rng(9)
+    n = 400
+    return pd.DataFrame({
+        'PolicyID': np.arange(n),
+        'TransactionMonth': rng.choice(['2015-01-01 00:00:00', '2015-06-01 00:00:00', None], n),
+        'VehicleIntroDate': rng.choice(['6/2002', '1/2010', 'bad'], n),
+        'IsVATRegistered': rng.random(n) < 0.2,
+        'CapitalOutstanding': pd.Categorical(rng.choice(['119,300', '0', None], n)),
+        'Gender': rng.choice(['Male', 'Female', '', None], n),
+        'Province': pd.Categorical(rng.choice(['Gauteng', 'Limpopo', 'Western Cape'], n)),
+        'Model': rng.choice([f'MODEL {i}' for i in range(80)], n),
+        'kilowatts': np.where(rng.random(n) < 0.1, np.nan, rng.integers(50, 150, n)).astype(np.float32),
+        'TotalPremium': rng.gamma(2.0, 50.0, n),
+        'TotalClaims': np.where(rng.random(n) < 0.1, 1000.0, 0.0),
+    })
+
+
+def test_fit_transform_produces_complete_float32_features(policies):
+    features = InsuranceFeaturePipeline().fit_transform(policies)
+
+    assert features.dtypes.eq(np.float32).all()
+    assert not features.isna().any().any()
+    assert 'PolicyID' not in features and 'TotalClaims' not in features
+    assert {'TransactionMonth_Year', 'VehicleIntroDate_Age_Years', 'Model_freq',
+            'Province_Limpopo', 'Province_Western Cape', 'CapitalOutstanding'} <= set(features.columns)
+    assert 'Province_Gauteng' not in features
+    # Missing values take the training median.
+    assert set(features['CapitalOutstanding']) == {0.0, 59650.0, 119300.0}
+
+
+def test_chunked_transform_matches_full_transform(policies):
+    pipeline = InsuranceFeaturePipeline(high_cardinality='hash').fit(policies)
+
+    chunks = pipeline.transform_chunks(policies.iloc[i:i + 64] for i in range(0, len(policies), 64))
+
+    pd.testing.assert_frame_equal(pd.concat(chunks), pipeline.transform(policies))
+    assert pipeline.transform(policies).filter(like='Model_hash').sum(axis=1).eq(1).all()
+
+
+def test_unseen_categories_and_persistence(policies, tmp_path):
+    pipeline = InsuranceFeaturePipeline().fit(policies)
+    path = str(tmp_path / 'pipeline.joblib')
+    pipeline.save(path)
+    new = policies.head(3).assign(Province=['Free State', 'Limpopo', None], Model='NEW MODEL')
+
+    features = InsuranceFeaturePipeline.load(path).transform(new)
+
+    assert features.loc[0, ['Province_Limpopo', 'Province_Western Cape']].sum() == 0
+    assert features.loc[1, 'Province_Limpopo'] == 1
+    assert (features['Model_freq'] == 0).all()
+
+
+def test_extract_targets(policies):
+    targets = extract_targets(policies)
+
+    assert targets['ClaimOccurred'].sum() == (policies['TotalClaims'] > 0).sum()
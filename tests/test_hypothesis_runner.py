@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from hypothesis_runner import (HypothesisSpec, load_results, prepare_hypothesis_frame,
+                               run_hypothesis_tests, save_results)
+
+
+@pytest.fixture
+def policies():
+    rng = np.random.default_rng(7)
+    n = 4000
+    province = rng.choice(['Gauteng', 'KwaZulu-Natal', 'Western Cape'], n)
+    has_claim = rng.random(n) < np.where(province == 'Gauteng', 0.12, 0.08)
+    return pd.DataFrame({
+        'Province': province,
+        'PostalCode': rng.integers(1, 60, n),
+        'Gender': rng.choice(['Male', 'Female', 'Not specified', ' '], n),
+        'TotalPremium': rng.gamma(2.0, 50.0, n),
+        'TotalClaims': np.where(has_claim, rng.lognormal(8, 1, n), 0.0),
+    })
+
+
+def test_prepare_does_not_mutate_caller(policies):
+    before = policies.copy()
+
+    frame = prepare_hypothesis_frame(policies)
+
+    pd.testing.assert_frame_equal(policies, before)
+    assert (frame['Gender'].str.strip() != '').all()
+    assert {'HasClaim', 'Margin'} <= set(frame.columns)
+
+
+def test_results_match_direct_scipy(policies):
+    results = {r.name: r for r in run_hypothesis_tests(policies, alpha=0.05)}
+    frame = prepare_hypothesis_frame(policies)
+    claims = frame[frame['HasClaim'] == 1]
+
+    chi2, p, dof, _ = stats.chi2_contingency(pd.crosstab(frame['Province'], frame['HasClaim']))
+    assert results['province_claim_frequency'].pvalue == pytest.approx(p)
+    assert results['province_claim_frequency'].dof == dof
+
+    f, p = stats.f_oneway(*[g['TotalClaims'] for _, g in claims.groupby('Province')])
+    assert results['province_claim_severity'].statistic == pytest.approx(f)
+    assert results['province_claim_severity'].group_counts == claims['Province'].value_counts().to_dict()
+
+    t, p = stats.ttest_ind(claims.loc[claims['Gender'] == 'Male', 'TotalClaims'],
+                           claims.loc[claims['Gender'] == 'Female', 'TotalClaims'], equal_var=False)
+    assert results['gender_claim_severity'].statistic == pytest.approx(t)
+    assert results['gender_claim_severity'].pvalue == pytest.approx(p)
+    assert all(r.error is None for r in results.values())
+
+
+def test_process_pool_matches_serial(policies):
+    serial = run_hypothesis_tests(policies, n_jobs=1)
+    parallel = run_hypothesis_tests(policies, n_jobs=2)
+
+    for a, b in zip(serial, parallel):
+        assert (a.name, a.statistic, a.pvalue, a.group_counts) == (b.name, b.statistic, b.pvalue, b.group_counts)
+
+
+def test_failed_test_reports_error(policies):
+    spec = HypothesisSpec('single_group', 'Province', 'TotalClaims', 'anova', groups=('Gauteng',))
+
+    result, = run_hypothesis_tests(policies, tests=[spec])
+
+    assert result.error and np.isnan(result.pvalue)
+
+
+@pytest.mark.parametrize('suffix', ['json', 'parquet'])
+def test_results_round_trip(policies, tmp_path, suffix):
+    results = run_hypothesis_tests(policies)
+    path = str(tmp_path / f'results.{suffix}')
+
+    save_results(results, path)
+
+    assert load_results(path) == results
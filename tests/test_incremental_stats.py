@@ -0,0 +1,96 @@
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from hypothesis_runner import run_hypothesis_tests
+from incremental_stats import SegmentStatsStore
+
+
+@pytest.fixture
+def history():
+    rng = np.random.default_rng(11)
+    n = 6000
+    province = rng.choice(['Gauteng', 'Limpopo', 'Western Cape'], n)
+    has_claim = rng.random(n) < np.where(province == 'Gauteng', 0.1, 0.06)
+    return pd.DataFrame({
+        'TransactionMonth': rng.choice(['2015-01-01 00:00:00', '2015-02-01 00:00:00',
+                                        '2015-03-01 00:00:00'], n),
+        'Province': province,
+        'PostalCode': rng.integers(1, 40, n),
+        'Gender': rng.choice(['Male', 'Female', 'Not specified'], n),
+        'TotalPremium': rng.gamma(2.0, 60.0, n),
+        'TotalClaims': np.where(has_claim, rng.lognormal(8, 1, n), 0.0),
+    })
+
+
+def _assert_same_results(actual, expected):
+    for a, b in zip(actual, expected):
+        assert a.name == b.name and a.error is None and b.error is None
+        assert a.statistic == pytest.approx(b.statistic, rel=1e-8)
+        assert a.pvalue == pytest.approx(b.pvalue, rel=1e-6, abs=1e-12)
+        assert a.group_counts == b.group_counts
+
+
+def test_monthly_updates_match_full_recompute(history):
+    store = SegmentStatsStore()
+    for _, month in history.groupby('TransactionMonth'):
+        store.update(month)
+
+    assert store.months == ['2015-01', '2015-02', '2015-03']
+    _assert_same_results(store.run_tests(), run_hypothesis_tests(history))
+
+
+def test_partitions_merge_in_any_order(history):
+    parts = [SegmentStatsStore.from_frame(part) for _, part in history.groupby('TransactionMonth')]
+
+    forward = reduce(SegmentStatsStore.merge, parts)
+    backward = reduce(SegmentStatsStore.merge, parts[::-1])
+
+    pd.testing.assert_frame_equal(forward.table, backward.table)
+
+
+def test_row_partitions_of_one_month_merge(history):
+    parts = [SegmentStatsStore.from_frame(part) for part in (history.iloc[::2], history.iloc[1::2])]
+
+    merged = parts[0].merge(parts[1])
+
+    assert merged.months == ['2015-01', '2015-02', '2015-03']
+    _assert_same_results(merged.run_tests(), run_hypothesis_tests(history))
+
+
+def test_folding_same_month_twice_is_rejected(history):
+    january = history[history['TransactionMonth'].str.startswith('2015-01')]
+    store = SegmentStatsStore.from_frame(january)
+
+    with pytest.raises(ValueError):
+        store.update(january)
+
+
+def test_float_postal_codes_merge_with_int_postal_codes(history):
+    early = history[~history['TransactionMonth'].str.startswith('2015-03')]
+    march = history[history['TransactionMonth'].str.startswith('2015-03')]
+    store = SegmentStatsStore.from_frame(early).update(march.astype({'PostalCode': float}))
+
+    postal = store.table[store.table['dimension'] == 'PostalCode']
+    assert not postal['group'].str.endswith('.0').any()
+    _assert_same_results(store.run_tests(), run_hypothesis_tests(history))
+
+
+def test_updating_with_an_unlabelled_batch_is_rejected(history):
+    store = SegmentStatsStore.from_frame(history)
+
+    with pytest.raises(ValueError, match='no .TransactionMonth. values'):
+        store.update(history.drop(columns='TransactionMonth'))
+
+
+def test_store_round_trip(history, tmp_path):
+    store = SegmentStatsStore.from_frame(history)
+    path = str(tmp_path / 'segments.json')
+
+    store.save(path)
+    loaded = SegmentStatsStore.load(path)
+
+    assert loaded.months == store.months
+    _assert_same_results(loaded.run_tests(), store.run_tests())
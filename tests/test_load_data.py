@@ -0,0 +1,148 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from load_data import cache_path_for, concat_chunks, iter_data_chunks, load_csv, load_data_chunked
+
+
+def _write_policy_file(path):
+    df = pd.DataFrame({
+        'PolicyID': range(10),
+        'Province': ['Gauteng', 'Western Cape'] * 5,
+        'Gender': ['Male', 'Female', 'Not specified', 'Male', 'Male'] * 2,
+        'PostalCode': [2000, 1459, 2000, 7100, 122] * 2,
+        'TotalPremium': [21.9, 0.0, 512.8, 3.3, 1.0] * 2,
+        'TotalClaims': [0.0, 0.0, 1200.5, 0.0, 0.0] * 2,
+    })
+    df.to_csv(path, sep='|', index=False)
+    return df
+
+
+def test_load_data_chunked_uses_compact_schema(tmp_path):
+    path = tmp_path / 'policies.txt'
+    expected = _write_policy_file(path)
+
+    df = load_data_chunked(str(path), '|', chunksize=3)
+
+    assert len(df) == len(expected)
+    assert isinstance(df['Province'].dtype, pd.CategoricalDtype)
+    assert df['PostalCode'].dtype == 'int16'
+    assert df['PolicyID'].dtype == 'int32'
+    assert df['TotalClaims'].sum() == expected['TotalClaims'].sum()
+    assert df.attrs['load_stats']['chunks'] == 4
+    assert df.attrs['load_stats']['rows'] == 10
+
+
+def test_iter_data_chunks_projects_columns(tmp_path):
+    path = tmp_path / 'policies.txt'
+    _write_policy_file(path)
+
+    chunks = list(iter_data_chunks(str(path), '|', chunksize=4, usecols=['Province', 'TotalClaims']))
+
+    assert [len(c) for c in chunks] == [4, 4, 2]
+    assert list(chunks[0].columns) == ['Province', 'TotalClaims']
+
+
+def test_concat_chunks_unions_categories():
+    a = pd.DataFrame({'Gender': pd.Categorical(['Male'])})
+    b = pd.DataFrame({'Gender': pd.Categorical(['Female'])})
+
+    df = concat_chunks([a, b])
+
+    assert isinstance(df['Gender'].dtype, pd.CategoricalDtype)
+    assert set(df['Gender'].cat.categories) == {'Male', 'Female'}
+    assert list(df['Gender']) == ['Male', 'Female']
+
+
+def test_load_data_chunked_missing_file(tmp_path):
+    assert load_data_chunked(str(tmp_path / 'missing.txt')).empty
+
+
+def _write_cleaned_csv(path):
+    df = pd.DataFrame({
+        'TransactionMonth': ['2014-12-01', '2015-01-01', '2015-02-01', '2015-03-01'],
+        'PostalCode': [2000, 1459, 2000, 7100],
+        'Gender': ['Male', np.nan, 'Female', 'Male'],
+        'TotalPremium': [21.9, 0.0, 512.8, 3.3],
+        'TotalClaims': [0.0, 0.0, 1200.5, 0.0],
+    })
+    df.to_csv(path, index=False)
+    return df
+
+
+def test_load_csv_builds_and_reuses_columnar_cache(tmp_path):
+    path = tmp_path / 'cleaned.csv'
+    _write_cleaned_csv(path)
+
+    cold = load_csv(str(path))
+    cache_file = cache_path_for(str(path))
+    warm = load_csv(str(path))
+
+    assert os.path.exists(cache_file)
+    pd.testing.assert_frame_equal(cold, warm)
+
+
+def test_load_csv_keeps_the_cache_of_a_sibling_file(tmp_path):
+    _write_cleaned_csv(tmp_path / 'cleaned.csv.bak')
+    load_csv(str(tmp_path / 'cleaned.csv.bak'))
+    sibling_cache = cache_path_for(str(tmp_path / 'cleaned.csv.bak'))
+
+    path = tmp_path / 'cleaned.csv'
+    _write_cleaned_csv(path)
+    load_csv(str(path))
+    _write_cleaned_csv(path)
+    os.utime(path, ns=(0, 0))
+    load_csv(str(path))
+
+    assert os.path.exists(sibling_cache)
+    assert sorted(os.listdir(os.path.dirname(sibling_cache))) == sorted(
+        os.path.basename(p) for p in (sibling_cache, cache_path_for(str(path))))
+
+
+def test_load_csv_skips_the_cache_of_a_file_parquet_cannot_store(tmp_path, monkeypatch):
+    import pyarrow.parquet as pq
+
+    path = tmp_path / 'cleaned.csv'
+    df = _write_cleaned_csv(path)
+    calls = []
+
+    def failing_write(*args, **kwargs):
+        calls.append(1)
+        raise TypeError('mixed types')
+
+    monkeypatch.setattr(pq, 'write_table', failing_write)
+    for _ in range(3):
+        pd.testing.assert_frame_equal(load_csv(str(path)), df)
+
+    assert len(calls) == 1
+    assert not os.path.exists(cache_path_for(str(path)))
+
+
+def test_load_csv_pushes_down_columns_and_filters(tmp_path):
+    path = tmp_path / 'cleaned.csv'
+    _write_cleaned_csv(path)
+    columns = ['TotalPremium', 'TotalClaims', 'PostalCode']
+    filters = [('TransactionMonth', '>=', '2015-01-01'), ('TransactionMonth', '<', '2015-03-01')]
+
+    for _ in range(2):
+        df = load_csv(str(path), columns=columns, filters=filters)
+        assert list(df.columns) == columns
+        assert df['PostalCode'].tolist() == [1459, 2000]
+
+    uncached = load_csv(str(path), columns=columns, filters=filters, use_cache=False)
+    pd.testing.assert_frame_equal(df, uncached)
+
+
+def test_load_csv_invalidates_cache_when_source_changes(tmp_path):
+    path = tmp_path / 'cleaned.csv'
+    df = _write_cleaned_csv(path)
+    load_csv(str(path))
+    old_cache = cache_path_for(str(path))
+
+    df.iloc[:2].to_csv(path, index=False)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+
+    assert len(load_csv(str(path))) == 2
+    assert not os.path.exists(old_cache)
+    assert os.path.exists(cache_path_for(str(path)))
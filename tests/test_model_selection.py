@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from src.feature_pipeline import InsuranceFeaturePipeline, extract_targets
+from src.model_selection import (Candidate, FoldSet, build_folds, expand_grid, grid_search,
+                                 run_fold_job, successive_halving)
+
+
+@pytest.fixture(scope='module')
+def probability_folds(policy_book, tmp_path_factory):
+    X = InsuranceFeaturePipeline().fit_transform(policy_book)
+    y = extract_targets(policy_book)['ClaimOccurred']
+    return build_folds(X, y, str(tmp_path_factory.mktemp('folds')), 'probability', n_splits=3)
+
+
+def test_folds_are_stratified_and_memory_mapped(probability_folds):
+    X, y, fold = FoldSet.load(probability_folds.directory).arrays()
+
+    assert isinstance(X, np.memmap) and X.shape[0] == probability_folds.n_rows
+    rates = [y[fold == k].mean() for k in range(3)]
+    assert max(rates) - min(rates) < 0.01
+
+
+def test_severity_folds_stratify_on_target_quantiles(tmp_path):
+    y = np.random.default_rng(0).lognormal(8, 2, 300)
+
+    folds = build_folds(np.ones((300, 2)), y, str(tmp_path), 'severity', n_splits=3)
+
+    _, y_mm, fold = folds.arrays()
+    assert all((y_mm[fold == k] > np.quantile(y, 0.9)).sum() == 10 for k in range(3))
+
+
+def test_grid_search_leaderboard(probability_folds):
+    candidates = [Candidate('linear')] + expand_grid('xgboost', {'max_depth': [2, 3], 'n_estimators': [20]})
+
+    board = grid_search(probability_folds, candidates, n_workers=2)
+
+    assert len(board) == 3 and (board['n_folds'] == 3).all()
+    assert board['roc_auc_mean'].is_monotonic_decreasing
+    assert {'f1_mean', 'fit_seconds', 'predict_seconds'} <= set(board.columns)
+    assert board['roc_auc_mean'].iloc[0] > 0.6
+
+
+def test_successive_halving_keeps_the_best(probability_folds):
+    candidates = expand_grid('xgboost', {'max_depth': [1, 2, 3], 'n_estimators': [5, 20, 40]})
+
+    board = successive_halving(probability_folds, candidates, eta=3)
+
+    assert set(board['subsample'].round(6)) == {round(1 / 3, 6), 1.0}
+    assert (board['subsample'] == 1.0).sum() == 3
+    assert board.attrs['best'] == board.iloc[0]['candidate']
+
+
+def test_time_budget_stops_new_jobs(probability_folds):
+    board = grid_search(probability_folds, expand_grid('random_forest', {'n_estimators': [50, 60, 70]}),
+                        time_budget=0.0)
+
+    assert board.empty
+
+
+def test_failed_jobs_are_reported(probability_folds):
+    row = run_fold_job(probability_folds, Candidate('xgboost', {'max_depth': -3}), fold=0)
+
+    assert 'error' in row
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from monthly_trend import (aggregate_monthly_trends, aggregate_monthly_trends_from_cube, build_monthly_cube,
+                           load_monthly_cube, query_monthly_cube, save_monthly_cube, update_monthly_cube)
+
+
+@pytest.fixture
+def book():
+    rng = np.random.default_rng(2)
+    n = 5000
+    return pd.DataFrame({
+        'TransactionMonth': rng.choice(['2015-01-01 00:00:00', '2015-02-01 00:00:00',
+                                        '2015-03-01 00:00:00'], n),
+        'Province': rng.choice(['Gauteng', 'Limpopo'], n),
+        'VehicleType': rng.choice(['Passenger Vehicle', 'Bus'], n),
+        'CoverType': rng.choice(['Own Damage', 'Windscreen'], n),
+        'TotalPremium': rng.gamma(2.0, 50.0, n),
+        'TotalClaims': np.where(rng.random(n) < 0.1, rng.lognormal(7, 1, n), 0.0),
+    })
+
+
+def test_cube_answers_aggregate_monthly_trends(book):
+    aggregation = {'TotalPremium': 'sum', 'TotalClaims': 'mean'}
+    expected = aggregate_monthly_trends(book, 'TransactionMonth', aggregation)
+
+    result = aggregate_monthly_trends_from_cube(build_monthly_cube(book), aggregation)
+
+    pd.testing.assert_frame_equal(result, expected, check_names=False, check_freq=False)
+
+
+def test_query_slice_and_derived_ratios(book):
+    cube = build_monthly_cube(book)
+
+    monthly = query_monthly_cube(cube, {'Province': 'Gauteng', 'CoverType': ['Windscreen']})
+
+    rows = book[(book['Province'] == 'Gauteng') & (book['CoverType'] == 'Windscreen')]
+    by_month = rows.groupby(pd.to_datetime(rows['TransactionMonth']))
+    np.testing.assert_allclose(monthly['loss_ratio'],
+                               by_month['TotalClaims'].sum() / by_month['TotalPremium'].sum())
+    np.testing.assert_allclose(monthly['claim_frequency'], by_month['TotalClaims'].apply(lambda s: (s > 0).mean()))
+    np.testing.assert_allclose(monthly['TotalPremium_std'], by_month['TotalPremium'].std())
+
+
+def test_update_replaces_redelivered_months(book):
+    march = book['TransactionMonth'].str.startswith('2015-03')
+    cube = build_monthly_cube(book[~march])
+
+    cube = update_monthly_cube(cube, book[march])
+    cube = update_monthly_cube(cube, book[march])
+
+    pd.testing.assert_frame_equal(cube, build_monthly_cube(book))
+
+
+def test_cube_round_trip(book, tmp_path):
+    cube = build_monthly_cube(book)
+    path = str(tmp_path / 'cube.parquet')
+
+    save_monthly_cube(cube, path)
+
+    pd.testing.assert_frame_equal(load_monthly_cube(path), cube)
@@ -0,0 +1,127 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from monthly_trend import aggregate_monthly_trends
+from pipeline import PipelineRunner, Stage, clean_insurance_data
+from src.scoring import PremiumScorer
+from synthetic_data import generate_insurance_book, write_insurance_book
+
+
+@pytest.fixture(scope='module')
+def book_path(tmp_path_factory):
+    return write_insurance_book(str(tmp_path_factory.mktemp('book') / 'book.txt'), 20_000, chunk_rows=10_000)
+
+
+def _params(path, alpha=0.05):
+    return {'load': {'path': path}, 'hypothesis': {'alpha': alpha},
+            'features': {'fit_rows': 10_000},
+            'models': {'models': ['xgboost'], 'num_boost_round': 10, 'chunk_rows': 8_000}}
+
+
+def _executed(metrics):
+    return set(metrics.loc[~metrics['cached'], 'stage'])
+
+
+def test_clean_follows_the_notebook_without_touching_the_input():
+    raw = generate_insurance_book(5_000, chunk_rows=5_000)
+    raw['Gender'] = raw['Gender'].cat.rename_categories(lambda c: f' {c} ')
+    before = raw.copy()
+    clean = clean_insurance_data(raw)
+
+    pd.testing.assert_frame_equal(raw, before)
+    assert 'CustomValueEstimate' not in clean and 'NumberOfVehiclesInFleet' not in clean
+    assert clean['Model'].notna().all() and len(clean) == raw['Model'].notna().sum()
+    assert clean[['Bank', 'AccountType', 'NewVehicle', 'Gender', 'MaritalStatus']].notna().all().all()
+    assert (clean['Bank'] == 'Unknown').sum() == raw.loc[raw['Model'].notna(), 'Bank'].isna().sum()
+    assert pd.api.types.is_datetime64_any_dtype(clean['TransactionMonth'])
+    assert clean['VehicleIntroDate'].dt.year.between(1988, 2015).all()
+    assert set(clean['Gender'].unique()) <= {'Not specified', 'Male', 'Female'}
+    assert set(clean_insurance_data(raw, lowercase=True)['Province'].unique()) <= set(
+        raw['Province'].str.lower().unique())
+
+
+def test_changing_alpha_reruns_only_the_hypothesis_stage(book_path, tmp_path):
+    cache = str(tmp_path / 'cache')
+    first = PipelineRunner(_params(book_path), cache, profile_dir=str(tmp_path / 'prof')).run()
+
+    assert _executed(first) == {'load', 'clean', 'hypothesis', 'monthly_cube', 'monthly_trends', 'features', 'models'}
+    assert first.set_index('stage').loc['load', 'rows_out'] == 20_000
+    assert (first[['wall_seconds', 'cpu_seconds', 'peak_rss_mb']] > 0).all().all()
+    assert sorted(os.listdir(tmp_path / 'prof')) == sorted(f'{stage}.prof' for stage in first['stage'])
+
+    assert _executed(PipelineRunner(_params(book_path), cache).run()) == set()
+    runner = PipelineRunner(_params(book_path, alpha=0.01), cache)
+    assert _executed(runner.run()) == {'hypothesis'}
+    assert len(runner.output('hypothesis')) == 7
+
+    with open(os.path.join(cache, 'pipeline_log.jsonl')) as f:
+        log = [json.loads(line) for line in f]
+    assert len(log) == 21 and len({record['run_id'] for record in log}) == 3
+
+
+def test_targets_forcing_and_export(book_path, tmp_path):
+    runner = PipelineRunner(_params(book_path), str(tmp_path / 'cache'))
+
+    assert list(runner.run(['monthly_trends'])['stage']) == ['load', 'clean', 'monthly_cube', 'monthly_trends']
+    assert _executed(runner.run(['monthly_trends'], force=['clean'])) == {'clean', 'monthly_cube', 'monthly_trends'}
+    trends = runner.output('monthly_trends')
+    assert len(trends) == 23 and trends['TotalPremium'].sum() > 0
+
+    runner.run(['models'])
+    models = runner.export('models', str(tmp_path / 'outputs'))
+    quotes = PremiumScorer(models).score(generate_insurance_book(50, seed=3))
+    assert (quotes['premium'] >= 0).all()
+
+
+def test_trends_are_answered_from_the_cached_cube(book_path, tmp_path):
+    params = _params(book_path)
+    runner = PipelineRunner(params, str(tmp_path / 'cache'))
+    runner.run(['monthly_trends'])
+
+    params['monthly_trends'] = {'aggregation': {'TotalPremium': 'mean'}, 'filters': {'Province': 'Gauteng'}}
+    assert _executed(runner.run(['monthly_trends'])) == {'monthly_trends'}
+    clean = runner.output('clean')
+    expected = aggregate_monthly_trends(clean[clean['Province'] == 'Gauteng'], 'TransactionMonth',
+                                        {'TotalPremium': 'mean'})
+    pd.testing.assert_frame_equal(runner.output('monthly_trends'), expected, check_names=False, check_freq=False)
+
+
+def test_a_changed_source_file_invalidates_everything_below_it(tmp_path):
+    path = write_insurance_book(str(tmp_path / 'book.txt'), 3_000, seed=1)
+    runner = PipelineRunner(_params(path), str(tmp_path / 'cache'))
+    runner.run(['clean'])
+    write_insurance_book(path, 3_500, seed=2)
+
+    metrics = runner.run(['clean'])
+    assert _executed(metrics) == {'load', 'clean'}
+    assert metrics.set_index('stage').loc['load', 'rows_out'] == 3_500
+
+
+def test_unknown_stage_is_rejected(book_path, tmp_path):
+    with pytest.raises(ValueError, match='Unknown stage'):
+        PipelineRunner(_params(book_path), str(tmp_path)).run(['plots'])
+
+
+def test_a_changed_library_module_invalidates_its_stage(tmp_path):
+    module = tmp_path / 'helpers.py'
+    module.write_text('SCALE = 1\n')
+    stages = [Stage('numbers', lambda inputs, params, workdir: pd.DataFrame({'x': [1, 2]}), modules=(str(module),)),
+              Stage('total', lambda inputs, params, workdir: inputs['numbers'].sum().to_frame(), ('numbers',))]
+    runner = PipelineRunner({}, str(tmp_path / 'cache'), stages=stages)
+    runner.run()
+    assert _executed(runner.run()) == set()
+
+    module.write_text('SCALE = 2\n')
+    assert _executed(runner.run()) == {'numbers', 'total'}
+
+
+def test_an_unreadable_source_fails_with_a_clear_error(tmp_path):
+    path = tmp_path / 'empty.txt'
+    path.write_text('')
+    params = _params(str(path))
+
+    with pytest.raises(ValueError, match='Could not load any policies'):
+        PipelineRunner(params, str(tmp_path / 'cache')).run(['load'])
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+from statsmodels.stats.multicomp import pairwise_tukeyhsd
+
+from anova import group_summary
+from posthoc import bh_adjust, describe_posthoc, holm_adjust, pairwise_posthoc, studentized_range_sf
+
+
+@pytest.fixture
+def severity():
+    rng = np.random.default_rng(3)
+    groups = rng.choice(list('ABCDEF'), size=1500)
+    values = rng.normal(0, 1, 1500) + 0.5 * (groups == 'A') + 0.3 * (groups == 'B')
+    return values, groups
+
+
+@pytest.mark.parametrize('k, df', [(2, 10), (6, 40), (50, 1000), (500, 5000)])
+def test_studentized_range_sf_matches_scipy(k, df):
+    q = np.array([1.0, 3.0, 5.0, 6.5])
+    np.testing.assert_allclose(studentized_range_sf(q, k, df),
+                               stats.studentized_range.sf(q, k, df), rtol=1e-2, atol=1e-6)
+
+
+def test_studentized_range_sf_meets_its_documented_accuracy():
+    q = np.linspace(0.25, 9.0, 36)
+    for k in (2, 6, 50, 500):
+        for df in (5, 17.3, 123.4, 1e6):
+            expected = stats.studentized_range.sf(q, k, df)
+            actual = studentized_range_sf(q, k, df)
+            assert np.abs(actual - expected).max() < 1e-3
+            tail = expected > 1e-4
+            np.testing.assert_allclose(actual[tail], expected[tail], rtol=3e-2)
+
+
+def test_tukey_kramer_matches_statsmodels(severity):
+    values, groups = severity
+    expected = pairwise_tukeyhsd(values, groups)
+
+    result = pairwise_posthoc(group_summary(values, groups), top_n=None)
+    result = result.sort_values(['group1', 'group2'])
+
+    np.testing.assert_allclose(result['meandiff'], expected.meandiffs, rtol=1e-9)
+    np.testing.assert_allclose(result['pvalue'], expected.pvalues, rtol=1e-2, atol=1e-6)
+    assert result.attrs['n_pairs'] == 15
+
+
+def test_blocks_and_top_n_keep_smallest_pvalues(severity):
+    values, groups = severity
+    summary = group_summary(values, groups)
+    full = pairwise_posthoc(summary, method='games-howell', top_n=None)
+
+    top = pairwise_posthoc(summary, method='games-howell', top_n=4, block_size=3)
+
+    pd.testing.assert_frame_equal(top, full.head(4))
+
+
+@pytest.mark.parametrize('correction, adjust', [('holm', holm_adjust), ('fdr_bh', bh_adjust)])
+def test_corrections_on_top_n_match_full_family(severity, correction, adjust):
+    values, groups = severity
+    summary = group_summary(values, groups)
+    full = pairwise_posthoc(summary, correction=correction, top_n=None)
+
+    significant = pairwise_posthoc(summary, correction=correction, top_n=None,
+                                   significant_only=True, block_size=2)
+
+    assert significant['reject'].all()
+    assert len(significant) == full['reject'].sum()
+    np.testing.assert_allclose(significant['pvalue_adj'], full['pvalue_adj'].head(len(significant)))
+    np.testing.assert_allclose(full['pvalue_adj'], adjust(full['pvalue'].to_numpy()))
+
+
+def test_holm_and_bh_adjust_known_values():
+    p = np.array([0.01, 0.04, 0.03, 0.005])
+    np.testing.assert_allclose(holm_adjust(p), [0.03, 0.06, 0.06, 0.02])
+    np.testing.assert_allclose(bh_adjust(p), [0.02, 0.04, 0.04, 0.02])
+
+
+@pytest.mark.parametrize('method, correction, name', [
+    ('tukey-kramer', None, 'Tukey-Kramer post-hoc test'),
+    ('games-howell', None, 'Games-Howell post-hoc test'),
+    ('games-howell', 'holm', 'Pairwise t-tests (unequal variances, Holm-adjusted)'),
+    ('tukey-kramer', 'fdr_bh', 'Pairwise t-tests (pooled variances, Benjamini-Hochberg-adjusted)'),
+])
+def test_describe_posthoc_names_method_and_correction(method, correction, name):
+    assert describe_posthoc(method, correction) == name
+
+
+def test_hypothesis_report_labels_the_posthoc_actually_run(capsys):
+    from Statistical_hyphothesis import statistic_hyphotesis_test
+    from synthetic_data import generate_insurance_book
+
+    book = generate_insurance_book(50_000, seed=1)
+    claimed = (book['Province'] == book['Province'].iloc[0]) & (book['TotalClaims'] > 0)
+    book.loc[claimed, 'TotalClaims'] += 1e6
+    statistic_hyphotesis_test(book, 0.05, anova_method='welch', posthoc_top_n=5, posthoc_correction='holm')
+
+    report = capsys.readouterr().out
+    assert "Tukey" not in report
+    assert "Pairwise t-tests (unequal variances, Holm-adjusted) for Claim Severity by Province (top 5 of" in report
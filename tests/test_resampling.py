@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from hypothesis_runner import RESAMPLING_TESTS, HypothesisSpec, evaluate_from_summary, run_hypothesis_tests
+from resampling import between_group_ss, bootstrap_group_means, bootstrap_test, permutation_test
+
+
+@pytest.fixture
+def severity():
+    rng = np.random.default_rng(14)
+    groups = rng.choice(['A', 'B', 'C'], 1500)
+    values = rng.lognormal(8, 1.2, 1500) * np.where(groups == 'C', 1.6, 1.0)
+    return values, groups
+
+
+def test_between_group_ss_matches_anova_decomposition(severity):
+    values, groups = severity
+    codes = pd.factorize(groups, sort=True)[0]
+    means = pd.Series(values).groupby(groups).mean()
+    counts = pd.Series(groups).value_counts().sort_index()
+
+    expected = (counts * (means - values.mean()) ** 2).sum()
+
+    assert between_group_ss(values, codes, 3) == pytest.approx(expected)
+    batch = between_group_ss(np.vstack([values, values[::-1]]), codes, 3)
+    assert batch.shape == (2,) and batch[0] == pytest.approx(expected)
+
+
+def test_permutation_agrees_with_anova_on_normal_data():
+    rng = np.random.default_rng(3)
+    groups = np.repeat(['x', 'y', 'z'], 200)
+    values = rng.normal(0, 1, 600) + np.repeat([0.0, 0.1, 0.25], 200)
+
+    result = permutation_test(values, groups, n_resamples=4000, seed=1)
+
+    anova_p = stats.f_oneway(*(values[groups == g] for g in 'xyz')).pvalue
+    assert result.pvalue == pytest.approx(anova_p, abs=0.01)
+    assert result.n_obs == 600 and result.n_groups == 3
+
+
+def test_tests_detect_the_skewed_difference_and_not_the_null(severity):
+    values, groups = severity
+
+    assert permutation_test(values, groups, 2000).pvalue < 0.01
+    assert bootstrap_test(values, groups, 2000).pvalue < 0.01
+    null = np.random.default_rng(0).permutation(values)
+    assert permutation_test(null, groups, 2000).pvalue > 0.05
+    assert bootstrap_test(null, groups, 2000).pvalue > 0.05
+
+
+def test_results_are_seeded_and_independent_of_n_jobs(severity):
+    values, groups = severity
+
+    serial = permutation_test(values, groups, n_resamples=3000, seed=5)
+    parallel = permutation_test(values, groups, n_resamples=3000, seed=5, n_jobs=2)
+
+    assert serial.pvalue == parallel.pvalue
+    assert bootstrap_test(values, groups, 3000, seed=5).pvalue == bootstrap_test(values, groups, 3000, seed=5,
+                                                                                 n_jobs=2).pvalue
+
+
+def test_bootstrap_group_means_cover_the_means(severity):
+    values, groups = severity
+
+    cis = bootstrap_group_means(values, groups, n_resamples=1000)
+
+    assert (cis['ci_low'] < cis['mean']).all() and (cis['mean'] < cis['ci_high']).all()
+    assert cis.loc['C', 'ci_low'] > cis.loc['A', 'mean']
+
+
+def test_runner_integration():
+    rng = np.random.default_rng(8)
+    n = 3000
+    df = pd.DataFrame({'Province': rng.choice(['Gauteng', 'Limpopo'], n),
+                       'PostalCode': rng.integers(1, 60, n),
+                       'Gender': rng.choice(['Male', 'Female'], n),
+                       'TotalPremium': rng.gamma(2.0, 50.0, n),
+                       'TotalClaims': np.where(rng.random(n) < 0.3, rng.lognormal(8, 1, n), 0.0)})
+    tests = [HypothesisSpec(s.name, s.dimension, s.metric, s.test, s.subset, s.groups, s.min_group_size,
+                            n_resamples=200) for s in RESAMPLING_TESTS]
+
+    results = run_hypothesis_tests(df, tests)
+
+    assert all(r.error is None for r in results)
+    zip_perm = next(r for r in results if r.name == 'zip_claim_severity_permutation')
+    assert zip_perm.n_groups == 59 and 0 < zip_perm.pvalue <= 1
+    zip_boot = next(r for r in results if r.name == 'zip_claim_severity_bootstrap')
+    assert all(count >= 10 for count in zip_boot.group_counts.values())
+    summary = pd.DataFrame({'count': [2, 2], 'sum': [1.0, 2.0], 'sumsq': [1.0, 2.0]}, index=['a', 'b'])
+    assert 'row-level' in evaluate_from_summary(tests[0], summary).error
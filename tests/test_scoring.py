@@ -0,0 +1,125 @@
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import urllib.request
+
+import numpy as np
+import pytest
+
+from src.scoring import MicroBatcher, PremiumScorer, make_http_server, serve_jsonlines
+from src.train import train_claim_models
+
+
+@pytest.fixture(scope='module')
+def model_dir(policy_book, tmp_path_factory):
+    path = tmp_path_factory.mktemp('models')
+    train_claim_models(lambda: iter([policy_book]), output_dir=str(path), num_boost_round=30)
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def quotes(policy_book):
+    rows = policy_book.drop(columns=['TotalClaims']).head(200)
+    return json.loads(rows.to_json(orient='records'))
+
+
+def test_premium_is_loaded_expected_claims(model_dir, policy_book):
+    scores = PremiumScorer(model_dir, loading=0.2, fixed_loading=5.0).score(policy_book.head(50))
+
+    assert scores['claim_probability'].between(0, 1).all()
+    assert (scores['expected_severity'] >= 0).all()
+    np.testing.assert_allclose(scores['premium'],
+                               scores['claim_probability'] * scores['expected_severity'] * 1.2 + 5.0)
+    # Gauteng carries three times the claim rate in the fixture.
+    gauteng = policy_book.head(50)['Province'] == 'Gauteng'
+    assert scores.loc[gauteng, 'claim_probability'].mean() > scores.loc[~gauteng, 'claim_probability'].mean()
+
+
+def test_micro_batches_match_direct_scoring(model_dir, quotes):
+    scorer = PremiumScorer(model_dir)
+    expected = scorer.score_records(quotes)
+    batcher = MicroBatcher(scorer, max_batch_size=64, max_wait_ms=5)
+
+    with ThreadPoolExecutor(16) as pool:
+        results = list(pool.map(batcher.score, quotes))
+    batcher.close()
+
+    np.testing.assert_allclose([r['premium'] for r in results], [e['premium'] for e in expected], rtol=1e-6)
+    stats = batcher.latency_stats()
+    assert stats['count'] == len(quotes) and stats['mean_batch_size'] > 1
+    assert stats['p99_ms'] >= stats['p50_ms']
+
+
+def test_partial_quotes_are_imputed(model_dir):
+    scorer = PremiumScorer(model_dir)
+
+    result = scorer.score_records([{'Province': 'Gauteng'}, {'SumInsured': '120000'}])
+
+    assert all(np.isfinite(r['premium']) for r in result)
+
+
+def test_http_and_jsonlines_front_ends(model_dir, quotes):
+    batcher = MicroBatcher(PremiumScorer(model_dir))
+    server = make_http_server(batcher, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        request = urllib.request.Request(f'{url}/quote', data=json.dumps(quotes[:3]).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request) as response:
+            http_results = json.loads(response.read())
+        with urllib.request.urlopen(f'{url}/stats') as response:
+            assert json.loads(response.read())['count'] == 3
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    out = io.StringIO()
+    lines = io.StringIO('\n'.join(json.dumps(q) for q in quotes[:3]) + '\n')
+    assert serve_jsonlines(batcher, lines, out) == 3
+    batcher.close()
+
+    jsonl_results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r['premium'] for r in jsonl_results] == pytest.approx([r['premium'] for r in http_results])
+
+
+def test_a_malformed_quote_fails_alone(model_dir, quotes):
+    scorer = PremiumScorer(model_dir)
+    batcher = MicroBatcher(scorer, max_batch_size=64, max_wait_ms=50)
+
+    futures = [batcher.submit(q) for q in quotes[:5]] + [batcher.submit('not a quote')]
+    original = scorer.score_records
+
+    def fail_on_marked(records):
+        if any(r.get('marked') for r in records):
+            raise ValueError('malformed quote')
+        return original(records)
+
+    # A record that passes validation but breaks the vectorized call.
+    scorer.score_records = fail_on_marked
+    futures.append(batcher.submit(dict(quotes[5], marked=True)))
+    futures += [batcher.submit(q) for q in quotes[6:10]]
+    batcher.close()
+
+    good = futures[:5] + futures[7:]
+    assert [f.result()['premium'] for f in good] == pytest.approx(
+        [r['premium'] for r in original(quotes[:5] + quotes[6:10])])
+    with pytest.raises(TypeError):
+        futures[5].result()
+    with pytest.raises(ValueError, match='malformed'):
+        futures[6].result()
+    assert batcher.latency_stats()['count'] == 10
+
+
+def test_jsonlines_answers_invalid_lines_and_continues(model_dir, quotes):
+    batcher = MicroBatcher(PremiumScorer(model_dir))
+    out = io.StringIO()
+    lines = io.StringIO(json.dumps(quotes[0]) + '\n{not json\n' + json.dumps(quotes[1]) + '\n')
+
+    assert serve_jsonlines(batcher, lines, out) == 3
+    batcher.close()
+
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert 'premium' in results[0] and 'premium' in results[2]
+    assert results[1]['error'].startswith('Invalid JSON')
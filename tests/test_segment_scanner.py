@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from segment_scanner import scan_segments
+
+
+@pytest.fixture
+def book():
+    rng = np.random.default_rng(5)
+    n = 20000
+    province = rng.choice(['Gauteng', 'Limpopo', 'Western Cape'], n)
+    cover = rng.choice(['Own Damage', 'Windscreen', 'Third Party'], n)
+    risk = np.where(cover == 'Windscreen', 0.02, 0.08)
+    return pd.DataFrame({
+        'Province': province,
+        'VehicleType': rng.choice(['Passenger Vehicle', 'Medium Commercial'], n),
+        'Gender': rng.choice(['Male', 'Female', None], n),
+        'CoverType': cover,
+        'TotalPremium': rng.gamma(2.0, 50.0, n),
+        'TotalClaims': np.where(rng.random(n) < risk, rng.lognormal(7, 1, n), 0.0),
+    })
+
+
+def test_single_and_pair_segments_match_groupby(book):
+    segments = scan_segments(book, max_depth=2, min_policies=1).set_index('segment')
+
+    for (province, cover), group in book.groupby(['Province', 'CoverType']):
+        row = segments.loc[f'Province={province} & CoverType={cover}']
+        assert row['n_policies'] == len(group)
+        assert row['loss_ratio'] == pytest.approx(group['TotalClaims'].sum() / group['TotalPremium'].sum())
+        assert row['claim_frequency'] == pytest.approx((group['TotalClaims'] > 0).mean())
+
+    assert segments.loc['Gender=<NA>', 'n_policies'] == book['Gender'].isna().sum()
+    assert (segments['depth'] <= 2).all()
+    assert len(segments[segments['depth'] == 1]) == 3 + 2 + 3 + 3
+
+
+def test_low_risk_segments_are_detected_and_ranked_first(book):
+    segments = scan_segments(book, max_depth=1)
+
+    assert segments.iloc[0]['segment'] == 'CoverType=Windscreen'
+    assert segments.iloc[0]['low_risk']
+    assert not segments.loc[segments['segment'] == 'VehicleType=Passenger Vehicle', 'significant'].item()
+    assert segments.attrs['baseline']['n_policies'] == len(book)
+
+
+def test_min_policies_filters_small_segments(book):
+    segments = scan_segments(book, max_depth=4, min_policies=500)
+
+    assert segments['n_policies'].min() >= 500
+    assert segments['depth'].max() <= 4
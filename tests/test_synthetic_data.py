@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from load_data import INSURANCE_SCHEMA, load_data_chunked
+from synthetic_data import generate_insurance_book, iter_insurance_book, write_insurance_book
+
+
+def test_book_has_the_schema_columns_and_dtypes():
+    df = generate_insurance_book(5_000, chunk_rows=2_000)
+
+    assert list(df.columns) == list(INSURANCE_SCHEMA)
+    assert len(df) == 5_000
+    for col, dtype in INSURANCE_SCHEMA.items():
+        if dtype == 'category':
+            assert isinstance(df[col].dtype, pd.CategoricalDtype), col
+        else:
+            assert df[col].dtype == np.dtype(dtype), col
+
+
+def test_book_is_reproducible_and_seed_dependent():
+    first = generate_insurance_book(3_000, seed=4, chunk_rows=1_000)
+
+    pd.testing.assert_frame_equal(first, generate_insurance_book(3_000, seed=4, chunk_rows=1_000))
+    assert not first['TotalClaims'].equals(generate_insurance_book(3_000, seed=5, chunk_rows=1_000)['TotalClaims'])
+
+
+def test_book_has_realistic_cardinalities_and_sparsity():
+    df = generate_insurance_book(200_000, chunk_rows=50_000)
+
+    assert 800 <= df['PostalCode'].nunique() <= 888
+    assert 350 <= df['Model'].nunique() <= 411
+    assert df['make'].nunique() == 46
+    assert df['TransactionMonth'].nunique() == 23
+    assert 0.002 < (df['TotalClaims'] > 0).mean() < 0.004
+    assert df['NumberOfVehiclesInFleet'].isna().all()
+    assert 0.7 < df['CustomValueEstimate'].isna().mean() < 0.85
+    # A vehicle model always has the same make and engine.
+    per_model = df.dropna(subset=['Model']).groupby('Model', observed=True)[['make', 'cubiccapacity']].nunique()
+    assert (per_model == 1).all().all()
+
+
+def test_chunks_share_level_tables():
+    chunks = list(iter_insurance_book(4_000, chunk_rows=1_500))
+
+    assert [len(c) for c in chunks] == [1_500, 1_500, 1_000]
+    assert chunks[-1].index[0] == 3_000
+    assert chunks[0]['Model'].cat.categories.equals(chunks[-1]['Model'].cat.categories)
+
+
+def test_written_book_loads_with_the_schema(tmp_path):
+    path = write_insurance_book(str(tmp_path / 'book.txt'), 2_500, chunk_rows=1_000)
+    df = load_data_chunked(path)
+    expected = generate_insurance_book(2_500, chunk_rows=1_000)
+
+    assert df.shape == (2_500, 52)
+    np.testing.assert_allclose(df['TotalClaims'], expected['TotalClaims'])
+    assert (df['TransactionMonth'].astype(str) == expected['TransactionMonth'].astype(str)).all()
@@ -0,0 +1,87 @@
+import json
+
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from src.feature_pipeline import InsuranceFeaturePipeline
+from src.train import (PIPELINE_FILE, REPORT_FILE, PeakMemory, _split_labels, fit_feature_pipeline,
+                       iter_training_batches, model_file, train_claim_models)
+
+
+def chunker(df, size=1000):
+    return lambda: (df.iloc[i:i + size] for i in range(0, len(df), size))
+
+
+def test_batches_split_policies_and_select_claims(policy_book):
+    pipeline = InsuranceFeaturePipeline().fit(policy_book)
+    train = list(iter_training_batches(chunker(policy_book), pipeline, 'severity', 'train'))
+    valid = list(iter_training_batches(chunker(policy_book), pipeline, 'severity', 'validation'))
+
+    n_rows = sum(len(y) for _, y in train + valid)
+    assert n_rows == (policy_book['TotalClaims'] > 0).sum()
+    assert all((y > 0).all() for _, y in train + valid)
+    assert 0.1 < sum(len(y) for _, y in valid) / n_rows < 0.3
+    assert train[0][0].dtype == np.float32
+
+
+def test_three_way_split_is_disjoint_and_the_pipeline_sees_only_training_rows(policy_book):
+    pipeline = InsuranceFeaturePipeline().fit(policy_book)
+    sizes = {split: sum(len(y) for _, y in iter_training_batches(chunker(policy_book), pipeline, 'probability',
+                                                                  split, 0.2, 0.1))
+             for split in ('train', 'validation', 'test')}
+    assert sum(sizes.values()) == len(policy_book)
+    assert 0.05 < sizes['test'] / len(policy_book) < 0.15
+
+    # A label that only occurs in held-out policies must not reach the pipeline.
+    book = policy_book.copy()
+    held_out = _split_labels(book, 0.2, 0.1) > 0
+    book['Province'] = np.where(held_out, 'Held out', book['Province'])
+    fitted = fit_feature_pipeline(chunker(book), rows=10_000)
+    assert 'Held out' not in fitted.vocabulary_['Province']
+
+
+@pytest.mark.parametrize('external_memory', [False, True])
+def test_train_claim_models_streams_and_persists(policy_book, tmp_path, external_memory):
+    models, report = train_claim_models(chunker(policy_book), output_dir=str(tmp_path),
+                                        pipeline_rows=2000,
+                                        models=('linear', 'xgboost', 'random_forest'),
+                                        random_forest_rows=1000, num_boost_round=50,
+                                        external_memory=external_memory)
+
+    assert set(report['model']) == {'linear', 'xgboost', 'random_forest'}
+    assert (report['eval_split'] == 'test').all()
+    assert (report['seconds'] > 0).all() and (report['peak_rss_mb'] > 0).all()
+    probability = report[report['task'] == 'probability'].set_index('model')
+    # Metrics come from the ~600 held-out test rows, so allow for their noise.
+    assert (probability['roc_auc'] > 0.5).all() and probability['roc_auc'].max() > 0.6
+    severity = report[report['task'] == 'severity'].set_index('model')
+    assert severity.loc['xgboost', 'r2'] > 0.5
+
+    booster = xgb.Booster(model_file=str(tmp_path / model_file('probability', 'xgboost')))
+    assert booster.num_boosted_rounds() == models[('probability', 'xgboost')].num_boosted_rounds()
+    assert (tmp_path / PIPELINE_FILE).exists()
+    assert len(json.loads((tmp_path / REPORT_FILE).read_text())) == 6
+
+
+def test_xgboost_without_validation_rows_trains_every_round(policy_book):
+    models, report = train_claim_models(chunker(policy_book), models=('xgboost',), validation_fraction=0.0,
+                                        pipeline_rows=2000, num_boost_round=15)
+
+    assert 'error' not in report
+    assert models[('probability', 'xgboost')].num_boosted_rounds() == 15
+
+
+def test_xgboost_without_training_rows_is_reported(policy_book):
+    models, report = train_claim_models(chunker(policy_book), models=('xgboost',), validation_fraction=0.5,
+                                        test_fraction=0.5, pipeline=InsuranceFeaturePipeline().fit(policy_book))
+
+    assert models == {} and report['error'].notna().all()
+
+
+def test_peak_memory_sees_allocations():
+    with PeakMemory(interval=0.01) as usage:
+        before = usage.peak_mb
+        block = np.ones(50_000_000 // 8)
+    assert usage.peak_mb >= before + 30 and usage.seconds > 0
+    del block